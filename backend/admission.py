@@ -0,0 +1,131 @@
+"""
+Admission Control
+Sorts requests into classes (light reads, heavy aggregates, exports,
+hashing, bulk ingest), each with its own concurrency limit, queue depth and queue
+timeout, so a few expensive requests cannot starve the cheap ones. Requests
+that find the queue full, or wait too long in it, are rejected with a
+suggested Retry-After.
+"""
+
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Dict, Any, Optional
+import metrics
+
+
+class AdmissionRejected(Exception):
+    """The request class is saturated; retry after retry_after seconds."""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int):
+        super().__init__(f"{request_class} requests are {reason}")
+        self.request_class = request_class
+        self.retry_after = retry_after
+
+
+class RequestClass:
+    """A concurrency limit with a bounded FIFO queue.
+
+    Lives on the event loop: acquire and release must be called from it, and
+    need no locks.
+    """
+
+    def __init__(self, name: str, limit: int, queue_depth: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque = deque()
+        self._served = 0
+        self._service_seconds = 0.0
+
+    async def acquire(self) -> float:
+        """Take a slot, waiting in the queue if needed. Returns the seconds waited."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            metrics.increment(f"admission.{self.name}.admitted")
+            metrics.observe(f"admission.{self.name}.queue_seconds", 0.0)
+            return 0.0
+        if len(self._waiters) >= self.queue_depth:
+            metrics.increment(f"admission.{self.name}.rejected")
+            raise AdmissionRejected(self.name, "over their queue depth", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.increment(f"admission.{self.name}.timed_out")
+                raise AdmissionRejected(self.name, "queued past their timeout", self.retry_after())
+            raise
+
+        waited = time.perf_counter() - start
+        metrics.increment(f"admission.{self.name}.admitted")
+        metrics.observe(f"admission.{self.name}.queue_seconds", waited)
+        return waited
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it straight to the next live waiter if there is one."""
+        if service_seconds is not None:
+            self._served += 1
+            self._service_seconds += service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, from the mean service time."""
+        mean = self._service_seconds / self._served if self._served else 1.0
+        return max(1, math.ceil(mean * (len(self._waiters) + 1) / self.limit))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_depth": self.queue_depth,
+            "timeout": self.timeout,
+            "active": self.active,
+            "queued": len(self._waiters),
+        }
+
+
+# Path prefixes of each class; anything else under /api/ is a light read
+HEAVY_PATHS = ("/api/duplicates", "/api/suggestions", "/api/search", "/api/tree", "/api/histograms",
+               "/api/cube", "/api/snapshots", "/api/diff", "/api/trends", "/api/batch")
+EXPORT_PATHS = ("/api/export",)
+HASHING_PATHS = ("/api/duplicates/verify",)
+INGEST_PATHS = ("/api/ingest",)
+# Process state that must answer even when everything else is saturated
+EXEMPT_PATHS = ("/health", "/api/metrics", "/api/scan_progress", "/api/scans", "/api/watcher")
+
+
+def classify(path: str) -> Optional[str]:
+    """The request class for a path, or None if it bypasses admission."""
+    if not path.startswith("/api/") or path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(HASHING_PATHS):
+        return "hashing"
+    if path.startswith(EXPORT_PATHS):
+        return "export"
+    if path.startswith(INGEST_PATHS):
+        return "ingest"
+    if path.startswith(HEAVY_PATHS):
+        return "heavy"
+    return "light"
+
+
+def parse_class(name: str, spec: str) -> RequestClass:
+    """Build a class from "limit,queue_depth,timeout_seconds"."""
+    limit, queue_depth, timeout = spec.split(",")
+    return RequestClass(name, int(limit), int(queue_depth), float(timeout))
@@ -0,0 +1,80 @@
+"""
+Batch Service
+Runs several named read views in one call, all against the same catalog
+snapshot, so the numbers on one screen agree with each other.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+from database import Database
+from ai_service import AIService
+
+MAX_WORKERS = 4
+
+
+def _views(db_path: str) -> Dict[str, Callable[..., Any]]:
+    db = Database(db_path)
+    return {
+        "stats": db.get_stats,
+        "search": db.search_files,
+        "duplicates": db.get_duplicates,
+        "duplicate_candidates": db.get_duplicate_candidates,
+        "verified_duplicates": db.get_verified_duplicates,
+        "largest": db.get_largest_files,
+        "oldest": db.get_oldest_files,
+        "tree": db.get_tree_structure,
+        "scan_runs": db.get_scan_runs,
+        "suggestions": AIService(db_path).get_suggestions,
+    }
+
+
+class BatchService:
+    def __init__(self, db_path: str):
+        self.db = Database(db_path)
+        self.views = _views(db_path)
+
+    def run(self, queries: List[Dict[str, Any]], concurrent: bool = False) -> Dict[str, Any]:
+        """Run queries ({"name", "view", "params"}) and return their results by name.
+
+        Sequentially, every view shares one read transaction. Concurrently,
+        each worker opens its own; the batch counts as consistent only if the
+        catalog version did not move while they were opened, and otherwise
+        it is rerun sequentially.
+        """
+        unknown = sorted({q["view"] for q in queries if q["view"] not in self.views})
+        if unknown:
+            raise ValueError(f"Unknown view(s): {', '.join(unknown)}")
+        names = [q["name"] for q in queries]
+        if len(set(names)) != len(names):
+            raise ValueError("Query names must be unique")
+
+        if concurrent and len(queries) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(queries), MAX_WORKERS)) as pool:
+                outcomes = list(pool.map(self._run_pinned, queries))
+            versions = {v for before, after, _ in outcomes for v in (before, after)}
+            if len(versions) == 1:
+                return self._response(versions.pop(), queries, [r for _, _, r in outcomes])
+
+        with self.db.read_snapshot():
+            version = self.db.get_catalog_version()
+            results = [self._call(q) for q in queries]
+        return self._response(version, queries, results)
+
+    def _run_pinned(self, query: Dict[str, Any]) -> tuple:
+        before = self.db.get_catalog_version()
+        with self.db.read_snapshot():
+            after = self.db.get_catalog_version()
+            result = self._call(query)
+        return before, after, result
+
+    def _call(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return {"result": self.views[query["view"]](**(query.get("params") or {}))}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def _response(self, version: str, queries: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "catalog_version": version,
+            "results": {q["name"]: r for q, r in zip(queries, results)},
+        }
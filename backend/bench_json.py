@@ -0,0 +1,73 @@
+"""
+JSON path benchmark
+Compares the two ways the list endpoints (/api/largest, /api/oldest,
+/api/search) can produce their JSON body: Python rows (sqlite3.Row -> dict
+-> FastAPI's encoder -> json.dumps) and SQLite rendering it itself with
+json_group_array (SQLITE_JSON=1). Checks that both give the same document.
+
+    python bench_json.py --db ../data/catalog.db --limit 20000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from fastapi.encoders import jsonable_encoder
+from database import Database, json_available
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def render(result):
+    """The response body FastAPI would send for result."""
+    if isinstance(result, bytes):
+        return result
+    return json.dumps(jsonable_encoder(result), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render(fn())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "catalog.db"))
+    parser.add_argument("--limit", type=int, default=20000, help="rows for largest/oldest")
+    parser.add_argument("--query", default="", help="search term for the search case")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not json_available():
+        sys.exit("This SQLite has no JSON functions")
+    db = Database(args.db)
+
+    cases = [
+        ("largest", lambda **kw: db.get_largest_files(args.limit, **kw)),
+        ("oldest", lambda **kw: db.get_oldest_files(args.limit, **kw)),
+        ("search", lambda **kw: db.search_files(args.query, **kw)),
+    ]
+    print(f"{'case':<18} {'python rows':>12} {'sqlite json':>12} {'speedup':>8} {'bytes':>10}")
+    mismatches = 0
+    for name, fn in cases:
+        for columnar in (False, True):
+            python_seconds, python_body = best_of(args.repeat, lambda: fn(columnar=columnar))
+            sqlite_seconds, sqlite_body = best_of(args.repeat, lambda: fn(columnar=columnar, as_json=True))
+            same = json.loads(python_body) == json.loads(sqlite_body)
+            mismatches += not same
+            label = name + (" columnar" if columnar else "")
+            print(f"{label:<18} {python_seconds * 1000:10.1f}ms {sqlite_seconds * 1000:10.1f}ms "
+                  f"{python_seconds / sqlite_seconds:7.1f}x {len(sqlite_body):>10}"
+                  + ("" if same else "  MISMATCH"))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
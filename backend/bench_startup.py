@@ -0,0 +1,101 @@
+"""
+Startup benchmark
+Measures a cold start of the backend against a time budget: importing the
+app, time until it accepts requests, time until the warm-up reports ready,
+and the latency of the first landing-page requests after that. Exits
+non-zero if any phase is over its budget.
+
+    python bench_startup.py --db ../data/catalog.db
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_REQUESTS = ["/api/stats", "/api/tree", "/api/duplicates"]
+
+
+def time_import(env):
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def status_of(url):
+    try:
+        with urllib.request.urlopen(url, timeout=600) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def wait_for(url, start, timeout):
+    while time.perf_counter() - start < timeout:
+        if status_of(url) == 200:
+            return time.perf_counter() - start
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "..", "data", "catalog.db"))
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--budget-import", type=float, default=1.5, help="seconds to import main")
+    parser.add_argument("--budget-listen", type=float, default=3.0, help="seconds until /health answers")
+    parser.add_argument("--budget-ready", type=float, default=15.0, help="seconds until /health/ready is 200")
+    parser.add_argument("--budget-request", type=float, default=0.5, help="seconds per first request once ready")
+    parser.add_argument("--fresh-cache", action="store_true",
+                        help="delete result_cache.db first, so the warm-up has to compute the aggregates")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DB_PATH=os.path.abspath(args.db))
+    if args.fresh_cache:
+        for suffix in ("", "-wal", "-shm"):
+            path = os.path.join(os.path.dirname(env["DB_PATH"]), "result_cache.db" + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    results = [("import main", time_import(env), args.budget_import)]
+
+    base = f"http://127.0.0.1:{args.port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        results.append(("listening (/health)", wait_for(base + "/health", start, args.budget_listen * 10),
+                        args.budget_listen))
+        results.append(("ready (/health/ready)", wait_for(base + "/health/ready", start, args.budget_ready * 10),
+                        args.budget_ready))
+        for path in FIRST_REQUESTS:
+            t = time.perf_counter()
+            status = status_of(base + path)
+            results.append((f"first {path} ({status})", time.perf_counter() - t, args.budget_request))
+    finally:
+        server.terminate()
+        server.wait()
+
+    over = 0
+    for name, seconds, budget in results:
+        flag = "OK  " if seconds <= budget else "OVER"
+        over += seconds > budget
+        print(f"{flag} {name:<36} {seconds:8.3f}s  (budget {budget:.3f}s)")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Columnar Snapshot
+Optional in-memory copy of the catalog as NumPy arrays, used to answer the
+sort- and aggregate-over-everything queries (largest, oldest, extension
+breakdown) without touching SQLite. Reloaded when the catalog version changes.
+"""
+
+import threading
+from typing import List, Dict, Any, Optional
+from database import Database
+import lazy_import
+
+# Only imported when COLUMNAR_SNAPSHOT loads the first snapshot
+np = lazy_import.optional("numpy")
+
+# Stand-in for NULL timestamps; sorts first, like NULL does in SQLite.
+# Not INT64_MIN, so that negating it for descending order cannot overflow.
+NULL_TIME = -(2 ** 62)
+
+# Columns in the rows of get_largest_files and get_oldest_files, for fields= projections
+LARGEST_FIELDS = {"path", "filename", "extension", "size_bytes", "modified_at"}
+OLDEST_FIELDS = LARGEST_FIELDS | {"created_at"}
+
+
+def is_available() -> bool:
+    """True if NumPy is installed."""
+    return np is not None
+
+
+class ColumnarSnapshot:
+    def __init__(self, version: str, size, mtime, ctime, ext_codes, ext_names: List[Optional[str]],
+                 path_offsets, path_buffer: bytes, filename_lengths):
+        self.version = version
+        self.size = size
+        self.mtime = mtime
+        self.ctime = ctime
+        self.ext_codes = ext_codes
+        self.ext_names = ext_names
+        self.path_offsets = path_offsets  # path i is path_buffer[offsets[i]:offsets[i + 1]]
+        self.path_buffer = path_buffer
+        self.filename_lengths = filename_lengths  # in bytes, from the end of the path
+
+    @classmethod
+    def load(cls, db: Database, chunk_size: int = 200000) -> "ColumnarSnapshot":
+        """Read the whole catalog in chunks into packed arrays."""
+        version = db.get_catalog_version()
+        conn = db.get_connection()
+        conn.row_factory = None
+        cursor = conn.execute("SELECT size_bytes, modified_at, created_at, extension, path, filename FROM files")
+
+        ext_index: Dict[Optional[str], int] = {}
+        sizes, mtimes, ctimes, codes, lengths, fn_lengths, buffers = [], [], [], [], [], [], []
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+
+            size_col, mtime_col, ctime_col, ext_col, path_col, fn_col = zip(*rows)
+            sizes.append(np.array(size_col, dtype=np.int64))
+            mtimes.append(np.array([NULL_TIME if t is None else t for t in mtime_col], dtype=np.int64))
+            ctimes.append(np.array([NULL_TIME if t is None else t for t in ctime_col], dtype=np.int64))
+            codes.append(np.array([ext_index.setdefault(e, len(ext_index)) for e in ext_col], dtype=np.int32))
+
+            encoded = [p.encode("utf-8", "surrogatepass") for p in path_col]
+            lengths.append(np.array([len(p) for p in encoded], dtype=np.int64))
+            fn_lengths.append(np.array([len(f.encode("utf-8", "surrogatepass")) for f in fn_col], dtype=np.int32))
+            buffers.append(b"".join(encoded))
+
+        conn.close()
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+        path_lengths = concat(lengths, np.int64)
+        offsets = np.zeros(len(path_lengths) + 1, dtype=np.int64)
+        np.cumsum(path_lengths, out=offsets[1:])
+
+        ext_names: List[Optional[str]] = [None] * len(ext_index)
+        for name, code in ext_index.items():
+            ext_names[code] = name
+
+        return cls(
+            version,
+            concat(sizes, np.int64),
+            concat(mtimes, np.int64),
+            concat(ctimes, np.int64),
+            concat(codes, np.int32),
+            ext_names,
+            offsets,
+            b"".join(buffers),
+            concat(fn_lengths, np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Same result as Database.get_stats."""
+        counts = np.bincount(self.ext_codes, minlength=len(self.ext_names))
+        totals = np.bincount(self.ext_codes, weights=self.size, minlength=len(self.ext_names))
+        top_ext = self._top_k(totals, 10)
+
+        return {
+            "total_files": len(self),
+            "total_size": int(self.size.sum()),
+            "extensions": [
+                {"extension": self.ext_names[i], "count": int(counts[i]), "total_size": int(totals[i])}
+                for i in top_ext
+            ],
+            "largest_files": [
+                {"path": self._path(i), "filename": self._filename(i), "size_bytes": int(self.size[i])}
+                for i in self._top_k(self.size, 10)
+            ],
+        }
+
+    def get_largest_files(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Same result as Database.get_largest_files."""
+        return [{
+            "path": self._path(i),
+            "filename": self._filename(i),
+            "extension": self.ext_names[self.ext_codes[i]],
+            "size_bytes": int(self.size[i]),
+            "modified_at": self._time(self.mtime[i]),
+        } for i in self._top_k(self.size, limit)]
+
+    def get_oldest_files(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Same result as Database.get_oldest_files."""
+        return [{
+            "path": self._path(i),
+            "filename": self._filename(i),
+            "extension": self.ext_names[self.ext_codes[i]],
+            "size_bytes": int(self.size[i]),
+            "modified_at": self._time(self.mtime[i]),
+            "created_at": self._time(self.ctime[i]),
+        } for i in self._top_k(-self.mtime, limit)]
+
+    def _top_k(self, values, k: int):
+        """Indexes of the k largest values, largest first: O(n) select, then sort only k."""
+        n = len(values)
+        if n == 0 or k <= 0:
+            return []
+        if k < n:
+            candidates = np.argpartition(-values, k - 1)[:k]
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(-values[candidates], kind="stable")]
+
+    def _path(self, i: int) -> str:
+        return self.path_buffer[self.path_offsets[i]:self.path_offsets[i + 1]].decode("utf-8", "surrogatepass")
+
+    def _filename(self, i: int) -> str:
+        end = self.path_offsets[i + 1]
+        return self.path_buffer[end - self.filename_lengths[i]:end].decode("utf-8", "surrogatepass")
+
+    def _time(self, value) -> Optional[int]:
+        return None if value == NULL_TIME else int(value)
+
+
+_lock = threading.Lock()
+_snapshots: Dict[str, ColumnarSnapshot] = {}
+
+
+def get_snapshot(db_path: str) -> ColumnarSnapshot:
+    """Get the snapshot for db_path, reloading it if the catalog changed since it was built."""
+    db = Database(db_path)
+    with _lock:
+        snapshot = _snapshots.get(db_path)
+        if snapshot is None or snapshot.version != db.get_catalog_version():
+            snapshot = ColumnarSnapshot.load(db)
+            _snapshots[db_path] = snapshot
+        return snapshot
@@ -0,0 +1,58 @@
+"""
+Compression
+Incremental gzip for streamed responses, one-shot gzip for buffered JSON
+bodies, Accept-Encoding negotiation and the Vary header that goes with it.
+"""
+
+import gzip
+import zlib
+from typing import Iterable, Iterator, MutableMapping, Union
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True if an Accept-Encoding header allows gzip (explicitly or via *), honoring q=0."""
+    allowed = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        allowed[coding] = quality > 0
+
+    if "gzip" in allowed:
+        return allowed["gzip"]
+    return allowed.get("*", False)
+
+
+def add_vary(headers: MutableMapping[str, str], name: str) -> None:
+    """Add name to the Vary header, keeping what is already listed there."""
+    listed = [v.strip() for v in headers.get("vary", "").split(",") if v.strip()]
+    if name.lower() not in (v.lower() for v in listed) and "*" not in listed:
+        headers["vary"] = ", ".join(listed + [name])
+
+
+def gzip_chunks(chunks: Iterable[Union[str, bytes]], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of text or bytes chunks as they come, yielding compressed output."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def gzip_body(body: bytes, level: int = 6) -> bytes:
+    """Gzip a whole response body."""
+    return gzip.compress(body, compresslevel=level, mtime=0)
@@ -0,0 +1,180 @@
+"""
+Cube Service
+Precomputed extension x age bucket x size bucket aggregates (file count and
+bytes), rebuilt after each scan. Drill-down questions such as "how much .mp4
+older than 2 years over 1 GB?" are answered from a few thousand cube rows
+instead of a scan over the files table.
+"""
+
+import time
+import threading
+from typing import List, Dict, Any, Optional
+from database import Database
+from histogram_service import AGE_BUCKETS, DAY
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+# (label, lower bound in bytes); each bucket ends where the next one starts
+SIZE_BUCKETS = [
+    ("< 1 KB", 0),
+    ("1 KB - 1 MB", KB),
+    ("1 - 10 MB", MB),
+    ("10 - 100 MB", 10 * MB),
+    ("100 MB - 1 GB", 100 * MB),
+    ("1 - 10 GB", GB),
+    ("> 10 GB", 10 * GB),
+]
+
+UNKNOWN_AGE = -1
+
+DIMENSIONS = {"extension": "extension", "age": "age_bucket", "size": "size_bucket"}
+
+# One rebuild at a time per process; a second caller finds the cube fresh
+_rebuild_lock = threading.Lock()
+
+
+class CubeService:
+    def __init__(self, db_path: str):
+        self.db = Database(db_path)
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute the cube from the files table in one GROUP BY pass."""
+        start = time.time()
+        now = int(start)
+        generation = self.db.get_latest_generation()
+
+        # Buckets are CASE ladders from the largest lower bound down
+        age_case = "CASE WHEN modified_at IS NULL OR modified_at <= 0 THEN -1 "
+        for k in range(len(AGE_BUCKETS) - 1, 0, -1):
+            age_case += f"WHEN {now} - modified_at >= {AGE_BUCKETS[k][1] * DAY} THEN {k} "
+        age_case += "ELSE 0 END"
+
+        size_case = "CASE "
+        for k in range(len(SIZE_BUCKETS) - 1, 0, -1):
+            size_case += f"WHEN size_bytes >= {SIZE_BUCKETS[k][1]} THEN {k} "
+        size_case += "ELSE 0 END"
+
+        conn = self.db.get_write_connection()
+        with conn:
+            conn.execute("DELETE FROM catalog_cube")
+            conn.execute(f"""
+                INSERT INTO catalog_cube (extension, age_bucket, size_bucket, file_count, total_bytes)
+                SELECT extension, {age_case}, {size_case}, COUNT(*), SUM(size_bytes)
+                FROM files
+                GROUP BY 1, 2, 3
+            """)
+            rows = conn.execute("SELECT COUNT(*) FROM catalog_cube").fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)", [
+                ("cube_built_at", str(now)),
+                ("cube_generation", str(generation)),
+            ])
+        conn.close()
+
+        return {"rows": rows, "built_at": now, "generation": generation,
+                "duration_seconds": round(time.time() - start, 3)}
+
+    def rebuild_if_stale(self) -> Optional[Dict[str, Any]]:
+        """Rebuild unless the cube is current or another thread is already rebuilding it."""
+        if not _rebuild_lock.acquire(blocking=False):
+            return None
+        try:
+            return self.rebuild() if self.is_stale() else None
+        finally:
+            _rebuild_lock.release()
+
+    def is_stale(self) -> bool:
+        """True if the cube was never built or a scan finished after it was."""
+        conn = self.db.get_connection()
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'cube_generation'").fetchone()
+        conn.close()
+        return row is None or int(row[0]) < self.db.get_latest_generation()
+
+    def query(self, extensions: Optional[List[str]] = None, group_by: Optional[List[str]] = None,
+              min_age_days: Optional[int] = None, max_age_days: Optional[int] = None,
+              min_size: Optional[int] = None, max_size: Optional[int] = None) -> Dict[str, Any]:
+        """Slice the cube by the filters and roll it up to the group_by dimensions.
+
+        Age and size limits select whole buckets: a bucket is included when it
+        lies entirely inside the limits, so limits are best given on bucket edges.
+        Reads never rebuild: a cube older than the latest scan is served as it
+        is, with stale set, and left to the caller to rebuild.
+        """
+        group_by = group_by or []
+        unknown = [d for d in group_by if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {', '.join(unknown)}")
+
+        where = ["1=1"]
+        params: List[Any] = []
+        if extensions:
+            where.append(f"extension IN ({','.join('?' * len(extensions))})")
+            params.extend(extensions)
+        age_buckets = self._bucket_range(AGE_BUCKETS, min_age_days, max_age_days)
+        if age_buckets is not None:
+            where.append(f"age_bucket IN ({','.join(str(k) for k in age_buckets) or 'NULL'})")
+        size_buckets = self._bucket_range(SIZE_BUCKETS, min_size, max_size)
+        if size_buckets is not None:
+            where.append(f"size_bucket IN ({','.join(str(k) for k in size_buckets) or 'NULL'})")
+
+        columns = [DIMENSIONS[d] for d in group_by]
+        select = ", ".join(columns + ["SUM(file_count) AS file_count", "SUM(total_bytes) AS total_bytes"])
+        sql = f"SELECT {select} FROM catalog_cube WHERE {' AND '.join(where)}"
+        if columns:
+            sql += f" GROUP BY {', '.join(columns)}"
+        sql += " ORDER BY total_bytes DESC"
+
+        conn = self.db.get_connection()
+        rows = conn.execute(sql, params).fetchall()
+        built_at = conn.execute("SELECT value FROM catalog_meta WHERE key = 'cube_built_at'").fetchone()
+        conn.close()
+
+        cells = []
+        for row in rows:
+            if row["file_count"] is None:
+                continue
+            cell = {"file_count": row["file_count"], "total_bytes": row["total_bytes"]}
+            if "extension" in group_by:
+                cell["extension"] = row["extension"]
+            if "age" in group_by:
+                cell["age"] = self._label(AGE_BUCKETS, row["age_bucket"])
+                cell["age_bucket"] = row["age_bucket"]
+            if "size" in group_by:
+                cell["size"] = self._label(SIZE_BUCKETS, row["size_bucket"])
+                cell["size_bucket"] = row["size_bucket"]
+            cells.append(cell)
+
+        return {
+            "built_at": int(built_at[0]) if built_at else None,
+            "stale": self.is_stale(),
+            "group_by": group_by,
+            "cells": cells,
+            "total_files": sum(c["file_count"] for c in cells),
+            "total_bytes": sum(c["total_bytes"] for c in cells),
+        }
+
+    def get_dimensions(self) -> Dict[str, Any]:
+        """Bucket definitions, for building drill-down UIs."""
+        return {
+            "age": [{"bucket": k, "label": label, "min_days": low} for k, (label, low) in enumerate(AGE_BUCKETS)]
+                   + [{"bucket": UNKNOWN_AGE, "label": "Desconhecida", "min_days": None}],
+            "size": [{"bucket": k, "label": label, "min_bytes": low} for k, (label, low) in enumerate(SIZE_BUCKETS)],
+        }
+
+    def _bucket_range(self, buckets: list, low: Optional[int], high: Optional[int]) -> Optional[List[int]]:
+        """Indexes of the buckets entirely within [low, high], or None when unfiltered."""
+        if low is None and high is None:
+            return None
+        selected = []
+        for k, (_, start) in enumerate(buckets):
+            end = buckets[k + 1][1] if k + 1 < len(buckets) else None
+            if low is not None and start < low:
+                continue
+            if high is not None and (end is None or end > high):
+                continue
+            selected.append(k)
+        return selected
+
+    def _label(self, buckets: list, k: int) -> str:
+        return buckets[k][0] if 0 <= k < len(buckets) else "Desconhecida"
@@ -1,23 +1,284 @@
 import sqlite3
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Union
+from contextlib import contextmanager
 import os
+import time
+import threading
+
+# Columns that list endpoints may project with fields=
+FILE_FIELDS = (
+    "id", "path", "filename", "extension", "size_bytes", "created_at", "modified_at",
+    "md5_hash", "sha256_hash", "sha256_verified", "scan_generation",
+)
+
+# Rows as dicts, the columnar form, or a JSON body rendered by SQLite
+ListResult = Union[List[Dict[str, Any]], Dict[str, Any], bytes]
+
+def json_available() -> bool:
+    """True if this SQLite has the JSON functions (built in since 3.38)."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("SELECT json_group_array(json_object('a', 1))")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+# Connections pinned by read_snapshot, per thread and database path
+_local = threading.local()
+
+
+class _PinnedConnection:
+    """Stand-in for the connection of a read_snapshot: close() is a no-op and
+    row_factory is applied per cursor, so callers can treat it as their own."""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.row_factory = sqlite3.Row
+    
+    def cursor(self):
+        cursor = self._conn.cursor()
+        cursor.row_factory = self.row_factory
+        return cursor
+    
+    def execute(self, sql: str, params=()):
+        return self.cursor().execute(sql, params)
+    
+    def close(self) -> None:
+        pass
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+BUMP_VERSION_SQL = "UPDATE catalog_meta SET value = value + 1 WHERE key = 'write_counter'"
+
+
+class _VersionedConnection(sqlite3.Connection):
+    """Write connection that bumps the catalog's write counter, the catalog
+    version, inside every transaction it commits that changed rows."""
+
+    counted_changes = 0
+
+    def commit(self) -> None:
+        self._bump()
+        super().commit()
+
+    def __exit__(self, exc_type, exc, tb):
+        # sqlite3's own __exit__ commits without going through commit()
+        if exc_type is None:
+            self._bump()
+        return super().__exit__(exc_type, exc, tb)
+
+    def _bump(self) -> None:
+        if self.in_transaction and self.total_changes != self.counted_changes:
+            self.execute(BUMP_VERSION_SQL)
+            self.counted_changes = self.total_changes
+
 
 class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
         
-    def get_connection(self):
+    def get_connection(self, check_same_thread: bool = True):
         """Get a read-only connection to the database."""
-        conn = sqlite3.connect(self.db_path)
+        pinned = getattr(_local, "pinned", None)
+        if pinned and self.db_path in pinned:
+            return pinned[self.db_path]
+        conn = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
         conn.row_factory = sqlite3.Row
         return conn
 
+    @contextmanager
+    def read_snapshot(self):
+        """Run every read of this catalog made by the current thread inside one transaction.
+        
+        Within the block, get_connection (from any Database on this path)
+        returns one shared connection whose read transaction is already
+        open, so all queries see the same catalog state. Nested blocks reuse
+        the outer snapshot.
+        """
+        pinned = getattr(_local, "pinned", None)
+        if pinned is None:
+            pinned = _local.pinned = {}
+        if self.db_path in pinned:
+            yield
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.isolation_level = None
+        conn.execute("BEGIN")
+        # In WAL mode the snapshot is taken at the first read, not at BEGIN
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        pinned[self.db_path] = _PinnedConnection(conn)
+        try:
+            yield
+        finally:
+            del pinned[self.db_path]
+            conn.execute("COMMIT")
+            conn.close()
+
+    def get_write_connection(self, check_same_thread: bool = True, versioned: bool = True):
+        """Get a connection for writes that waits on the engine's writer lock.
+        
+        Its commits change the catalog version, unless versioned is False (for
+        bookkeeping tables such as scan_jobs, which no versioned view reads).
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=check_same_thread,
+                               factory=_VersionedConnection if versioned else sqlite3.Connection)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def get_catalog_version(self) -> str:
+        """Cheap token that changes whenever the catalog data is written.
+        
+        The catalog's id and its write counter, which every writer (the write
+        connections here and the engine) bumps in the transaction that changes
+        the data, so checkpoints or closing connections do not change it.
+        Inside read_snapshot it is the version of the snapshot.
+        """
+        conn = self.get_connection()
+        try:
+            meta = dict(tuple(row) for row in conn.execute(
+                "SELECT key, value FROM catalog_meta WHERE key IN ('catalog_id', 'write_counter')"
+            ))
+        except sqlite3.OperationalError:
+            meta = {}
+        finally:
+            conn.close()
+        if "catalog_id" not in meta:
+            return "empty"
+        return f"{meta['catalog_id']}.{meta.get('write_counter', 0)}"
+
+    def prewarm_indexes(self, indexes: List[str]) -> Dict[str, int]:
+        """Read every page of the given indexes of files, pulling them into the OS page cache.
+
+        Returns the entries read per index. Raises ValueError for an index that does
+        not exist, so a renamed index is not silently left cold.
+        """
+        conn = self.get_connection()
+        existing = {row[1] for row in conn.execute("PRAGMA index_list(files)")}
+        unknown = [index for index in indexes if index not in existing]
+        if unknown:
+            conn.close()
+            raise ValueError(f"Unknown index(es): {', '.join(unknown)}")
+        entries = {}
+        for index in indexes:
+            column = conn.execute(f"PRAGMA index_info({index})").fetchone()[2]
+            # COUNT(column) forces a scan of the covering index itself
+            entries[index] = conn.execute(f"SELECT COUNT({column}) FROM files INDEXED BY {index}").fetchone()[0]
+        conn.close()
+        return entries
+
     def ensure_schema(self):
         """Ensure necessary columns exist in the database."""
-        conn = sqlite3.connect(self.db_path)
+        # Versioned, so a migration that changes rows also changes the version
+        conn = sqlite3.connect(self.db_path, factory=_VersionedConnection)
         cursor = conn.cursor()
         
         try:
+            # Same layout the engine creates, so the backend can start on an empty catalog
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL UNIQUE,
+                    filename TEXT NOT NULL,
+                    extension TEXT,
+                    size_bytes INTEGER NOT NULL,
+                    created_at INTEGER,
+                    modified_at INTEGER,
+                    md5_hash TEXT NOT NULL,
+                    sha256_hash TEXT,
+                    sha256_verified INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_extension ON files(extension)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_size ON files(size_bytes)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_md5 ON files(md5_hash)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scan_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    root TEXT NOT NULL,
+                    started_at INTEGER NOT NULL,
+                    finished_at INTEGER,
+                    status TEXT NOT NULL,
+                    files_seen INTEGER DEFAULT 0,
+                    files_removed INTEGER DEFAULT 0,
+                    bytes_removed INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_cube (
+                    extension TEXT,
+                    age_bucket INTEGER NOT NULL,
+                    size_bucket INTEGER NOT NULL,
+                    file_count INTEGER NOT NULL,
+                    total_bytes INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scan_snapshots (
+                    generation INTEGER PRIMARY KEY,
+                    created_at INTEGER NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_count INTEGER NOT NULL,
+                    total_bytes INTEGER NOT NULL,
+                    stored_bytes INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS stats_snapshots (
+                    generation INTEGER PRIMARY KEY,
+                    created_at INTEGER NOT NULL,
+                    total_files INTEGER NOT NULL,
+                    total_bytes INTEGER NOT NULL,
+                    is_keyframe INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scan_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    root TEXT NOT NULL,
+                    scanner TEXT NOT NULL,
+                    options TEXT,
+                    status TEXT NOT NULL,
+                    pid INTEGER,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    paused_seconds REAL DEFAULT 0,
+                    paused_at REAL,
+                    duration_seconds REAL,
+                    generation INTEGER,
+                    files_scanned INTEGER,
+                    bytes_scanned INTEGER,
+                    files_per_sec REAL,
+                    bytes_per_sec REAL,
+                    exit_code INTEGER
+                )
+            """)
+            # Background refreshes, so every worker process reports the same one
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS refresh_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    root TEXT,
+                    status TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    error TEXT,
+                    result TEXT
+                )
+            """)
+            conn.commit()
+            
             # Check for existing columns
             cursor.execute("PRAGMA table_info(files)")
             columns = [col[1] for col in cursor.fetchall()]
@@ -33,6 +294,35 @@ class Database:
                 print("Migrating: Adding sha256_hash column...")
                 cursor.execute("ALTER TABLE files ADD COLUMN sha256_hash TEXT")
             
+            if 'scan_generation' not in columns:
+                print("Migrating: Adding scan_generation column...")
+                cursor.execute("ALTER TABLE files ADD COLUMN scan_generation INTEGER DEFAULT 0")
+            
+            # Stale-row purges after a scan read idx_path_generation; lookups by path use
+            # the UNIQUE constraint's index, which idx_path only duplicated
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_path_generation ON files(path, scan_generation)")
+            cursor.execute("DROP INDEX IF EXISTS idx_path")
+            # Largest and oldest files: an index walk instead of a sort over the whole
+            # table. The indexes cover the default columns of both lists, so those are
+            # read from the index alone, without a lookup into files per row.
+            cursor.execute("DROP INDEX IF EXISTS idx_modified")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_size_cover
+                ON files(size_bytes, path, filename, extension, modified_at)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_modified_cover
+                ON files(modified_at, path, filename, extension, size_bytes, created_at)
+            """)
+            
+            # The catalog version (the engine seeds the same rows): a random id, so a
+            # replaced catalog file never reuses the versions of the old one, and
+            # a counter of writes
+            cursor.execute("""
+                INSERT OR IGNORE INTO catalog_meta (key, value)
+                VALUES ('catalog_id', lower(hex(randomblob(16)))), ('write_counter', 0)
+            """)
+            
             conn.commit()
             
         except sqlite3.Error as e:
@@ -41,6 +331,158 @@ class Database:
         finally:
             conn.close()
     
+    @staticmethod
+    def subtree_range(root: str) -> Tuple[str, str]:
+        """Half-open [lower, upper) path range covering everything below root.
+        
+        Comparing against this range lets SQLite walk an index on path instead of
+        evaluating a LIKE pattern on every row.
+        """
+        sep = "\\" if "\\" in root else "/"
+        base = root.rstrip(sep)
+        return base + sep, base + chr(ord(sep) + 1)
+
+    def begin_scan_run(self, root: str) -> int:
+        """Register a new scan of root; the returned id is its scan generation."""
+        conn = self.get_write_connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO scan_runs (root, started_at, status) VALUES (?, ?, 'running')",
+                (root, int(time.time()))
+            )
+        conn.close()
+        return cursor.lastrowid
+
+    def end_scan_run(self, generation: int, status: str) -> None:
+        """Close a scan run that stopped before finish_scan_run ('failed' or 'cancelled').
+        
+        Nothing is purged; a run that already ended keeps its status.
+        """
+        conn = self.get_write_connection()
+        with conn:
+            conn.execute(
+                "UPDATE scan_runs SET finished_at = ?, status = ? WHERE id = ? AND status = 'running'",
+                (int(time.time()), status, generation)
+            )
+        conn.close()
+
+    def keep_unreadable(self, files: List[str], trees: List[str], generation: int) -> int:
+        """Stamp the rows of paths a scan found but could not read with its generation.
+        
+        Covers the unreadable files themselves and everything below the
+        unreadable directories, so finish_scan_run keeps them as they were.
+        Returns the number of rows kept.
+        """
+        conn = self.get_write_connection()
+        kept = 0
+        with conn:
+            for path in list(files) + list(trees):
+                kept += conn.execute("UPDATE files SET scan_generation = ? WHERE path = ?",
+                                     (generation, path)).rowcount
+            for tree in trees:
+                lower, upper = self.subtree_range(tree)
+                kept += conn.execute("""
+                    UPDATE files SET scan_generation = ?
+                    WHERE path >= ? AND path < ? AND scan_generation < ?
+                """, (generation, lower, upper, generation)).rowcount
+        conn.close()
+        return kept
+
+    def finish_scan_run(self, generation: int, root: str, files_seen: int) -> Dict[str, Any]:
+        """Purge files under root that the given scan generation did not see.
+        
+        Mirrors the engine's end-of-scan reconciliation for Python-side scanners.
+        """
+        lower, upper = self.subtree_range(root)
+        conn = self.get_write_connection()
+        
+        with conn:
+            removed = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM files
+                WHERE path >= ? AND path < ? AND scan_generation < ?
+            """, (lower, upper, generation)).fetchone()
+            conn.execute("""
+                DELETE FROM files
+                WHERE path >= ? AND path < ? AND scan_generation < ?
+            """, (lower, upper, generation))
+            conn.execute("""
+                UPDATE scan_runs
+                SET finished_at = ?, status = 'completed', files_seen = ?,
+                    files_removed = ?, bytes_removed = ?
+                WHERE id = ?
+            """, (int(time.time()), files_seen, removed[0], removed[1], generation))
+        
+        conn.close()
+        return {"generation": generation, "files_removed": removed[0], "bytes_removed": removed[1]}
+
+    def upsert_files(self, files: List[Dict[str, Any]], generation: int = 0, conn=None) -> None:
+        """Insert or update catalog entries (same fields as the engine's FileEntry).
+        
+        Unlike the engine's INSERT OR REPLACE, existing rows keep their id, and
+        keep their SHA256 verification while the MD5 is unchanged. A row's scan
+        generation never goes backwards, so live updates written during a scan
+        cannot make a file look stale to it.
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = self.get_write_connection()
+        
+        with conn:
+            conn.executemany("""
+                INSERT INTO files (path, filename, extension, size_bytes, created_at, modified_at,
+                                   md5_hash, sha256_hash, sha256_verified, scan_generation)
+                VALUES (:path, :filename, :extension, :size_bytes, :created_at, :modified_at,
+                        :md5_hash, :sha256_hash, 0, :scan_generation)
+                ON CONFLICT(path) DO UPDATE SET
+                    filename = excluded.filename,
+                    extension = excluded.extension,
+                    size_bytes = excluded.size_bytes,
+                    created_at = excluded.created_at,
+                    modified_at = excluded.modified_at,
+                    sha256_verified = CASE WHEN files.md5_hash = excluded.md5_hash
+                                           THEN files.sha256_verified ELSE 0 END,
+                    sha256_hash = CASE WHEN files.md5_hash = excluded.md5_hash
+                                       THEN files.sha256_hash ELSE excluded.sha256_hash END,
+                    md5_hash = excluded.md5_hash,
+                    scan_generation = MAX(files.scan_generation, excluded.scan_generation)
+            """, ({"sha256_hash": None, **f, "scan_generation": generation} for f in files))
+        
+        if own_conn:
+            conn.close()
+
+    def get_latest_generation(self, include_running: bool = False) -> int:
+        """Get the most recent completed scan generation (0 if nothing was scanned yet).
+        
+        With include_running, a scan still in progress counts too: rows written
+        outside a scan while one runs take its generation, so its purge keeps them.
+        Failed and cancelled scans never count.
+        """
+        statuses = ("completed", "running") if include_running else ("completed",)
+        conn = self.get_connection()
+        generation = conn.execute(
+            f"SELECT COALESCE(MAX(id), 0) FROM scan_runs WHERE status IN ({', '.join('?' * len(statuses))})",
+            statuses
+        ).fetchone()[0]
+        conn.close()
+        return generation
+
+    def get_scan_runs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent scan runs with their reconciliation summary."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, root, started_at, finished_at, status,
+                   files_seen, files_removed, bytes_removed
+            FROM scan_runs
+            ORDER BY id DESC
+            LIMIT ?
+        """, (limit,))
+        
+        results = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return results
+
     def get_stats(self) -> Dict[str, Any]:
         """Get overall statistics."""
         conn = self.get_connection()
@@ -79,37 +521,114 @@ class Database:
         }
     
     def search_files(self, query: str = "", extension: Optional[str] = None, 
-                     min_size: Optional[int] = None, max_size: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Search files with filters."""
+                     min_size: Optional[int] = None, max_size: Optional[int] = None,
+                     fields: Optional[List[str]] = None,
+                     columnar: bool = False, as_json: bool = False) -> ListResult:
+        """Search files with filters. fields limits the columns returned (default: all)."""
+        columns = self._projection(fields)
         conn = self.get_connection()
+        if as_json and columns is None:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(files)")]
+        
+        where, params = self._search_filters(query, extension, min_size, max_size)
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM files WHERE {where} LIMIT 100"
+        
+        results = self._list_query(conn, sql, params, columns, columnar, as_json)
+        conn.close()
+        
+        return results
+    
+    def iter_files(self, columns: List[str], query: str = "", extension: Optional[str] = None,
+                   min_size: Optional[int] = None, max_size: Optional[int] = None,
+                   after_id: Optional[int] = None, batch_size: int = 5000) -> Iterator[List[tuple]]:
+        """Stream every file matching the search filters, in id order, a batch of rows at a time.
+        
+        Rows come from one cursor read with fetchmany, so memory stays at one
+        batch however large the catalog is. after_id resumes after the last
+        id already received. The connection may be advanced from any thread.
+        """
+        where, params = self._search_filters(query, extension, min_size, max_size)
+        if after_id is not None:
+            where += " AND id > ?"
+            params.append(after_id)
+        
+        conn = self.get_connection(check_same_thread=False)
+        conn.row_factory = None
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM files WHERE {where} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+    
+    def _list_query(self, conn, sql: str, params, columns: Optional[List[str]],
+                    columnar: bool, as_json: bool) -> ListResult:
+        """Run a list query. With as_json, SQLite builds the whole JSON body (rows or
+        columnar, named by columns) and it comes back as UTF-8 bytes."""
+        if as_json:
+            if columnar:
+                names = ", ".join(f"'{c}'" for c in columns)
+                arrays = ", ".join(f"json_group_array({c})" for c in columns)
+                select = f"json_object('columns', json_array({names}), 'data', json_array({arrays}))"
+            else:
+                pairs = ", ".join(f"'{c}', {c}" for c in columns)
+                select = f"json_group_array(json_object({pairs}))"
+            # The aggregate keeps the inner query's order: a LIMIT subquery is not flattened
+            return conn.execute(f"SELECT {select} FROM ({sql})", params).fetchone()[0].encode("utf-8")
         cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return self._fetch(cursor, columnar)
+    
+    @staticmethod
+    def _fetch(cursor, columnar: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """The cursor's rows as dicts, or columnar: names once and one array per column.
         
-        sql = "SELECT * FROM files WHERE 1=1"
-        params = []
+        The columnar form is built from plain tuples, with no per-row dict.
+        """
+        if not columnar:
+            return [dict(row) for row in cursor.fetchall()]
+        cursor.row_factory = None
+        columns = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+        data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        return {"columns": columns, "data": data}
+    
+    @staticmethod
+    def _projection(fields: Optional[List[str]], default: Optional[List[str]] = None) -> Optional[List[str]]:
+        """Columns for the requested fields, checked against FILE_FIELDS."""
+        if not fields:
+            return default
+        unknown = [f for f in fields if f not in FILE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(FILE_FIELDS)}")
+        return list(dict.fromkeys(fields))
+    
+    def _search_filters(self, query: str = "", extension: Optional[str] = None,
+                        min_size: Optional[int] = None, max_size: Optional[int] = None) -> Tuple[str, List[Any]]:
+        """WHERE clause and parameters for the /api/search filters."""
+        where = "1=1"
+        params: List[Any] = []
         
         if query:
-            sql += " AND (filename LIKE ? OR path LIKE ?)"
+            where += " AND (filename LIKE ? OR path LIKE ?)"
             params.extend([f"%{query}%", f"%{query}%"])
         
         if extension:
-            sql += " AND extension = ?"
-            params.append(extension)  # type: ignore
+            where += " AND extension = ?"
+            params.append(extension)
         
         if min_size is not None:
-            sql += " AND size_bytes >= ?"
-            params.append(min_size)  # type: ignore
+            where += " AND size_bytes >= ?"
+            params.append(min_size)
         
         if max_size is not None:
-            sql += " AND size_bytes <= ?"
-            params.append(max_size)  # type: ignore
+            where += " AND size_bytes <= ?"
+            params.append(max_size)
         
-        sql += " LIMIT 100"
-        
-        cursor.execute(sql, params)
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        return results
+        return where, params
     
     def get_duplicates(self) -> List[Dict[str, Any]]:
         """Find duplicate files by MD5 hash."""
@@ -137,35 +656,35 @@ class Database:
         conn.close()
         return duplicates
     
-    def get_largest_files(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_largest_files(self, limit: int = 100, fields: Optional[List[str]] = None,
+                          columnar: bool = False, as_json: bool = False) -> ListResult:
         """Get largest files sorted by size."""
+        columns = self._projection(fields, ["path", "filename", "extension", "size_bytes", "modified_at"])
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT path, filename, extension, size_bytes, modified_at
+        sql = f"""
+            SELECT {', '.join(columns)}
             FROM files
             ORDER BY size_bytes DESC
             LIMIT ?
-        """, (limit,))
-        
-        results = [dict(row) for row in cursor.fetchall()]
+        """
+        results = self._list_query(conn, sql, (limit,), columns, columnar, as_json)
         conn.close()
         return results
     
-    def get_oldest_files(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_oldest_files(self, limit: int = 100, fields: Optional[List[str]] = None,
+                         columnar: bool = False, as_json: bool = False) -> ListResult:
         """Get oldest files sorted by modification date."""
+        columns = self._projection(fields, ["path", "filename", "extension", "size_bytes", "modified_at", "created_at"])
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT path, filename, extension, size_bytes, modified_at, created_at
+        sql = f"""
+            SELECT {', '.join(columns)}
             FROM files
             ORDER BY modified_at ASC
             LIMIT ?
-        """, (limit,))
-        
-        results = [dict(row) for row in cursor.fetchall()]
+        """
+        results = self._list_query(conn, sql, (limit,), columns, columnar, as_json)
         conn.close()
         return results
     
@@ -200,7 +719,7 @@ class Database:
     
     def update_sha256_hash(self, file_id: int, sha256_hash: str) -> None:
         """Update SHA256 hash for a specific file."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_write_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -0,0 +1,155 @@
+"""
+Export Cache
+Renders each export (JSON, CSV, HTML report) once per catalog version and
+keeps it on disk next to catalog.db, plain and gzipped, so repeated
+downloads are file sends. Artifacts of older versions are evicted, oldest
+first, when the directory grows past a size budget. Rendering is locked per
+kind across worker processes, so each artifact is rendered once.
+"""
+
+import os
+import gzip
+import time
+import shutil
+import hashlib
+import tempfile
+from email.utils import formatdate
+from typing import Dict, Any, Optional
+from database import Database
+from export_service import ExportService
+import file_lock
+
+KINDS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv"),
+    "html": ("text/html", "html"),
+}
+
+DEFAULT_BUDGET = 512 * 1024 * 1024
+
+# A temp file untouched this long was left by a render that died
+STALE_TEMP_SECONDS = 3600
+
+
+class ExportCache:
+    def __init__(self, db_path: str, budget_bytes: int = DEFAULT_BUDGET):
+        self.db = Database(db_path)
+        self.exporter = ExportService(db_path)
+        self.budget_bytes = budget_bytes
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(db_path)), "exports")
+
+    def get(self, kind: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The artifact for the current catalog version, rendering it if needed.
+
+        Returns the plain and gzipped file paths with their ETags and
+        Last-Modified date.
+        """
+        params = params or {}
+        version = self.db.get_catalog_version()
+        key = self._key(kind, params, version)
+        path = os.path.join(self.directory, f"{kind}-{key}.{KINDS[kind][1]}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock.locked(os.path.join(self.directory, f".{kind}.lock")):
+            if not (os.path.exists(path + ".gz") and os.path.exists(path)):
+                self._render(kind, params, path)
+                self.evict(keep=path)
+
+        # Recently served artifacts are the last to go
+        now = time.time()
+        for p in (path, path + ".gz"):
+            os.utime(p, (now, now))
+
+        mtime = os.path.getmtime(path)
+        return {
+            "path": path,
+            "gz_path": path + ".gz",
+            "etag": f'"{kind}-{key}"',
+            "gz_etag": f'"{kind}-{key}-gz"',
+            "last_modified": formatdate(mtime, usegmt=True),
+            "version": version,
+        }
+
+    def regenerate(self, html_params: Optional[Dict[str, Any]] = None) -> None:
+        """Render the default artifacts for the current version (run after scans)."""
+        for kind in KINDS:
+            self.get(kind, html_params if kind == "html" else None)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Delete the least recently used artifacts until the directory fits the budget."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        except FileNotFoundError:
+            return 0
+
+        # An artifact is its plain file and its .gz, evicted together. Lock files
+        # stay, and temp files belong to renders in progress, possibly in other
+        # workers, unless they have not been written to for a long time.
+        now = time.time()
+        artifacts: Dict[str, list] = {}
+        for entry in entries:
+            if entry.name.startswith("."):
+                if entry.name.endswith(".tmp") and now - entry.stat().st_mtime > STALE_TEMP_SECONDS:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            st = entry.stat()
+            base = entry.path[:-3] if entry.path.endswith(".gz") else entry.path
+            artifact = artifacts.setdefault(base, [0.0, 0])
+            artifact[0] = max(artifact[0], st.st_mtime)
+            artifact[1] += st.st_size
+
+        total = sum(size for _, size in artifacts.values())
+        removed = 0
+        for base, (_, size) in sorted(artifacts.items(), key=lambda a: a[1][0]):
+            if total <= self.budget_bytes:
+                break
+            if base == keep:
+                continue
+            for p in (base + ".gz", base):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def _render(self, kind: str, params: Dict[str, Any], path: str) -> None:
+        prefix = "." + os.path.basename(path) + "."
+        fd, temp_path = tempfile.mkstemp(prefix=prefix, suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        fd, gz_temp_path = tempfile.mkstemp(prefix=prefix, suffix=".gz.tmp", dir=self.directory)
+        os.close(fd)
+
+        if kind == "json":
+            chunks = [self.exporter.export_json()]
+        elif kind == "csv":
+            chunks = [self.exporter.export_csv()]
+        else:
+            chunks = self.exporter.stream_html(**params)
+
+        try:
+            with open(temp_path, "w", encoding="utf-8", newline="") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            with open(temp_path, "rb") as src, gzip.open(gz_temp_path, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+            # The .gz appears last and is removed first, so it marks a complete artifact
+            os.replace(temp_path, path)
+            os.replace(gz_temp_path, path + ".gz")
+        except BaseException:
+            for p in (temp_path, gz_temp_path):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            raise
+
+    def _key(self, kind: str, params: Dict[str, Any], version: str) -> str:
+        raw = f"{kind}|{sorted(params.items())}|{self.db.db_path}|{version}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
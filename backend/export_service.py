@@ -3,27 +3,38 @@ Export Service
 Generates export reports in multiple formats: JSON, CSV, HTML
 """
 
+import os
 import json
+import sqlite3
 import csv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
 from io import StringIO
 from datetime import datetime
+from functools import lru_cache
 from database import Database
+from report_builder import ReportBuilder
+
+
+# Columns of the full-catalog exports; id is the resume cursor
+FULL_EXPORT_COLUMNS = [
+    "id", "path", "filename", "extension", "size_bytes", "created_at", "modified_at",
+    "md5_hash", "sha256_hash", "sha256_verified",
+]
 
 
 class ExportService:
     def __init__(self, db_path: str):
         self.db = Database(db_path)
+        self.builder = ReportBuilder(db_path)
     
     def export_json(self) -> str:
         """Export all data as JSON with structure matching requirements."""
-        stats = self.db.get_stats()
-        duplicates = self.db.get_duplicates()
-        largest = self.db.get_largest_files(100) # Top 100
-        oldest = self.db.get_oldest_files(100)   # Top 100
+        report = self.builder.build(100, 100)  # Top 100
+        stats = report["stats"]
+        duplicates = report["duplicates"]
         
         data = {
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": report["generated_at"].isoformat(),
             "summary": {
                 "total_files": stats["total_files"],
                 "total_size_bytes": stats["total_size"],
@@ -31,12 +42,12 @@ class ExportService:
             },
             "file_type_distribution": stats["extensions"],
             "duplicates": {
-                "total_groups": len(duplicates),
-                "total_wasted_space": sum(d['wasted_space'] for d in duplicates),
+                "total_groups": report["duplicate_groups"],
+                "total_wasted_space": report["wasted_space"],
                 "groups": duplicates
             },
-            "largest_files": largest,
-            "oldest_files": oldest
+            "largest_files": report["largest_files"],
+            "oldest_files": report["oldest_files"]
         }
         
         return json.dumps(data, indent=2, ensure_ascii=False)
@@ -46,14 +57,15 @@ class ExportService:
         output = StringIO()
         writer = csv.writer(output)
         
-        stats = self.db.get_stats()
-        duplicates = self.db.get_duplicates()
-        largest = self.db.get_largest_files(100)
-        oldest = self.db.get_oldest_files(100)
+        report = self.builder.build(100, 100)
+        stats = report["stats"]
+        duplicates = report["duplicates"]
+        largest = report["largest_files"]
+        oldest = report["oldest_files"]
         
         # --- SECTION 1: SUMARIO ---
         writer.writerow(['--- SUMÁRIO ---'])
-        writer.writerow(['Data do Relatório', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+        writer.writerow(['Data do Relatório', report["generated_at"].strftime('%Y-%m-%d %H:%M:%S')])
         writer.writerow(['Total de Arquivos', stats['total_files']])
         writer.writerow(['Tamanho Total', self._format_bytes(stats['total_size'])])
         writer.writerow([])
@@ -111,287 +123,135 @@ class ExportService:
             
         return output.getvalue()
     
+    def stream_full_csv(self, query: str = "", extension: Optional[str] = None,
+                        min_size: Optional[int] = None, max_size: Optional[int] = None,
+                        after_id: Optional[int] = None) -> Iterator[str]:
+        """Every matching row as CSV, one chunk per batch. The header is left out when resuming."""
+        output = StringIO()
+        writer = csv.writer(output)
+        if after_id is None:
+            writer.writerow(FULL_EXPORT_COLUMNS)
+        
+        for rows in self.db.iter_files(FULL_EXPORT_COLUMNS, query, extension, min_size, max_size, after_id):
+            writer.writerows(rows)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        
+        if output.tell():
+            yield output.getvalue()
+    
+    def stream_full_ndjson(self, query: str = "", extension: Optional[str] = None,
+                           min_size: Optional[int] = None, max_size: Optional[int] = None,
+                           after_id: Optional[int] = None) -> Iterator[str]:
+        """Every matching row as one JSON object per line, one chunk per batch."""
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        for rows in self.db.iter_files(FULL_EXPORT_COLUMNS, query, extension, min_size, max_size, after_id):
+            yield "".join(encode(dict(zip(FULL_EXPORT_COLUMNS, row))) + "\n" for row in rows)
+    
+    def export_sqlite(self, dest_path: str, root: Optional[str] = None) -> Dict[str, Any]:
+        """Write a consistent, compacted copy of the catalog to dest_path (new or empty file).
+        
+        Both paths read inside a single transaction, which in WAL mode never
+        blocks the engine's writer or other readers. The whole catalog goes
+        through VACUUM INTO. A subtree copies the files table, restricted to
+        the path range, into a fresh database and then builds its indexes.
+        """
+        if root is None:
+            conn = self.db.get_connection()
+            conn.execute("VACUUM INTO ?", (dest_path,))
+            conn.close()
+        else:
+            source = self.db.get_connection()
+            schema = source.execute("""
+                SELECT type, sql FROM sqlite_master
+                WHERE tbl_name = 'files' AND sql IS NOT NULL
+            """).fetchall()
+            source.close()
+            
+            conn = sqlite3.connect(dest_path)
+            for row in schema:
+                if row["type"] == "table":
+                    conn.execute(row["sql"])
+            conn.execute("ATTACH DATABASE ? AS source", (self.db.db_path,))
+            with conn:
+                conn.execute("""
+                    INSERT INTO main.files SELECT * FROM source.files
+                    WHERE path >= ? AND path < ?
+                    ORDER BY path
+                """, Database.subtree_range(root))
+            conn.execute("DETACH DATABASE source")
+            for row in schema:
+                if row["type"] == "index":
+                    conn.execute(row["sql"])
+            conn.commit()
+            conn.close()
+        
+        conn = sqlite3.connect(dest_path)
+        files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        conn.close()
+        return {"files": files, "bytes": os.path.getsize(dest_path)}
+    
     def _format_bytes(self, bytes_val):
         """Helper to format bytes."""
-        if not bytes_val: return '0 B'
-        k = 1024
-        sizes = ['B', 'KB', 'MB', 'GB', 'TB']
-        i = 0
-        while bytes_val >= k and i < len(sizes) - 1:
-            bytes_val /= k
-            i += 1
-        return f"{bytes_val:.2f} {sizes[i]}"
+        return format_bytes(bytes_val)
 
-    def export_html(self) -> str:
+    def export_html(self, limit: int = 100, duplicate_limit: int = 50) -> str:
         """Export comprehensive report as self-contained HTML."""
-        stats = self.db.get_stats()
-        duplicates = self.db.get_duplicates()
-        largest = self.db.get_largest_files(100)
-        oldest = self.db.get_oldest_files(100)
-        
-        # Build HTML
-        html = f"""<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Relatório do Catalogador Inteligente - {datetime.now().strftime('%Y-%m-%d')}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 2rem;
-            line-height: 1.6;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-            overflow: hidden;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 3rem 2rem;
-            text-align: center;
-        }}
-        
-        .header h1 {{
-            font-size: 2.5rem;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .header p {{
-            font-size: 1.125rem;
-            opacity: 0.9;
-        }}
-        
-        .content {{
-            padding: 2rem;
-        }}
-        
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 1.5rem;
-            margin-bottom: 3rem;
-        }}
-        
-        .stat-card {{
-            background: #f8f9fa;
-            padding: 1.5rem;
-            border-radius: 12px;
-            text-align: center;
-            border-left: 4px solid #667eea;
-        }}
-        
-        .stat-value {{
-            font-size: 2rem;
-            font-weight: 700;
-            color: #667eea;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .stat-label {{
-            color: #6c757d;
-            font-size: 0.875rem;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        
-        .section {{
-            margin-bottom: 3rem;
-        }}
-        
-        .section h2 {{
-            font-size: 1.75rem;
-            margin-bottom: 1.5rem;
-            color: #2d3748;
-            border-bottom: 3px solid #667eea;
-            padding-bottom: 0.5rem;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            background: white;
-            border-radius: 8px;
-            overflow: hidden;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
-        }}
-        
-        th {{
-            background: #667eea;
-            color: white;
-            padding: 1rem;
-            text-align: left;
-            font-weight: 600;
-        }}
-        
-        td {{
-            padding: 0.875rem 1rem;
-            border-bottom: 1px solid #e9ecef;
-        }}
-        
-        tr:last-child td {{
-            border-bottom: none;
-        }}
-        
-        tr:hover {{
-            background: #f8f9fa;
-        }}
-        
-        .duplicate-group {{
-            background: #fff3cd;
-            border-left: 4px solid #ffc107;
-            padding: 1rem;
-            margin-bottom: 1rem;
-            border-radius: 8px;
-        }}
-        
-        .duplicate-header {{
-            font-weight: 600;
-            color: #856404;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .file-path {{
-            font-family: 'Courier New', monospace;
-            font-size: 0.875rem;
-            color: #495057;
-            padding: 0.25rem 0;
-        }}
-        
-        .footer {{
-            background: #f8f9fa;
-            padding: 2rem;
-            text-align: center;
-            color: #6c757d;
-            font-size: 0.875rem;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📁 Relatório do Catalogador Inteligente</h1>
-            <p>Gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</p>
-        </div>
-        
-        <div class="content">
-            <div class="stats-grid">
-                <div class="stat-card">
-                    <div class="stat-value">{stats['total_files']:,}</div>
-                    <div class="stat-label">Total de Arquivos</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-value">{self._format_bytes(stats['total_size'])}</div>
-                    <div class="stat-label">Tamanho Total</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-value">{len(duplicates)}</div>
-                    <div class="stat-label">Grupos Duplicados</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-value">{sum(d['count'] for d in duplicates)}</div>
-                    <div class="stat-label">Arquivos Duplicados</div>
-                </div>
-            </div>
-            
-            <div class="section">
-                <h2>📊 Top 10 Extensões por Tamanho</h2>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Extensão</th>
-                            <th>Quantidade</th>
-                            <th>Tamanho Total</th>
-                        </tr>
-                    </thead>
-                    <tbody>"""
-        
-        # Extensions table
-        for ext in stats['extensions'][:10]:
-            html += f"""
-                        <tr>
-                            <td><strong>{ext['extension'] or 'Sem extensão'}</strong></td>
-                            <td>{ext['count']:,}</td>
-                            <td>{self._format_bytes(ext['total_size'])}</td>
-                        </tr>"""
-        
-        html += """
-                    </tbody>
-                </table>
-            </div>
-            
-            <div class="section">
-                <h2>📦 100 Maiores Arquivos</h2>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>#</th>
-                            <th>Arquivo</th>
-                            <th>Tamanho</th>
-                        </tr>
-                    </thead>
-                    <tbody>"""
-        
-        # Largest files table
-        for idx, file in enumerate(largest[:100], 1):
-            html += f"""
-                        <tr>
-                            <td>{idx}</td>
-                            <td class="file-path">{file['path']}</td>
-                            <td><strong>{self._format_bytes(file['size_bytes'])}</strong></td>
-                        </tr>"""
-                        
-        html += """
-                    </tbody>
-                </table>
-            </div>"""
-        
-        # Duplicates section
-        if duplicates:
-            html += """
-            <div class="section">
-                <h2>📋 Arquivos Duplicados</h2>"""
-            
-            for dup in duplicates[:50]:  # Limit to top 50
-                html += f"""
-                <div class="duplicate-group">
-                    <div class="duplicate-header">
-                        MD5: {dup['md5_hash']} • {dup['count']} cópias • 
-                        Desperdiçado: {self._format_bytes(dup['wasted_space'])}
-                    </div>"""
-                
-                for path in dup['paths']:
-                    html += f'<div class="file-path">{path}</div>'
-                
-                html += """
-                </div>"""
-            
-            html += """
-            </div>"""
-        
-        html += f"""
-        </div>
-        
-        <div class="footer">
-            <strong>Catalogador Inteligente de Arquivos</strong><br>
-            Este relatório foi gerado automaticamente em {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        return html
+        return "".join(self.stream_html(limit, duplicate_limit))
+
+    def stream_html(self, limit: int = 100, duplicate_limit: int = 50) -> Iterator[str]:
+        """Render the HTML report incrementally, in chunks of about 64 KB."""
+        report = self.builder.build(limit, 0, duplicate_limit)
+
+        template = _templates().get_template("report.html")
+        parts = template.generate(
+            generated_at=report["generated_at"],
+            stats=report["stats"],
+            largest=report["largest_files"],
+            limit=limit,
+            duplicates=report["duplicates"],
+            duplicate_groups=report["duplicate_groups"],
+            duplicate_files=report["duplicate_files"],
+        )
+
+        buffer = []
+        size = 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= 64 * 1024:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+
+def format_bytes(bytes_val) -> str:
+    """Format a byte count as B/KB/MB/GB/TB."""
+    if not bytes_val: return '0 B'
+    k = 1024
+    sizes = ['B', 'KB', 'MB', 'GB', 'TB']
+    i = 0
+    while bytes_val >= k and i < len(sizes) - 1:
+        bytes_val /= k
+        i += 1
+    return f"{bytes_val:.2f} {sizes[i]}"
+
+
+@lru_cache(maxsize=None)
+def _templates():
+    """The template environment, created (and Jinja2 imported) on the first HTML export.
+    
+    Templates are compiled on first use and kept; auto_reload off skips the per-render stat.
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    
+    environment = Environment(
+        loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+    environment.filters["format_bytes"] = format_bytes
+    environment.filters["thousands"] = lambda n: f"{n:,}"
+    return environment
@@ -0,0 +1,53 @@
+"""
+File Lock
+Exclusive locks on files next to the catalog, which every worker process of
+a multi-worker server sees (flock on POSIX, msvcrt.locking on Windows). A
+lock is released when its file is closed, or when the process holding it dies.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+POLL_INTERVAL = 0.05
+
+
+def acquire(path: str, blocking: bool = True) -> Optional[IO]:
+    """Lock path, creating it if needed. Returns the open lock file, or None if
+    not blocking and another holder has it."""
+    lock_file = open(path, "a+b")
+    # msvcrt locks bytes from the current position: always the first one
+    lock_file.seek(0)
+    while True:
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except OSError:
+            if not blocking:
+                lock_file.close()
+                return None
+            time.sleep(POLL_INTERVAL)
+
+
+def release(lock_file: IO) -> None:
+    if os.name == "nt":
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    lock_file.close()
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Hold the lock on path for the duration of the block, waiting for it if needed."""
+    lock_file = acquire(path)
+    try:
+        yield
+    finally:
+        release(lock_file)
@@ -0,0 +1,133 @@
+"""
+Histogram Service
+Size (log2 buckets) and age distributions of the catalog, optionally limited
+to one extension or one subtree. Computed in a single pass over chunked reads
+with NumPy, so memory stays bounded. The endpoints cache the results per
+catalog version through the shared result cache.
+"""
+
+import time
+from typing import List, Dict, Any, Optional
+from database import Database
+import lazy_import
+
+# Only imported when the first histogram is computed
+np = lazy_import.optional("numpy")
+
+DAY = 24 * 60 * 60
+
+# (label, lower bound in days); each bucket ends where the next one starts
+AGE_BUCKETS = [
+    ("< 1 dia", 0),
+    ("1-7 dias", 1),
+    ("7-30 dias", 7),
+    ("1-3 meses", 30),
+    ("3-6 meses", 90),
+    ("6-12 meses", 180),
+    ("1-2 anos", 365),
+    ("2-5 anos", 730),
+    ("5-10 anos", 1825),
+    ("> 10 anos", 3650),
+]
+
+SIZE_BUCKETS = 65  # bucket 0 holds empty files, bucket k holds [2^(k-1), 2^k)
+
+
+def is_available() -> bool:
+    """True if NumPy is installed."""
+    return np is not None
+
+
+class HistogramService:
+    def __init__(self, db_path: str, chunk_size: int = 100000):
+        self.db = Database(db_path)
+        self.chunk_size = chunk_size
+
+    def size_histogram(self, extension: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+        """Count and bytes per power-of-two size bucket."""
+        return self._compute_size(extension, path)
+
+    def age_histogram(self, extension: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+        """Count and bytes per modification-age bucket."""
+        return self._compute_age(extension, path)
+
+    def _compute_size(self, extension: Optional[str], path: Optional[str]) -> Dict[str, Any]:
+        counts = np.zeros(SIZE_BUCKETS, dtype=np.int64)
+        totals = np.zeros(SIZE_BUCKETS, dtype=np.float64)
+
+        for sizes, _ in self._chunks(extension, path):
+            # frexp exponent: 0 -> 0, 1 -> 1, 2..3 -> 2, 4..7 -> 3, ...
+            buckets = np.frexp(sizes.astype(np.float64))[1]
+            counts += np.bincount(buckets, minlength=SIZE_BUCKETS)
+            totals += np.bincount(buckets, weights=sizes, minlength=SIZE_BUCKETS)
+
+        buckets = []
+        for k in np.nonzero(counts)[0]:
+            buckets.append({
+                "min_bytes": 0 if k == 0 else 2 ** (int(k) - 1),
+                "max_bytes": 0 if k == 0 else 2 ** int(k) - 1,
+                "count": int(counts[k]),
+                "total_bytes": int(totals[k]),
+            })
+        return self._result(buckets, counts, totals)
+
+    def _compute_age(self, extension: Optional[str], path: Optional[str]) -> Dict[str, Any]:
+        edges = np.array([days * DAY for _, days in AGE_BUCKETS], dtype=np.int64)
+        # One extra bucket at the end for files without a modification time
+        unknown = len(AGE_BUCKETS)
+        counts = np.zeros(unknown + 1, dtype=np.int64)
+        totals = np.zeros(unknown + 1, dtype=np.float64)
+        now = int(time.time())
+
+        for sizes, mtimes in self._chunks(extension, path):
+            ages = now - mtimes
+            buckets = np.searchsorted(edges, ages, side="right") - 1
+            buckets[buckets < 0] = 0  # modified "in the future": clock skew
+            buckets[mtimes <= 0] = unknown  # NULL, or 0 written by the engine when unavailable
+            counts += np.bincount(buckets, minlength=unknown + 1)
+            totals += np.bincount(buckets, weights=sizes, minlength=unknown + 1)
+
+        labels = [label for label, _ in AGE_BUCKETS] + ["Desconhecida"]
+        buckets = []
+        for k, label in enumerate(labels):
+            if k == unknown and counts[k] == 0:
+                continue
+            buckets.append({
+                "label": label,
+                "min_days": AGE_BUCKETS[k][1] if k < unknown else None,
+                "max_days": AGE_BUCKETS[k + 1][1] if k + 1 < unknown else None,
+                "count": int(counts[k]),
+                "total_bytes": int(totals[k]),
+            })
+        return self._result(buckets, counts, totals)
+
+    def _result(self, buckets: List[Dict[str, Any]], counts, totals) -> Dict[str, Any]:
+        return {
+            "buckets": buckets,
+            "total_files": int(counts.sum()),
+            "total_bytes": int(totals.sum()),
+        }
+
+    def _chunks(self, extension: Optional[str], path: Optional[str]):
+        """Yield (sizes, mtimes) arrays chunk by chunk; NULL mtimes become -1."""
+        sql = "SELECT size_bytes, COALESCE(modified_at, -1) FROM files WHERE 1=1"
+        params: List[Any] = []
+        if extension:
+            sql += " AND extension = ?"
+            params.append(extension)
+        if path:
+            sql += " AND path >= ? AND path < ?"
+            params.extend(Database.subtree_range(path))
+
+        conn = self.db.get_connection()
+        conn.row_factory = None
+        cursor = conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                data = np.array(rows, dtype=np.int64)
+                yield data[:, 0], data[:, 1]
+        finally:
+            conn.close()
@@ -0,0 +1,168 @@
+"""
+Ingest Service
+Bulk-loads file entries streamed by remote scan agents as NDJSON (optionally
+gzip-compressed), one engine FileEntry per line, in large transactions.
+"""
+
+import re
+import json
+import time
+import zlib
+from operator import itemgetter
+from typing import List, Dict, Any, Optional
+from database import Database
+
+REQUIRED_FIELDS = ("path", "filename", "size_bytes", "md5_hash")
+OPTIONAL_FIELDS = ("extension", "created_at", "modified_at", "sha256_hash")
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+MD5_RE = re.compile(r"[0-9a-f]{32}")
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class IngestError(ValueError):
+    """A line of the upload is not a valid file entry; nothing after it is written."""
+
+
+class IngestService:
+    def __init__(self, db_path: str, compressed: bool = False, batch_size: int = 50000):
+        self.db = Database(db_path)
+        self.batch_size = batch_size
+        self._decompressor = zlib.decompressobj(GZIP_WBITS) if compressed else None
+        self._remainder = b""
+        self._batch: List[Dict[str, Any]] = []
+        self._conn = None
+
+        self.root: Optional[str] = None
+        self.generation = 0
+        self.lines = 0
+        self.rows = 0
+        self.bytes_received = 0
+        self.started_at = time.time()
+
+    def begin(self, root: Optional[str] = None) -> None:
+        """Open the writer. With a root, the upload is treated as a full scan of it."""
+        self.root = root
+        self.generation = self.db.begin_scan_run(root) if root else self.db.get_latest_generation(include_running=True)
+        # Used from several worker threads, but only ever by one at a time
+        self._conn = self.db.get_write_connection(check_same_thread=False)
+        self._conn.execute("PRAGMA cache_size = -64000")
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse the complete lines in chunk; the trailing partial line waits for the next one."""
+        self.bytes_received += len(chunk)
+        if self._decompressor:
+            chunk = self._decompress(chunk)
+
+        lines = (self._remainder + chunk).split(b"\n")
+        self._remainder = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+
+    def finish(self) -> Dict[str, Any]:
+        """Write what is left, reconcile the root if one was given and report throughput."""
+        if self._decompressor:
+            self._remainder += self._decompressor.flush()
+            if self.bytes_received and not self._decompressor.eof:
+                raise zlib.error("truncated gzip stream")
+        if self._remainder:
+            self._parse_line(self._remainder)
+            self._remainder = b""
+        self._write()
+        self._conn.close()
+
+        summary: Dict[str, Any] = {
+            "rows": self.rows,
+            "bytes_received": self.bytes_received,
+            "generation": self.generation,
+        }
+        if self.root:
+            summary.update(self.db.finish_scan_run(self.generation, self.root, self.rows))
+
+        duration = max(time.time() - self.started_at, 0.001)
+        summary["duration_seconds"] = round(duration, 3)
+        summary["rows_per_sec"] = round(self.rows / duration, 1)
+        return summary
+
+    def abort(self) -> None:
+        """Release the writer after a failed upload; rows already committed stay.
+        
+        A rooted upload's scan run is marked failed, so it never becomes the
+        latest generation.
+        """
+        if self._conn:
+            self._conn.close()
+        if self.root and self.generation:
+            self.db.end_scan_run(self.generation, "failed")
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        """Inflate chunk, following on into the next member of a multi-member gzip stream.
+        
+        Bytes after a member that do not start a valid one raise zlib.error.
+        """
+        out = []
+        while chunk:
+            if self._decompressor.eof:
+                self._decompressor = zlib.decompressobj(GZIP_WBITS)
+            out.append(self._decompressor.decompress(chunk))
+            chunk = self._decompressor.unused_data if self._decompressor.eof else b""
+        return b"".join(out)
+
+    def _parse_line(self, line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        self.lines += 1
+
+        # A skipped row would be purged as vanished by a rooted upload, so any bad line fails it
+        try:
+            entry = json.loads(line)
+            _validate(entry)
+        except ValueError as e:
+            raise IngestError(f"line {self.lines}: {e}")
+
+        for field in OPTIONAL_FIELDS:
+            entry.setdefault(field, None)
+        self._batch.append(entry)
+
+        if len(self._batch) >= self.batch_size:
+            self._write()
+
+    def _write(self) -> None:
+        if not self._batch:
+            return
+        # Path order keeps inserts into the path indexes local
+        self._batch.sort(key=itemgetter("path"))
+        self.db.upsert_files(self._batch, self.generation, self._conn)
+        self.rows += len(self._batch)
+        self._batch = []
+
+
+def _validate(entry: Any) -> None:
+    """Check the fields of one entry against the catalog's types."""
+    if not isinstance(entry, dict):
+        raise ValueError("expected a JSON object")
+    missing = [f for f in REQUIRED_FIELDS if entry.get(f) is None]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    for field in ("path", "filename"):
+        if not isinstance(entry[field], str) or not entry[field]:
+            raise ValueError(f"{field} must be a non-empty string")
+    if entry.get("extension") is not None and not isinstance(entry["extension"], str):
+        raise ValueError("extension must be a string or null")
+    if not _is_int(entry["size_bytes"]) or entry["size_bytes"] < 0:
+        raise ValueError("size_bytes must be a non-negative integer")
+    for field in ("created_at", "modified_at"):
+        if entry.get(field) is not None and not _is_int(entry[field]):
+            raise ValueError(f"{field} must be an integer (Unix time) or null")
+    if not isinstance(entry["md5_hash"], str) or not MD5_RE.fullmatch(entry["md5_hash"]):
+        raise ValueError("md5_hash must be 32 lowercase hex characters")
+    sha256 = entry.get("sha256_hash")
+    if sha256 is not None and (not isinstance(sha256, str) or not SHA256_RE.fullmatch(sha256)):
+        raise ValueError("sha256_hash must be 64 lowercase hex characters or null")
+
+
+def _is_int(value: Any) -> bool:
+    # JSON true/false load as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
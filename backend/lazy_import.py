@@ -0,0 +1,30 @@
+"""
+Lazy Import
+Defers importing heavy optional modules (NumPy) until first use, so they
+do not add to startup time when the features that need them are off.
+"""
+
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def optional(name: str) -> Optional[LazyModule]:
+    """A lazy handle on name if it is installed, else None (checked without importing it)."""
+    if importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
@@ -1,19 +1,184 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, HTTPException, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, Response, StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import os
-from database import Database
+from database import Database, json_available
 from sha256_computer import compute_multiple
 from export_service import ExportService
 from ai_service import AIService
+from refresh_service import start_refresh, get_refresh_status
+from scan_manager import ScanManager, ScanConflictError
+from watcher_service import WatcherService
+from ingest_service import IngestService, IngestError
+import columnar_snapshot
+import histogram_service
+from histogram_service import HistogramService
+from cube_service import CubeService
+from snapshot_service import SnapshotService
+from compression import accepts_gzip, add_vary, gzip_chunks, gzip_body
+import metrics
+from export_cache import ExportCache, KINDS as EXPORT_KINDS
+from trend_service import TrendService
+from batch_service import BatchService
+from result_cache import ResultCache
+from warmup import Warmup
+import admission
+import file_lock
+from admission import AdmissionRejected
+import zlib
+import tempfile
+import hashlib
+from contextlib import asynccontextmanager
 import json
 import time
-from datetime import datetime
+from datetime import datetime, date
 
-app = FastAPI(title="Smart File Cataloger API")
+# Database path - default to ../data/catalog.db
+DB_PATH = os.environ.get("DB_PATH", "../data/catalog.db")
+
+# Engine binary used by /api/scans
+ENGINE_PATH = os.environ.get(
+    "ENGINE_PATH",
+    os.path.join("..", "engine", "target", "release", "engine.exe" if os.name == "nt" else "engine")
+)
+
+# Serve largest/oldest/stats from the in-memory NumPy snapshot (requires numpy)
+COLUMNAR_SNAPSHOT = os.environ.get("COLUMNAR_SNAPSHOT") == "1" and columnar_snapshot.is_available()
+
+# Have SQLite render the JSON of search/largest/oldest (json_group_array), skipping Python rows
+SQLITE_JSON = os.environ.get("SQLITE_JSON") == "1" and json_available()
+
+# Default size of the HTML report
+REPORT_LIMIT = int(os.environ.get("REPORT_LIMIT", "100"))
+REPORT_DUPLICATE_LIMIT = int(os.environ.get("REPORT_DUPLICATE_LIMIT", "50"))
+
+# Disk budget for rendered export artifacts (<dbdir>/exports)
+EXPORT_CACHE_BYTES = int(os.environ.get("EXPORT_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+# JSON bodies at least this large are gzipped for clients that accept it;
+# from COMPRESS_THREAD_BYTES on, compression runs in the threadpool
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", str(16 * 1024)))
+COMPRESS_THREAD_BYTES = int(os.environ.get("COMPRESS_THREAD_BYTES", str(512 * 1024)))
+
+# Scan snapshots kept for /api/diff
+SNAPSHOT_RETENTION = int(os.environ.get("SNAPSHOT_RETENTION", "10"))
+
+# Admission control: "concurrency limit,queue depth,queue timeout seconds" per request class.
+# The limits live in each worker process: with WORKERS > 1 every worker enforces
+# them on its own, so the server as a whole admits up to WORKERS times as many.
+REQUEST_CLASSES = {
+    name: admission.parse_class(name, os.environ.get(f"ADMISSION_{name.upper()}", default))
+    for name, default in (
+        ("light", "32,256,5"),
+        ("heavy", "2,8,30"),
+        ("export", "2,4,60"),
+        ("hashing", "1,4,60"),
+        ("ingest", "2,4,120"),
+    )
+}
+
+# Worker processes (uvicorn --workers); results of expensive views are shared between
+# them through result_cache.db next to the catalog
+WORKERS = int(os.environ.get("WORKERS", "1"))
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "1") == "1"
+
+# Startup warm-up: prewarm these indexes and precompute the landing-page aggregates
+# before /health/ready reports ready
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+HOT_INDEXES = ["idx_size", "idx_md5", "idx_path_generation", "idx_extension", "idx_size_cover", "idx_modified_cover"]
+
+scan_manager = ScanManager(DB_PATH, ENGINE_PATH)
+watcher = WatcherService(DB_PATH)
+result_cache = ResultCache(DB_PATH)
+warmup = Warmup()
+
+def take_snapshot():
+    SnapshotService(DB_PATH, SNAPSHOT_RETENTION).take()
+
+def rebuild_cube():
+    CubeService(DB_PATH).rebuild()
+
+def record_trends():
+    TrendService(DB_PATH).record()
+
+def reload_columnar_snapshot():
+    columnar_snapshot.get_snapshot(DB_PATH)
+
+def regenerate_exports():
+    ExportCache(DB_PATH, EXPORT_CACHE_BYTES).regenerate(
+        {"limit": REPORT_LIMIT, "duplicate_limit": REPORT_DUPLICATE_LIMIT}
+    )
+
+# Derived data refreshed after every completed scan (supervised scan or agent upload).
+# Exports go last: they are keyed by catalog version, which the other hooks change.
+post_scan_hooks = [take_snapshot, rebuild_cube, record_trends, regenerate_exports]
+if COLUMNAR_SNAPSHOT:
+    # After the hooks that write to catalog.db, so the rebuilt snapshot is current
+    # and the next /api/largest does not pay for it
+    post_scan_hooks.append(reload_columnar_snapshot)
+
+def run_post_scan_hooks():
+    for hook in post_scan_hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"Post-scan hook {hook.__name__} failed: {e}")
+
+scan_manager.add_completion_hook(lambda job: run_post_scan_hooks())
+
+_primary_lock = None
+
+def claim_primary() -> bool:
+    """True in exactly one worker process, which then runs the singletons (the watcher).
+    
+    Holds an exclusive lock on a file next to the catalog for the life of the process.
+    """
+    global _primary_lock
+    if _primary_lock is not None:
+        return True
+    _primary_lock = file_lock.acquire(
+        os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), ".primary.lock"), blocking=False
+    )
+    return _primary_lock is not None
+
+def cached_json(name: str, params: dict, compute):
+    """Serve compute() from the shared result cache, computing it once per catalog version."""
+    if not RESULT_CACHE:
+        return compute()
+    body = result_cache.get_or_compute(name, params, compute)
+    return Response(content=body, media_type="application/json")
+
+def warmup_steps():
+    """Named startup steps; the aggregates go through the result cache under the keys
+    their endpoints use, so the first requests (in any worker) are cache hits."""
+    db = Database(DB_PATH)
+    steps = [("indexes", lambda: db.prewarm_indexes(HOT_INDEXES))]
+    if COLUMNAR_SNAPSHOT:
+        steps.append(("columnar_snapshot", lambda: columnar_snapshot.get_snapshot(DB_PATH)))
+    if RESULT_CACHE:
+        if not COLUMNAR_SNAPSHOT:
+            steps.append(("stats", lambda: result_cache.get_or_compute("stats", {}, db.get_stats)))
+        steps.append(("tree", lambda: result_cache.get_or_compute(
+            "tree", {"path": "", "depth": 1}, lambda: db.get_tree_structure("", 1))))
+        steps.append(("duplicates", lambda: result_cache.get_or_compute("duplicates", {}, db.get_duplicates)))
+    return steps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    Database(DB_PATH).ensure_schema()
+    scan_manager.recover()
+    if os.environ.get("WATCH_CATALOG") == "1" and claim_primary():
+        watcher.start()
+    warmup.start(warmup_steps() if WARMUP else [])
+    yield
+    watcher.stop()
+
+app = FastAPI(title="Smart File Cataloger API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,47 +188,278 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database path - default to ../data/catalog.db
-DB_PATH = os.environ.get("DB_PATH", "../data/catalog.db")
+# GETs whose result is not a function of the catalog alone (process state, status
+# files) or that set their own validators
+UNVERSIONED_PATHS = ("/health", "/api/scan_progress", "/api/scans", "/api/watcher", "/api/refresh", "/api/export",
+                     "/api/metrics")
+# GETs that also depend on the clock (ages relative to today): their ETag includes the date
+DATED_PATHS = ("/api/histograms/age", "/api/suggestions")
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Hold each request to its class's concurrency limit; 429 when the class is saturated.
+    
+    Innermost, so 304s and compression do not occupy slots. A buffered
+    response frees its slot as soon as the endpoint returns; a streamed body
+    does its work as it is sent, so it keeps the slot until the stream ends
+    or the response finishes sending, whichever comes first.
+    """
+    request_class = REQUEST_CLASSES.get(admission.classify(request.url.path))
+    if request_class is None:
+        return await call_next(request)
+    
+    try:
+        await request_class.acquire()
+    except AdmissionRejected as e:
+        return JSONResponse({"detail": str(e)}, status_code=429,
+                            headers={"Retry-After": str(e.retry_after)})
+    
+    start = time.perf_counter()
+    released = False
+    
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            request_class.release(time.perf_counter() - start)
+    
+    streamed = False
+    try:
+        response = await call_next(request)
+        if "content-length" not in response.headers:
+            body = response.body_iterator
+            
+            async def release_when_sent():
+                try:
+                    async for chunk in body:
+                        yield chunk
+                finally:
+                    release()
+            
+            response.body_iterator = release_when_sent()
+            # Runs once the response is sent even if the body was never iterated
+            response.background = BackgroundTask(release)
+            streamed = True
+        return response
+    finally:
+        if not streamed:
+            release()
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETag every catalog read by catalog version and parameters; answer If-None-Match with 304.
+    
+    The check happens before the endpoint runs, so an unchanged view costs
+    one catalog_meta lookup instead of its queries.
+    """
+    path = request.url.path
+    if request.method != "GET" or not path.startswith("/api/") or path.startswith(UNVERSIONED_PATHS):
+        return await call_next(request)
+    
+    version = Database(DB_PATH).get_catalog_version()
+    if path.startswith(DATED_PATHS):
+        version += f"|{date.today().isoformat()}"
+    raw = f"{version}|{path}|{sorted(request.query_params.multi_items())}"
+    etag = f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    # Weak comparison: the gzipped body carries the same tag as W/"..."
+    if if_none_match and (etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+                          or if_none_match.strip() == "*"):
+        return Response(status_code=304, headers=headers)
+    
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+@app.middleware("http")
+async def compress_json(request: Request, call_next):
+    """Gzip buffered JSON responses above COMPRESS_MIN_BYTES and record the ratio.
+    
+    Every buffered JSON response carries Vary: Accept-Encoding, compressed or
+    not, so a shared cache never hands a gzipped body to a client that did
+    not ask for one, or the other way round. Streams and files (exports)
+    have no Content-Length here and are left to their own endpoints.
+    """
+    response = await call_next(request)
+    if ("content-length" not in response.headers
+            or not response.headers.get("content-type", "").startswith("application/json")
+            or "content-encoding" in response.headers):
+        return response
+    
+    add_vary(response.headers, "Accept-Encoding")
+    if (int(response.headers["content-length"]) < COMPRESS_MIN_BYTES
+            or not accepts_gzip(request.headers.get("accept-encoding", ""))):
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    start = time.perf_counter()
+    if len(body) >= COMPRESS_THREAD_BYTES:
+        compressed = await run_in_threadpool(gzip_body, body)
+    else:
+        compressed = gzip_body(body)
+    
+    metrics.increment("compression.responses")
+    metrics.increment("compression.bytes_in", len(body))
+    metrics.increment("compression.bytes_out", len(compressed))
+    metrics.observe("compression.ratio", len(body) / max(len(compressed), 1))
+    metrics.observe("compression.seconds", time.perf_counter() - start)
+    
+    headers = dict(response.headers)
+    headers.update({"content-encoding": "gzip", "content-length": str(len(compressed))})
+    if "etag" in headers and not headers["etag"].startswith("W/"):
+        headers["etag"] = "W/" + headers["etag"]
+    return Response(content=compressed, status_code=response.status_code, headers=headers)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get in-process counters and summaries, and the state of each request class.
+    
+    With WORKERS > 1 these are the answering worker's alone, identified by pid.
+    """
+    return {
+        "pid": os.getpid(),
+        **metrics.snapshot(),
+        "admission": {name: c.status() for name, c in REQUEST_CLASSES.items()},
+    }
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "Smart Cataloger Backend"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Ready once the startup warm-up has finished; 503 until then."""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if warmup.is_ready() else 503)
+
 @app.get("/api/stats")
-async def get_stats():
+def get_stats():
     """Get overall statistics."""
+    if COLUMNAR_SNAPSHOT:
+        return columnar_snapshot.get_snapshot(DB_PATH).get_stats()
     db = Database(DB_PATH)
-    return db.get_stats()
+    return cached_json("stats", {}, db.get_stats)
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a fields= parameter; None (no projection) when absent or empty."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()] or None
+
+def columnar_fields(fields: Optional[List[str]], available: set) -> bool:
+    """True if the columnar snapshot's rows have every requested field; if not, SQL answers."""
+    return fields is None or set(fields) <= available
+
+def project(rows: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    if fields is None:
+        return rows
+    return [{f: row[f] for f in fields} for row in rows]
+
+FORMAT_DESCRIPTION = "rows (a list of objects) or columnar (column names once, one array per column)"
+
+def is_columnar(format: str) -> bool:
+    """Validate a format= parameter."""
+    if format not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}. Use rows or columnar")
+    return format == "columnar"
+
+def list_response(result, columnar: bool):
+    """Columnar results are plain lists of JSON scalars; render them without FastAPI's
+    per-value encoding pass. Bodies already rendered by SQLite go out as they are."""
+    if isinstance(result, bytes):
+        return Response(content=result, media_type="application/json")
+    return JSONResponse(result) if columnar else result
+
+def to_columnar(rows: List[dict], fields: Optional[List[str]]) -> dict:
+    """Columnar form of row dicts (from the columnar snapshot)."""
+    columns = fields or (list(rows[0]) if rows else [])
+    return {"columns": columns, "data": [[row[c] for row in rows] for c in columns]}
 
 @app.get("/api/search")
-async def search_files(
+def search_files(
     query: str = Query("", description="Search term for filename or path"),
     extension: str = Query(None, description="Filter by extension"),
     min_size: int = Query(None, description="Minimum file size in bytes"),
-    max_size: int = Query(None, description="Maximum file size in bytes")
+    max_size: int = Query(None, description="Maximum file size in bytes"),
+    fields: str = Query(None, description="Comma-separated columns to return (default: all)"),
+    format: str = Query("rows", description=FORMAT_DESCRIPTION)
 ):
     """Search files with filters."""
+    columnar = is_columnar(format)
     db = Database(DB_PATH)
-    return db.search_files(query, extension, min_size, max_size)
+    try:
+        result = db.search_files(query, extension, min_size, max_size, parse_fields(fields), columnar, SQLITE_JSON)
+        return list_response(result, columnar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/duplicates")
-async def get_duplicates():
+def get_duplicates():
     """Get duplicate files."""
     db = Database(DB_PATH)
-    return db.get_duplicates()
+    return cached_json("duplicates", {}, db.get_duplicates)
 
 @app.get("/api/largest")
-async def get_largest_files(limit: int = Query(100, description="Number of files to return")):
+def get_largest_files(
+    limit: int = Query(100, description="Number of files to return"),
+    fields: str = Query(None, description="Comma-separated columns to return"),
+    format: str = Query("rows", description=FORMAT_DESCRIPTION)
+):
     """Get largest files sorted by size."""
+    projection = parse_fields(fields)
+    columnar = is_columnar(format)
+    if COLUMNAR_SNAPSHOT and columnar_fields(projection, columnar_snapshot.LARGEST_FIELDS):
+        rows = columnar_snapshot.get_snapshot(DB_PATH).get_largest_files(limit)
+        return list_response(to_columnar(rows, projection), True) if columnar else project(rows, projection)
     db = Database(DB_PATH)
-    return db.get_largest_files(limit)
+    try:
+        return list_response(db.get_largest_files(limit, projection, columnar, SQLITE_JSON), columnar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/histograms/size")
+def get_size_histogram(
+    extension: str = Query(None, description="Only files with this extension"),
+    path: str = Query(None, description="Only files under this directory")
+):
+    """Get file count and bytes per log2 size bucket."""
+    if not histogram_service.is_available():
+        raise HTTPException(status_code=501, detail="Histograms require numpy")
+    return cached_json("size_histogram", {"extension": extension, "path": path},
+                       lambda: HistogramService(DB_PATH).size_histogram(extension, path))
+
+@app.get("/api/histograms/age")
+def get_age_histogram(
+    extension: str = Query(None, description="Only files with this extension"),
+    path: str = Query(None, description="Only files under this directory")
+):
+    """Get file count and bytes per modification-age bucket."""
+    if not histogram_service.is_available():
+        raise HTTPException(status_code=501, detail="Histograms require numpy")
+    # Ages move with the clock: the cached result is good for the day
+    return cached_json("age_histogram", {"extension": extension, "path": path, "day": date.today().isoformat()},
+                       lambda: HistogramService(DB_PATH).age_histogram(extension, path))
 
 @app.get("/api/oldest")
-async def get_oldest_files(limit: int = Query(100, description="Number of files to return")):
+def get_oldest_files(
+    limit: int = Query(100, description="Number of files to return"),
+    fields: str = Query(None, description="Comma-separated columns to return"),
+    format: str = Query("rows", description=FORMAT_DESCRIPTION)
+):
     """Get oldest files sorted by modification date."""
+    projection = parse_fields(fields)
+    columnar = is_columnar(format)
+    if COLUMNAR_SNAPSHOT and columnar_fields(projection, columnar_snapshot.OLDEST_FIELDS):
+        rows = columnar_snapshot.get_snapshot(DB_PATH).get_oldest_files(limit)
+        return list_response(to_columnar(rows, projection), True) if columnar else project(rows, projection)
     db = Database(DB_PATH)
-    return db.get_oldest_files(limit)
+    try:
+        return list_response(db.get_oldest_files(limit, projection, columnar, SQLITE_JSON), columnar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 class VerifyRequest(BaseModel):
     md5_hash: str
@@ -71,7 +467,7 @@ class VerifyRequest(BaseModel):
     file_paths: List[str]
 
 @app.post("/api/duplicates/verify")
-async def verify_duplicates(request: VerifyRequest):
+def verify_duplicates(request: VerifyRequest):
     """Verify duplicates using SHA256 hash."""
     db = Database(DB_PATH)
     
@@ -115,70 +511,190 @@ async def verify_duplicates(request: VerifyRequest):
     }
 
 @app.get("/api/duplicates/candidates")
-async def get_duplicate_candidates():
+def get_duplicate_candidates():
     """Get MD5 duplicate candidates for SHA256 verification."""
     db = Database(DB_PATH)
-    return db.get_duplicate_candidates()
+    return cached_json("duplicate_candidates", {}, db.get_duplicate_candidates)
+
+def export_response(request: Request, chunks, media_type: str, filename: str, download_gz: bool = False):
+    """Stream an export, gzipped if the client accepts it or asked for a .gz download.
+    
+    Sync iterators are consumed in the threadpool by StreamingResponse, so
+    building the export and compressing it both stay off the event loop.
+    """
+    if download_gz:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={filename}.gz"}
+        )
+    
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        chunks = gzip_chunks(chunks)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+async def cached_export_response(request: Request, kind: str, filename: str, params: dict = None,
+                                 download_gz: bool = False):
+    """Serve a cached export artifact, rendering it first if this catalog version has none.
+    
+    The plain or pre-gzipped file is sent as is; a matching If-None-Match or
+    If-Modified-Since gets a 304.
+    """
+    artifact = await run_in_threadpool(ExportCache(DB_PATH, EXPORT_CACHE_BYTES).get, kind, params)
+    use_gz = download_gz or accepts_gzip(request.headers.get("accept-encoding", ""))
+    etag = artifact["gz_etag"] if use_gz else artifact["etag"]
+    
+    headers = {"ETag": etag, "Last-Modified": artifact["last_modified"], "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if (etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*") if if_none_match \
+            else request.headers.get("if-modified-since") == artifact["last_modified"]:
+        return Response(status_code=304, headers=headers)
+    
+    if download_gz:
+        headers["Content-Disposition"] = f"attachment; filename={filename}.gz"
+        return FileResponse(artifact["gz_path"], media_type="application/gzip", headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    if use_gz:
+        headers["Content-Encoding"] = "gzip"
+    return FileResponse(artifact["gz_path"] if use_gz else artifact["path"],
+                        media_type=EXPORT_KINDS[kind][0], headers=headers)
 
 @app.get("/api/export/json")
-async def export_json():
+async def export_json(request: Request):
     """Export catalog data as JSON."""
-    exporter = ExportService(DB_PATH)
-    json_data = exporter.export_json()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return Response(
-        content=json_data,
-        media_type="application/json",
-        headers={
-            "Content-Disposition": f"attachment; filename=catalog_export_{timestamp}.json"
-        }
-    )
+    return await cached_export_response(request, "json", f"catalog_export_{timestamp}.json")
+
+@app.get("/api/export/json.gz")
+async def export_json_gz(request: Request):
+    """Export catalog data as gzipped JSON."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return await cached_export_response(request, "json", f"catalog_export_{timestamp}.json", download_gz=True)
 
 @app.get("/api/export/csv")
-async def export_csv():
+async def export_csv(request: Request):
     """Export catalog data as CSV."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return await cached_export_response(request, "csv", f"catalog_export_{timestamp}.csv")
+
+@app.get("/api/export/csv.gz")
+async def export_csv_gz(request: Request):
+    """Export catalog data as gzipped CSV."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return await cached_export_response(request, "csv", f"catalog_export_{timestamp}.csv", download_gz=True)
+
+@app.get("/api/export/full.csv")
+async def export_full_csv(
+    request: Request,
+    query: str = Query("", description="Search term for filename or path"),
+    extension: str = Query(None, description="Filter by extension"),
+    min_size: int = Query(None, description="Minimum file size in bytes"),
+    max_size: int = Query(None, description="Maximum file size in bytes"),
+    after: int = Query(None, description="Resume after this id (last id already received)")
+):
+    """Export every matching file as CSV, streamed."""
     exporter = ExportService(DB_PATH)
-    csv_data = exporter.export_csv()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=catalog_export_{timestamp}.csv"
-        }
+    return export_response(request, exporter.stream_full_csv(query, extension, min_size, max_size, after),
+                           "text/csv", f"catalog_full_{timestamp}.csv")
+
+@app.get("/api/export/full.csv.gz")
+async def export_full_csv_gz(
+    request: Request,
+    query: str = Query("", description="Search term for filename or path"),
+    extension: str = Query(None, description="Filter by extension"),
+    min_size: int = Query(None, description="Minimum file size in bytes"),
+    max_size: int = Query(None, description="Maximum file size in bytes"),
+    after: int = Query(None, description="Resume after this id (last id already received)")
+):
+    """Export every matching file as gzipped CSV, streamed."""
+    exporter = ExportService(DB_PATH)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return export_response(request, exporter.stream_full_csv(query, extension, min_size, max_size, after),
+                           "text/csv", f"catalog_full_{timestamp}.csv", download_gz=True)
+
+@app.get("/api/export/full.ndjson")
+async def export_full_ndjson(
+    request: Request,
+    query: str = Query("", description="Search term for filename or path"),
+    extension: str = Query(None, description="Filter by extension"),
+    min_size: int = Query(None, description="Minimum file size in bytes"),
+    max_size: int = Query(None, description="Maximum file size in bytes"),
+    after: int = Query(None, description="Resume after this id (last id already received)")
+):
+    """Export every matching file as NDJSON, streamed."""
+    exporter = ExportService(DB_PATH)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return export_response(request, exporter.stream_full_ndjson(query, extension, min_size, max_size, after),
+                           "application/x-ndjson", f"catalog_full_{timestamp}.ndjson")
+
+@app.get("/api/export/full.ndjson.gz")
+async def export_full_ndjson_gz(
+    request: Request,
+    query: str = Query("", description="Search term for filename or path"),
+    extension: str = Query(None, description="Filter by extension"),
+    min_size: int = Query(None, description="Minimum file size in bytes"),
+    max_size: int = Query(None, description="Maximum file size in bytes"),
+    after: int = Query(None, description="Resume after this id (last id already received)")
+):
+    """Export every matching file as gzipped NDJSON, streamed."""
+    exporter = ExportService(DB_PATH)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return export_response(request, exporter.stream_full_ndjson(query, extension, min_size, max_size, after),
+                           "application/x-ndjson", f"catalog_full_{timestamp}.ndjson", download_gz=True)
+
+@app.get("/api/export/sqlite")
+async def export_sqlite(root: str = Query(None, description="Only include files under this directory")):
+    """Download a consistent, compacted SQLite copy of the catalog (or of one subtree)."""
+    # Built next to the catalog (same filesystem), in the threadpool, and removed once sent
+    fd, snapshot_path = tempfile.mkstemp(prefix="catalog_snapshot_", suffix=".db",
+                                         dir=os.path.dirname(os.path.abspath(DB_PATH)))
+    os.close(fd)
+    try:
+        await run_in_threadpool(ExportService(DB_PATH).export_sqlite, snapshot_path, root)
+    except Exception:
+        os.remove(snapshot_path)
+        raise
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return FileResponse(
+        snapshot_path,
+        media_type="application/vnd.sqlite3",
+        filename=f"catalog_{timestamp}.db",
+        background=BackgroundTask(os.remove, snapshot_path)
     )
 
 @app.get("/api/export/html")
-async def export_html():
+async def export_html(
+    request: Request,
+    limit: int = Query(REPORT_LIMIT, description="Number of largest files in the report"),
+    duplicate_limit: int = Query(REPORT_DUPLICATE_LIMIT, description="Number of duplicate groups in the report")
+):
     """Export catalog report as HTML."""
-    exporter = ExportService(DB_PATH)
-    html_data = exporter.export_html()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return Response(
-        content=html_data,
-        media_type="text/html",
-        headers={
-            "Content-Disposition": f"attachment; filename=catalog_report_{timestamp}.html"
-        }
-    )
+    return await cached_export_response(request, "html", f"catalog_report_{timestamp}.html",
+                                        {"limit": limit, "duplicate_limit": duplicate_limit})
 
 @app.get("/api/tree")
-async def get_tree(
+def get_tree(
     path: str = Query("", description="Parent directory path"),
     depth: int = Query(1, description="Depth to load (always 1 for lazy loading)")
 ):
     """Get directory tree structure with lazy loading."""
     db = Database(DB_PATH)
-    return db.get_tree_structure(path, depth)
+    return cached_json("tree", {"path": path, "depth": depth}, lambda: db.get_tree_structure(path, depth))
 
 @app.get("/api/suggestions")
-async def get_suggestions():
+def get_suggestions():
     """Get smart heuristic suggestions for file cleanup."""
     service = AIService(DB_PATH)
-    return service.get_suggestions()
+    # "Old" is relative to today, so the cached result is good for the day
+    return cached_json("suggestions", {"day": date.today().isoformat()}, service.get_suggestions)
 
 @app.get("/api/scan_progress")
-async def get_scan_progress():
+def get_scan_progress():
     """Get real-time scan progress from the engine."""
     # Assuming DB_PATH is in data/catalog.db, status is in data/scan_status.json
     db_dir = os.path.dirname(DB_PATH)
@@ -215,10 +731,247 @@ async def get_scan_progress():
             "status": "error"
         }
 
+@app.get("/api/scan_runs")
+def get_scan_runs(limit: int = Query(50, description="Number of runs to return")):
+    """Get scan history, including the stale files purged after each scan."""
+    db = Database(DB_PATH)
+    return db.get_scan_runs(limit)
+
+class ScanRequest(BaseModel):
+    root: str
+    scanner: str = "engine"  # 'engine' | 'python'
+    nice: Optional[int] = None
+    ionice_class: Optional[int] = None  # 1 realtime, 2 best-effort, 3 idle
+    ionice_level: Optional[int] = None
+    max_bytes_per_sec: Optional[int] = None
+    max_concurrency: Optional[int] = None
+
+def _scan_action(action, job_id: int):
+    try:
+        return action(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Scan {job_id} not found")
+    except ScanConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+@app.post("/api/scans")
+def start_scan(request: ScanRequest):
+    """Start a supervised scan with optional priority and I/O limits."""
+    try:
+        return scan_manager.start(**request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ScanConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/scans")
+def list_scans(limit: int = Query(50, description="Number of jobs to return")):
+    """Get scan job history with duration and throughput."""
+    return scan_manager.list_jobs(limit)
+
+@app.get("/api/scans/{job_id}")
+def get_scan(job_id: int):
+    """Get one scan job."""
+    job = scan_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Scan {job_id} not found")
+    return job
+
+@app.post("/api/scans/{job_id}/pause")
+def pause_scan(job_id: int):
+    """Pause a running scan."""
+    return _scan_action(scan_manager.pause, job_id)
+
+@app.post("/api/scans/{job_id}/resume")
+def resume_scan(job_id: int):
+    """Resume a paused scan."""
+    return _scan_action(scan_manager.resume, job_id)
+
+@app.post("/api/scans/{job_id}/cancel")
+def cancel_scan(job_id: int):
+    """Cancel a running or paused scan."""
+    return _scan_action(scan_manager.cancel, job_id)
+
+class WatcherRequest(BaseModel):
+    roots: Optional[List[str]] = None
+
+@app.post("/api/watcher/start")
+def start_watcher(request: WatcherRequest = None):
+    """Start live catalog updates for the given roots (default: all scanned roots)."""
+    if not watcher.start(request.roots if request else None):
+        raise HTTPException(status_code=409, detail="Watcher is already running")
+    return watcher.status()
+
+@app.post("/api/watcher/stop")
+def stop_watcher():
+    """Stop live catalog updates."""
+    watcher.stop()
+    return watcher.status()
+
+@app.get("/api/watcher")
+async def get_watcher():
+    """Get watcher mode, watched roots and degraded subtrees."""
+    return watcher.status()
+
+@app.post("/api/ingest")
+async def ingest_files(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    root: str = Query(None, description="Directory this upload fully covers; stale rows under it are purged")
+):
+    """Bulk-load NDJSON file entries (engine FileEntry fields), optionally gzip-compressed."""
+    compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+    ingest = IngestService(DB_PATH, compressed=compressed)
+    await run_in_threadpool(ingest.begin, root)
+    
+    # Parsing and writes happen off the event loop, about 1 MB of body at a time
+    pending = []
+    pending_size = 0
+    try:
+        async for chunk in request.stream():
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= 1024 * 1024:
+                await run_in_threadpool(ingest.feed, b"".join(pending))
+                pending, pending_size = [], 0
+        if pending:
+            await run_in_threadpool(ingest.feed, b"".join(pending))
+        summary = await run_in_threadpool(ingest.finish)
+    except zlib.error as e:
+        await run_in_threadpool(ingest.abort)
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+    except IngestError as e:
+        await run_in_threadpool(ingest.abort)
+        raise HTTPException(status_code=400, detail=f"Invalid entry at {e}")
+    except Exception:
+        await run_in_threadpool(ingest.abort)
+        raise
+    
+    if root:
+        background_tasks.add_task(run_post_scan_hooks)
+    return summary
+
+@app.get("/api/cube")
+def get_cube(
+    background_tasks: BackgroundTasks,
+    extension: List[str] = Query(None, description="Only these extensions (repeatable)"),
+    group_by: str = Query("", description="Comma-separated dimensions: extension, age, size"),
+    min_age_days: int = Query(None, description="Only age buckets starting at or after this many days"),
+    max_age_days: int = Query(None, description="Only age buckets ending at or before this many days"),
+    min_size: int = Query(None, description="Only size buckets starting at or above this many bytes"),
+    max_size: int = Query(None, description="Only size buckets ending at or below this many bytes")
+):
+    """Slice and roll up the extension x age x size cube."""
+    cube = CubeService(DB_PATH)
+    try:
+        result = cube.query(
+            extension, [d for d in group_by.split(",") if d],
+            min_age_days, max_age_days, min_size, max_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Serve the last cube and rebuild after the response, not on the request path
+    if result["stale"]:
+        background_tasks.add_task(cube.rebuild_if_stale)
+    return result
+
+@app.get("/api/cube/dimensions")
+async def get_cube_dimensions():
+    """Get the age and size bucket definitions used by the cube."""
+    return CubeService(DB_PATH).get_dimensions()
+
+@app.post("/api/cube/rebuild")
+def rebuild_cube_now():
+    """Rebuild the cube from the current catalog."""
+    return CubeService(DB_PATH).rebuild()
+
+class BatchQuery(BaseModel):
+    name: str
+    view: str  # stats, search, duplicates, duplicate_candidates, verified_duplicates, largest, oldest, tree, scan_runs, suggestions
+    params: dict = {}
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+    concurrent: bool = False
+
+@app.post("/api/batch")
+async def run_batch(request: BatchRequest):
+    """Run several views against one catalog snapshot and return them together."""
+    queries = [q.model_dump() for q in request.queries]
+    try:
+        return await run_in_threadpool(BatchService(DB_PATH).run, queries, request.concurrent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/snapshots")
+def list_snapshots():
+    """List the retained scan snapshots, newest first."""
+    return SnapshotService(DB_PATH, SNAPSHOT_RETENTION).list_snapshots()
+
+@app.post("/api/snapshots")
+async def take_snapshot_now():
+    """Snapshot the catalog now, under the latest scan generation."""
+    return await run_in_threadpool(SnapshotService(DB_PATH, SNAPSHOT_RETENTION).take)
+
+@app.get("/api/diff")
+async def get_diff(
+    base: str = Query(None, description="Older snapshot generation (default: the one before target)"),
+    target: str = Query(None, description="Newer snapshot generation or 'current' (default: latest snapshot)"),
+    path: str = Query(None, description="Only compare files under this directory"),
+    change: str = Query(None, description="Only list this change: new, deleted, grown, modified"),
+    cursor: str = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, description="Changes per page"),
+    depth: int = Query(1, description="Directory levels below path for the rollups"),
+    rollup_limit: int = Query(50, description="Directories with the largest byte deltas to return")
+):
+    """What changed between two scans: totals, one page of files and per-directory rollups."""
+    service = SnapshotService(DB_PATH, SNAPSHOT_RETENTION)
+    try:
+        return await run_in_threadpool(
+            service.diff, base, target, path, change, cursor, limit, depth, rollup_limit
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/trends")
+def get_trends(
+    extension: str = Query(None, description="Also return the series of this extension"),
+    directory: str = Query(None, description="Also return the series of this top-level directory"),
+    since: int = Query(None, description="Only snapshots taken at or after this Unix time"),
+    top: int = Query(10, description="Fastest-growing extensions and directories to return")
+):
+    """Growth of the catalog across scans."""
+    return TrendService(DB_PATH).trends(extension, directory, since, top)
+
+@app.post("/api/trends")
+async def record_trends_now():
+    """Record a trend snapshot now, under the latest scan generation."""
+    return await run_in_threadpool(TrendService(DB_PATH).record)
+
+@app.post("/api/refresh")
+def refresh_catalog(root: str = Query(None, description="Only refresh files under this directory")):
+    """Start a stat-only refresh: rehash changed files and remove vanished ones."""
+    if not start_refresh(DB_PATH, root):
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return get_refresh_status(DB_PATH)
+
+@app.get("/api/refresh")
+def get_refresh():
+    """Get the state of the current or last catalog refresh."""
+    return get_refresh_status(DB_PATH)
+
 # Mount frontend static files
 if os.path.exists("../frontend"):
     app.mount("/", StaticFiles(directory="../frontend", html=True), name="frontend")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1:
+        # Each worker imports the app itself; exactly one of them claims the watcher
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,41 @@
+"""
+Metrics
+In-process counters and value summaries (count, sum, min, max, mean),
+exposed through /api/metrics.
+"""
+
+import threading
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_summaries: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Add one observation to the summary of name."""
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            _summaries[name] = {"count": 1, "sum": value, "min": value, "max": value}
+        else:
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "summaries": {
+                name: {**s, "mean": s["sum"] / s["count"]}
+                for name, s in _summaries.items()
+            },
+        }
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Refresh Service
+Stat-only catalog refresh: re-stats every cataloged path, rehashes only the
+files whose size or modification time changed and removes vanished files,
+as a full scan and the watcher do.
+Optionally also catalogs new files found in the directories it lists,
+and in new subdirectories of them.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Optional, Tuple
+from database import Database
+from sha256_computer import compute_md5
+from scanner import build_file_entry
+import file_lock
+
+# (id, path, size_bytes, modified_at)
+CatalogRow = Tuple[int, str, int, Optional[int]]
+
+
+class RefreshService:
+    def __init__(self, db_path: str, workers: int = 16, batch_size: int = 5000, discover: bool = False):
+        self.db = Database(db_path)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.discover = discover
+
+    def refresh(self, root: Optional[str] = None) -> Dict[str, Any]:
+        """Re-stat the catalog (or the subtree under root) and apply the differences."""
+        start = time.time()
+        summary = {
+            "root": root,
+            "checked": 0,
+            "unchanged": 0,
+            "changed": 0,
+            "vanished": 0,
+            "added": 0,
+            "errors": 0,
+            "directories": 0,
+        }
+
+        self.generation = self.db.get_latest_generation(include_running=True)
+        self._found_dirs: List[str] = []
+        read_conn = self.db.get_connection()
+        read_conn.row_factory = None
+        write_conn = self.db.get_write_connection()
+
+        sql = "SELECT id, path, size_bytes, modified_at FROM files"
+        params: List[Any] = []
+        if root:
+            sql += " WHERE path >= ? AND path < ?"
+            params.extend(Database.subtree_range(root))
+        sql += " ORDER BY path"
+
+        cursor = read_conn.execute(sql, params)
+
+        updates: Dict[str, list] = {"changed": [], "vanished": [], "added": []}
+        in_flight: List[Future] = []
+        # Directories whose rows are still arriving. Rows come sorted by path, and all
+        # paths under a directory are contiguous, so a directory is complete as soon as
+        # a row outside of it shows up. Only ancestors of the current row stay open.
+        pending: Dict[str, List[CatalogRow]] = {}
+        listed = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+
+                summary["checked"] += len(rows)
+                for row in rows:
+                    path = row[1]
+                    sep = "\\" if "\\" in path else "/"
+                    directory = _parent_dir(path, sep)
+
+                    for open_dir in list(pending):
+                        prefix = open_dir if open_dir.endswith(sep) else open_dir + sep
+                        if open_dir != directory and not path.startswith(prefix):
+                            in_flight.append(pool.submit(self._check_directory, open_dir, pending.pop(open_dir)))
+                    pending.setdefault(directory, []).append(row)
+                    listed.add(directory)
+
+                # Keep memory bounded: drain finished directories before reading more rows
+                in_flight = self._collect(in_flight, updates, summary, wait=len(in_flight) > self.workers * 4)
+                self._flush(write_conn, updates)
+
+            for open_dir, dir_rows in pending.items():
+                in_flight.append(pool.submit(self._check_directory, open_dir, dir_rows))
+            self._collect(in_flight, updates, summary, wait=True)
+
+            if self.discover:
+                self._discover_directories(pool, root, listed, write_conn, updates, summary)
+
+        self._flush(write_conn, updates, force=True)
+        read_conn.close()
+        write_conn.close()
+
+        summary["duration_seconds"] = round(time.time() - start, 2)
+        return summary
+
+    def _discover_directories(self, pool: ThreadPoolExecutor, root: Optional[str], listed: set,
+                              write_conn, updates: Dict[str, list], summary: Dict[str, Any]) -> None:
+        """List the directories that have no cataloged files, level by level.
+
+        Starts from the subdirectories found while listing the cataloged ones
+        (and from root itself), so new subtrees, and directories that only
+        hold other directories, are caught too.
+        """
+        todo = list(self._found_dirs)
+        if root:
+            sep = "\\" if "\\" in root else "/"
+            top = root.rstrip(sep)
+            todo.append(top + sep if top == "" or top.endswith(":") else top)
+        while todo:
+            todo = sorted(set(d for d in todo if d not in listed))
+            listed.update(todo)
+            self._found_dirs = []
+            futures = [pool.submit(self._check_directory, directory, []) for directory in todo]
+            self._collect(futures, updates, summary, wait=True)
+            self._flush(write_conn, updates)
+            todo = self._found_dirs
+
+    def _check_directory(self, directory: str, rows: List[CatalogRow]) -> Dict[str, Any]:
+        """List one directory and compare every cataloged entry against it."""
+        result: Dict[str, Any] = {"changed": [], "vanished": [], "added": [],
+                                  "subdirs": [], "unchanged": 0, "errors": 0}
+
+        try:
+            with os.scandir(directory) as it:
+                listing = {entry.name: entry for entry in it}
+        except (FileNotFoundError, NotADirectoryError):
+            listing = {}
+        except OSError:
+            # Unreadable directory: leave its rows untouched
+            result["errors"] = len(rows)
+            return result
+
+        for file_id, path, size_bytes, modified_at in rows:
+            sep = "\\" if "\\" in path else "/"
+            entry = listing.get(path.rpartition(sep)[2])
+
+            try:
+                if entry is None or not entry.is_file():
+                    result["vanished"].append((file_id,))
+                    continue
+                st = entry.stat()
+            except OSError:
+                result["errors"] += 1
+                continue
+
+            if st.st_size == size_bytes and int(st.st_mtime) == modified_at:
+                result["unchanged"] += 1
+                continue
+
+            try:
+                md5 = compute_md5(path)
+            except Exception:
+                result["errors"] += 1
+                continue
+            result["changed"].append((st.st_size, int(st.st_mtime), md5, file_id))
+
+        if self.discover:
+            known = {path.rpartition("\\" if "\\" in path else "/")[2] for _, path, _, _ in rows}
+            for name, entry in listing.items():
+                if name in known:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        result["subdirs"].append(entry.path)
+                    elif entry.is_file():
+                        result["added"].append(build_file_entry(entry.path, entry.stat(), compute_md5(entry.path)))
+                except Exception:
+                    result["errors"] += 1
+
+        return result
+
+    def _collect(self, futures: List[Future], updates: Dict[str, list],
+                 summary: Dict[str, Any], wait: bool) -> List[Future]:
+        """Merge finished directory results; returns the futures still running."""
+        remaining = []
+        for future in futures:
+            if not wait and not future.done():
+                remaining.append(future)
+                continue
+
+            result = future.result()
+            summary["directories"] += 1
+            summary["unchanged"] += result["unchanged"]
+            summary["errors"] += result["errors"]
+            self._found_dirs.extend(result["subdirs"])
+            for key in ("changed", "vanished", "added"):
+                updates[key].extend(result[key])
+                summary[key] += len(result[key])
+        return remaining
+
+    def _flush(self, conn, updates: Dict[str, list], force: bool = False) -> None:
+        """Write accumulated updates in one transaction."""
+        pending = sum(len(v) for v in updates.values())
+        if pending == 0 or (not force and pending < self.batch_size):
+            return
+
+        with conn:
+            conn.executemany("""
+                UPDATE files
+                SET size_bytes = ?, modified_at = ?, md5_hash = ?,
+                    sha256_hash = NULL, sha256_verified = 0
+                WHERE id = ?
+            """, updates["changed"])
+            conn.executemany("DELETE FROM files WHERE id = ?", updates["vanished"])
+            if updates["added"]:
+                self.db.upsert_files(updates["added"], self.generation, conn)
+
+        for value in updates.values():
+            value.clear()
+
+
+def _parent_dir(path: str, sep: str) -> str:
+    """Directory part of a cataloged path, keeping drive and filesystem roots listable."""
+    directory = path.rpartition(sep)[0]
+    if directory == "" or directory.endswith(":"):
+        directory += sep
+    return directory
+
+
+def _lock_path(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ".refresh.lock")
+
+
+def start_refresh(db_path: str, root: Optional[str] = None) -> bool:
+    """Start a refresh in a background thread. Returns False if one is already running.
+
+    The run is recorded in refresh_runs and guarded by a file lock, so any
+    worker process can start it or report on it.
+    """
+    lock_file = file_lock.acquire(_lock_path(db_path), blocking=False)
+    if lock_file is None:
+        return False
+
+    db = Database(db_path)
+    conn = db.get_write_connection(versioned=False)
+    with conn:
+        run_id = conn.execute(
+            "INSERT INTO refresh_runs (root, status, started_at) VALUES (?, 'running', ?)",
+            (root, time.time())
+        ).lastrowid
+    conn.close()
+
+    def run():
+        fields: Dict[str, Any] = {}
+        try:
+            fields["result"] = json.dumps(RefreshService(db_path).refresh(root))
+            fields["status"] = "completed"
+        except Exception as e:
+            print(f"Refresh error: {e}")
+            fields.update({"status": "error", "error": str(e)})
+        finally:
+            fields["finished_at"] = time.time()
+            try:
+                conn = db.get_write_connection(versioned=False)
+                with conn:
+                    assignments = ", ".join(f"{name} = ?" for name in fields)
+                    conn.execute(f"UPDATE refresh_runs SET {assignments} WHERE id = ?", (*fields.values(), run_id))
+                conn.close()
+            finally:
+                file_lock.release(lock_file)
+
+    threading.Thread(target=run, name="catalog-refresh", daemon=True).start()
+    return True
+
+
+def get_refresh_status(db_path: str) -> Dict[str, Any]:
+    """Get the state of the current or last background refresh."""
+    conn = Database(db_path).get_connection()
+    row = conn.execute("SELECT * FROM refresh_runs ORDER BY id DESC LIMIT 1").fetchone()
+    conn.close()
+    if row is None:
+        return {"status": "idle", "result": None}
+
+    state = dict(row)
+    del state["id"]
+    state["result"] = json.loads(state["result"]) if state["result"] else None
+    if state["status"] == "running":
+        # Whoever ran it died without recording the outcome if nobody holds the lock
+        lock_file = file_lock.acquire(_lock_path(db_path), blocking=False)
+        if lock_file is not None:
+            file_lock.release(lock_file)
+            state["status"] = "interrupted"
+    return state
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python refresh_service.py <db_path> [root]")
+        sys.exit(1)
+
+    Database(sys.argv[1]).ensure_schema()
+    summary = RefreshService(sys.argv[1]).refresh(sys.argv[2] if len(sys.argv) > 2 else None)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,114 @@
+"""
+Report Builder
+Assembles every section of the export reports from one read transaction, so
+they all describe the same catalog state even while a scan is writing, and
+computes each section once for all three export formats.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+from database import Database
+
+STATS_TOP = 10  # extensions and largest files in the summary, as in Database.get_stats
+
+
+class ReportBuilder:
+    def __init__(self, db_path: str):
+        self.db = Database(db_path)
+
+    def build(self, largest_limit: int = 100, oldest_limit: int = 100,
+              duplicate_limit: Optional[int] = None) -> Dict[str, Any]:
+        """Compute all report sections.
+
+        Returns the same shapes as Database.get_stats, get_largest_files,
+        get_oldest_files and get_duplicates (the latter cut to duplicate_limit
+        groups, with totals over all of them).
+        """
+        conn = self.db.get_connection()
+        conn.isolation_level = None
+        conn.row_factory = None
+        try:
+            conn.execute("BEGIN")
+            generated_at = datetime.now()
+            scan = self._scan(conn, max(largest_limit, STATS_TOP), oldest_limit)
+            duplicates = self._duplicates(conn, duplicate_limit)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        extensions = scan["extensions"]
+        return {
+            "generated_at": generated_at,
+            "stats": {
+                "total_files": sum(e["count"] for e in extensions),
+                "total_size": sum(e["total_size"] for e in extensions),
+                "extensions": extensions[:STATS_TOP],
+                "largest_files": [
+                    {"path": f["path"], "filename": f["filename"], "size_bytes": f["size_bytes"]}
+                    for f in scan["largest"][:STATS_TOP]
+                ],
+            },
+            "largest_files": scan["largest"][:largest_limit],
+            "oldest_files": scan["oldest"],
+            **duplicates,
+        }
+
+    def _scan(self, conn, largest_limit: int, oldest_limit: int) -> Dict[str, Any]:
+        # Totals are the sum of the extension groups: one full scan instead of two.
+        # Largest walks idx_size; oldest is a bounded top-K sort inside SQLite.
+        extensions = [
+            {"extension": ext, "count": count, "total_size": total}
+            for ext, count, total in conn.execute("""
+                SELECT extension, COUNT(*), SUM(size_bytes) FROM files
+                GROUP BY extension
+                ORDER BY SUM(size_bytes) DESC
+            """)
+        ]
+        largest = [
+            {"path": path, "filename": filename, "extension": extension,
+             "size_bytes": size, "modified_at": mtime}
+            for path, filename, extension, size, mtime in conn.execute("""
+                SELECT path, filename, extension, size_bytes, modified_at FROM files
+                ORDER BY size_bytes DESC
+                LIMIT ?
+            """, (largest_limit,))
+        ]
+        oldest = [
+            {"path": path, "filename": filename, "extension": extension,
+             "size_bytes": size, "modified_at": mtime, "created_at": ctime}
+            for path, filename, extension, size, mtime, ctime in conn.execute("""
+                SELECT path, filename, extension, size_bytes, modified_at, created_at FROM files
+                ORDER BY modified_at ASC
+                LIMIT ?
+            """, (oldest_limit,))
+        ]
+        return {"extensions": extensions, "largest": largest, "oldest": oldest}
+
+    def _duplicates(self, conn, limit: Optional[int]) -> Dict[str, Any]:
+        cursor = conn.execute("""
+            SELECT md5_hash, COUNT(*) as count, SUM(size_bytes) as wasted_space,
+                   GROUP_CONCAT(path, '|||') as paths
+            FROM files
+            GROUP BY md5_hash
+            HAVING count > 1
+            ORDER BY wasted_space DESC
+        """)
+        groups = []
+        total = files = wasted = 0
+        for md5_hash, count, wasted_space, paths in cursor:
+            total += 1
+            files += count
+            wasted += wasted_space
+            if limit is None or len(groups) < limit:
+                groups.append({
+                    "md5_hash": md5_hash,
+                    "count": count,
+                    "wasted_space": wasted_space,
+                    "paths": paths.split("|||") if paths else [],
+                })
+        return {
+            "duplicates": groups,
+            "duplicate_groups": total,
+            "duplicate_files": files,
+            "wasted_space": wasted,
+        }
@@ -0,0 +1,139 @@
+"""
+Result Cache
+Serialized JSON results of expensive views, kept in an SQLite file next to
+catalog.db and keyed by catalog version, so every worker process of a
+multi-worker server sees them. Each result is computed once per version:
+the first worker to miss claims the key and the others wait for its result
+instead of computing their own.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, Optional
+from database import Database
+import metrics
+
+# A claim older than this is taken to belong to a worker that died mid-computation
+CLAIM_TIMEOUT = 300.0
+POLL_INTERVAL = 0.05
+
+
+class ResultCache:
+    def __init__(self, db_path: str):
+        self.db = Database(db_path)
+        # A separate file: writing to catalog.db would change the catalog version
+        self.path = os.path.join(os.path.dirname(os.path.abspath(db_path)), "result_cache.db")
+        self._ready = False
+
+    def get_or_compute(self, name: str, params: Dict[str, Any], compute: Callable[[], Any]) -> bytes:
+        """The JSON body of name(params) at the current catalog version, computing it if needed."""
+        version = self.db.get_catalog_version()
+        raw = f"{name}|{sorted(params.items())}|{self.db.db_path}|{version}"
+        key = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+        conn = self._connect()
+        try:
+            # Threads of this worker queue on the lock; other workers on the claim row
+            with _lock_for(key):
+                waited = False
+                while True:
+                    row = conn.execute("SELECT body, claimed_at FROM results WHERE key = ?", (key,)).fetchone()
+                    if row is not None and row[0] is not None:
+                        metrics.increment("result_cache.hits")
+                        if waited:
+                            metrics.increment("result_cache.waits")
+                        return row[0]
+                    if self._claim(conn, key, version, row[1] if row else None):
+                        break
+                    waited = True
+                    time.sleep(POLL_INTERVAL)
+
+                metrics.increment("result_cache.misses")
+                try:
+                    body = _encode(compute())
+                except BaseException:
+                    with conn:
+                        conn.execute("DELETE FROM results WHERE key = ? AND body IS NULL", (key,))
+                    raise
+                with conn:
+                    conn.execute("UPDATE results SET body = ?, created_at = ? WHERE key = ?",
+                                 (body, time.time(), key))
+                    # Results of older versions can never be served again
+                    conn.execute("DELETE FROM results WHERE version != ? AND body IS NOT NULL", (version,))
+                return body
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+        conn.close()
+
+    def _claim(self, conn: sqlite3.Connection, key: str, version: str, claimed_at: Optional[float]) -> bool:
+        """Take the right to compute key: a free key, or one whose claim went stale."""
+        now = time.time()
+        with conn:
+            if claimed_at is None:
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO results (key, version, body, claimed_at)
+                    VALUES (?, ?, NULL, ?)
+                """, (key, version, now))
+            elif now - claimed_at > CLAIM_TIMEOUT:
+                cursor = conn.execute("""
+                    UPDATE results SET claimed_at = ?
+                    WHERE key = ? AND body IS NULL AND claimed_at = ?
+                """, (now, key, claimed_at))
+            else:
+                return False
+        return cursor.rowcount == 1
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    body BLOB,
+                    claimed_at REAL,
+                    created_at REAL
+                )
+            """)
+            conn.commit()
+            self._ready = True
+        return conn
+
+
+def _encode(result: Any) -> bytes:
+    # The same compact form FastAPI's JSONResponse renders
+    return json.dumps(
+        result, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o),
+    ).encode("utf-8")
+
+
+_locks_guard = threading.Lock()
+# key -> [lock, threads using it]; an entry goes once its last user is done with it
+_locks: Dict[str, list] = {}
+
+
+@contextmanager
+def _lock_for(key: str) -> Iterator[None]:
+    with _locks_guard:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _locks[key]
@@ -0,0 +1,342 @@
+"""
+Scan Manager
+Runs the engine (or the Python scanner) as a supervised subprocess with
+CPU/IO priority and read-rate limits, and keeps the history of scan jobs.
+Pausing is cooperative: the manager creates a flag file that the scanner
+checks between committed batches, so it never stops holding the catalog's
+write lock.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import subprocess
+import threading
+from typing import List, Dict, Any, Optional, Callable
+from database import Database
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ACTIVE_STATUSES = ("running", "paused", "cancelling")
+
+
+class ScanConflictError(Exception):
+    """The job cannot be started or signalled in its current state."""
+
+
+class ScanManager:
+    def __init__(self, db_path: str, engine_path: str):
+        self.db = Database(db_path)
+        self.db_path = os.path.abspath(db_path)
+        self.engine_path = engine_path
+        self.log_dir = os.path.join(os.path.dirname(self.db_path), "scan_logs")
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_completion_hook(self, hook: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback run (in the supervisor thread) after each successful scan."""
+        self._hooks.append(hook)
+
+    def recover(self) -> None:
+        """Mark jobs left active by a previous backend process whose scanner is gone."""
+        for job in self.list_jobs(status=ACTIVE_STATUSES):
+            if not self._is_alive(job["pid"]):
+                self._update(job["id"], status="interrupted", finished_at=time.time())
+                self._close_scan_run(job, "failed")
+
+    def start(self, root: str, scanner: str = "engine", nice: Optional[int] = None,
+              ionice_class: Optional[int] = None, ionice_level: Optional[int] = None,
+              max_bytes_per_sec: Optional[int] = None, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Start a scan of root and return the new job."""
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise ValueError(f"Not a directory: {root}")
+        if scanner not in ("engine", "python"):
+            raise ValueError(f"Unknown scanner: {scanner}")
+        if scanner == "engine" and not os.path.isfile(self.engine_path):
+            raise ValueError(f"Engine binary not found: {self.engine_path}")
+        _check_priority(nice, ionice_class, ionice_level)
+
+        options = {
+            "nice": nice,
+            "ionice_class": ionice_class,
+            "ionice_level": ionice_level,
+            "max_bytes_per_sec": max_bytes_per_sec,
+            "max_concurrency": max_concurrency,
+        }
+
+        with self._lock:
+            # One scan at a time per root, including nested roots
+            for job in self.list_jobs(status=ACTIVE_STATUSES):
+                if _overlaps(job["root"], root) and self._is_alive(job["pid"]):
+                    raise ScanConflictError(f"Scan {job['id']} is already running on {job['root']}")
+
+            conn = self.db.get_write_connection(versioned=False)
+            with conn:
+                cursor = conn.execute("""
+                    INSERT INTO scan_jobs (root, scanner, options, status, started_at)
+                    VALUES (?, ?, ?, 'running', ?)
+                """, (root, scanner, json.dumps(options), time.time()))
+            conn.close()
+            job_id = cursor.lastrowid
+
+            os.makedirs(self.log_dir, exist_ok=True)
+            log_file = open(os.path.join(self.log_dir, f"scan_{job_id}.log"), "wb")
+            try:
+                proc = subprocess.Popen(
+                    self._build_command(root, scanner, options, self._pause_path(job_id)),
+                    cwd=BACKEND_DIR,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    **self._priority_kwargs(nice),
+                )
+            except (OSError, subprocess.SubprocessError) as e:
+                log_file.close()
+                self._update(job_id, status="failed", finished_at=time.time())
+                raise ValueError(f"Could not start scanner: {e}")
+
+            self._update(job_id, pid=proc.pid)
+
+        threading.Thread(target=self._supervise, args=(job_id, proc, log_file),
+                         name=f"scan-{job_id}", daemon=True).start()
+        return self.get_job(job_id)
+
+    def pause(self, job_id: int) -> Dict[str, Any]:
+        """Ask a running scan to pause after its current batch."""
+        self._require(job_id, ("running",))
+        open(self._pause_path(job_id), "wb").close()
+        self._update(job_id, status="paused", paused_at=time.time())
+        return self.get_job(job_id)
+
+    def resume(self, job_id: int) -> Dict[str, Any]:
+        """Let a paused scan continue."""
+        job = self._require(job_id, ("paused",))
+        self._clear_pause(job_id)
+        self._update(job_id, status="running", paused_at=None,
+                     paused_seconds=job["paused_seconds"] + time.time() - job["paused_at"])
+        return self.get_job(job_id)
+
+    def cancel(self, job_id: int) -> Dict[str, Any]:
+        """Stop a scan. Files it already wrote are kept; nothing is purged."""
+        job = self._require(job_id, ("running", "paused"))
+        self._update(job_id, status="cancelling")
+        os.kill(job["pid"], signal.SIGTERM)
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Get one scan job."""
+        conn = self.db.get_connection()
+        row = conn.execute("SELECT * FROM scan_jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.close()
+        return _job_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 50, status: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Get scan jobs, most recent first."""
+        conn = self.db.get_connection()
+        sql = "SELECT * FROM scan_jobs"
+        params: List[Any] = []
+        if status:
+            sql += f" WHERE status IN ({','.join('?' * len(status))})"
+            params.extend(status)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        results = [_job_dict(row) for row in conn.execute(sql, params).fetchall()]
+        conn.close()
+        return results
+
+    def _supervise(self, job_id: int, proc: subprocess.Popen, log_file) -> None:
+        """Wait for the scanner to exit and record the outcome and throughput."""
+        exit_code = proc.wait()
+        log_file.close()
+        self._clear_pause(job_id)
+
+        job = self.get_job(job_id)
+        finished = time.time()
+        paused = job["paused_seconds"] + (finished - job["paused_at"] if job["paused_at"] else 0)
+        duration = max(finished - job["started_at"] - paused, 0.001)
+
+        if job["status"] == "cancelling":
+            status = "cancelled"
+        elif exit_code == 0:
+            status = "completed"
+        else:
+            status = "failed"
+
+        fields: Dict[str, Any] = {
+            "status": status,
+            "exit_code": exit_code,
+            "finished_at": finished,
+            "paused_at": None,
+            "paused_seconds": paused,
+            "duration_seconds": round(duration, 3),
+        }
+
+        if status == "completed":
+            run = self._find_scan_run(job)
+            if run:
+                fields.update({
+                    "generation": run["generation"],
+                    "files_scanned": run["files"],
+                    "bytes_scanned": run["bytes"],
+                    "files_per_sec": round(run["files"] / duration, 1),
+                    "bytes_per_sec": round(run["bytes"] / duration, 1),
+                })
+
+        else:
+            # The scanner did not get to finish_scan_run: end its run without purging
+            self._close_scan_run(job, status)
+
+        self._update(job_id, **fields)
+
+        if status == "completed":
+            job = self.get_job(job_id)
+            for hook in self._hooks:
+                try:
+                    hook(job)
+                except Exception as e:
+                    print(f"Scan completion hook error: {e}")
+
+    def _find_scan_run(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Locate the scan_runs generation written by this job and total what it saw."""
+        conn = self.db.get_connection()
+        row = conn.execute("""
+            SELECT id, files_seen FROM scan_runs
+            WHERE root = ? AND started_at >= ? AND status = 'completed'
+            ORDER BY id DESC LIMIT 1
+        """, (job["root"], int(job["started_at"]))).fetchone()
+
+        result = None
+        if row:
+            lower, upper = Database.subtree_range(job["root"])
+            total_bytes = conn.execute("""
+                SELECT COALESCE(SUM(size_bytes), 0) FROM files
+                WHERE path >= ? AND path < ? AND scan_generation = ?
+            """, (lower, upper, row["id"])).fetchone()[0]
+            result = {"generation": row["id"], "files": row["files_seen"], "bytes": total_bytes}
+
+        conn.close()
+        return result
+
+    def _close_scan_run(self, job: Dict[str, Any], status: str) -> None:
+        """End the scan_runs row this job left running, if it got as far as creating one."""
+        conn = self.db.get_connection()
+        row = conn.execute("""
+            SELECT id FROM scan_runs
+            WHERE root = ? AND started_at >= ? AND status = 'running'
+            ORDER BY id DESC LIMIT 1
+        """, (job["root"], int(job["started_at"]))).fetchone()
+        conn.close()
+        if row:
+            self.db.end_scan_run(row["id"], status)
+
+    def _pause_path(self, job_id: int) -> str:
+        return os.path.join(self.log_dir, f"scan_{job_id}.pause")
+
+    def _clear_pause(self, job_id: int) -> None:
+        try:
+            os.remove(self._pause_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def _build_command(self, root: str, scanner: str, options: Dict[str, Any], pause_path: str) -> List[str]:
+        if scanner == "engine":
+            cmd = [os.path.abspath(self.engine_path), root, self.db_path]
+        else:
+            cmd = [sys.executable, os.path.join(BACKEND_DIR, "scanner.py"), root, self.db_path]
+        cmd += ["--pause-file", pause_path]
+
+        if options["max_concurrency"]:
+            cmd += ["--threads", str(options["max_concurrency"])]
+        if options["max_bytes_per_sec"]:
+            cmd += ["--max-bytes-per-sec", str(options["max_bytes_per_sec"])]
+
+        # nice and ionice exec the scanner, so the pid we signal is still the scanner's.
+        # No preexec_fn: it is not safe to run in a threaded server.
+        if options["nice"] and os.name != "nt":
+            cmd = [_require_tool("nice"), "-n", str(options["nice"])] + cmd
+        if options["ionice_class"] is not None:
+            prefix = [_require_tool("ionice"), "-c", str(options["ionice_class"])]
+            if options["ionice_level"] is not None and options["ionice_class"] in (1, 2):
+                prefix += ["-n", str(options["ionice_level"])]
+            cmd = prefix + cmd
+
+        return cmd
+
+    def _priority_kwargs(self, nice: Optional[int]) -> Dict[str, Any]:
+        if not nice or os.name != "nt":
+            return {}
+        priority = subprocess.IDLE_PRIORITY_CLASS if nice >= 15 else subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        return {"creationflags": priority}
+
+    def _require(self, job_id: int, statuses: tuple) -> Dict[str, Any]:
+        job = self.get_job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] not in statuses or not self._is_alive(job["pid"]):
+            raise ScanConflictError(f"Scan {job_id} is {job['status']}")
+        return job
+
+    def _is_alive(self, pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        if os.name == "nt":
+            # os.kill would terminate the process on Windows; trust the recorded status
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _update(self, job_id: int, **fields) -> None:
+        conn = self.db.get_write_connection(versioned=False)
+        with conn:
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            conn.execute(f"UPDATE scan_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.close()
+
+
+def _check_priority(nice: Optional[int], ionice_class: Optional[int], ionice_level: Optional[int]) -> None:
+    """Reject priority options out of range, or that this system cannot apply."""
+    if nice is not None and not -20 <= nice <= 19:
+        raise ValueError(f"nice must be between -20 and 19, got {nice}")
+    if ionice_class is not None and ionice_class not in (1, 2, 3):
+        raise ValueError(f"ionice_class must be 1, 2 or 3, got {ionice_class}")
+    if ionice_level is not None:
+        if ionice_class is None:
+            raise ValueError("ionice_level needs an ionice_class")
+        if not 0 <= ionice_level <= 7:
+            raise ValueError(f"ionice_level must be between 0 and 7, got {ionice_level}")
+    if nice and os.name != "nt":
+        _require_tool("nice")
+    if ionice_class is not None:
+        _require_tool("ionice")
+
+
+def _require_tool(name: str) -> str:
+    path = shutil.which(name)
+    if path is None:
+        raise ValueError(f"{name} is not available on this system")
+    return path
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """True if one root contains the other."""
+    try:
+        common = os.path.commonpath([a, b])
+    except ValueError:
+        return False
+    return common in (a, b)
+
+
+def _job_dict(row) -> Dict[str, Any]:
+    job = dict(row)
+    job["options"] = json.loads(job["options"]) if job["options"] else {}
+    return job
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Python Scanner
+Pure-Python fallback for the Rust engine: walks a directory tree, hashes files
+and writes them to the catalog. Takes the same arguments as the engine binary.
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+from database import Database
+
+PAUSE_POLL_INTERVAL = 0.5
+
+
+class Throttle:
+    """Shared read-rate limiter for all hashing threads (0 = unlimited)."""
+
+    def __init__(self, bytes_per_sec: int = 0):
+        self.bytes_per_sec = bytes_per_sec
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+
+    def consume(self, count: int) -> None:
+        if not self.bytes_per_sec:
+            return
+
+        with self.lock:
+            elapsed = time.monotonic() - self.window_start
+            # Idle for a while (or paused): start a new window instead of bursting
+            if elapsed > self.window_bytes / self.bytes_per_sec + 1:
+                self.window_start = time.monotonic()
+                self.window_bytes = 0
+            self.window_bytes += count
+            wait = self.window_bytes / self.bytes_per_sec - (time.monotonic() - self.window_start)
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+def compute_md5_throttled(path: str, throttle: Throttle) -> str:
+    """MD5 of a file, reading no faster than the throttle allows."""
+    md5_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            throttle.consume(len(block))
+            md5_hash.update(block)
+    return md5_hash.hexdigest()
+
+
+def build_file_entry(path: str, st: os.stat_result, md5: str) -> Dict[str, Any]:
+    """Catalog row for a file, with the same fields the engine's FileEntry has."""
+    filename = os.path.basename(path)
+    ext = os.path.splitext(filename)[1]
+    # Creation time where the platform reports one, 0 otherwise (as the engine does)
+    created = getattr(st, "st_birthtime", st.st_ctime if os.name == "nt" else 0)
+
+    return {
+        "path": path,
+        "filename": filename,
+        "extension": ext[1:] if ext else None,
+        "size_bytes": st.st_size,
+        "created_at": int(created),
+        "modified_at": int(st.st_mtime),
+        "md5_hash": md5,
+        "sha256_hash": None,
+    }
+
+
+def wait_while_paused(pause_path: Optional[str], on_wait: Callable[[], None]) -> None:
+    """Block while the pause flag file exists. Called between committed batches,
+    so a paused scan holds no lock on the catalog."""
+    while pause_path and os.path.exists(pause_path):
+        on_wait()
+        time.sleep(PAUSE_POLL_INTERVAL)
+
+
+def write_status(path: str, progress: Dict[str, Any]) -> None:
+    """Write scan progress in the engine's scan_status.json format."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+    except OSError:
+        pass
+
+
+def scan(scan_path: str, db_path: str, threads: int = 0, max_bytes_per_sec: int = 0,
+         batch_size: int = 1000, pause_path: Optional[str] = None) -> Dict[str, Any]:
+    """Scan scan_path into the catalog and purge files that disappeared since the last scan."""
+    db = Database(db_path)
+    db.ensure_schema()
+    generation = db.begin_scan_run(scan_path)
+    status_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), "scan_status.json")
+    throttle = Throttle(max_bytes_per_sec)
+
+    # Paths that exist but cannot be read keep their catalog rows instead of being purged
+    unreadable_files = []
+    unreadable_trees = []
+
+    def walk_error(e: OSError) -> None:
+        if e.filename and not isinstance(e, FileNotFoundError):
+            unreadable_trees.append(e.filename)
+
+    def hash_one(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            st = os.stat(path)
+            return build_file_entry(path, st, compute_md5_throttled(path, throttle))
+        except FileNotFoundError:
+            return None
+        except OSError:
+            unreadable_files.append(path)
+            return None
+
+    conn = db.get_write_connection()
+    total = 0
+
+    def store(paths) -> int:
+        # pool.map submits eagerly, so it is fed one batch of paths at a time
+        batch = [entry for entry in pool.map(hash_one, paths) if entry is not None]
+        db.upsert_files(batch, generation, conn)
+        progress = {
+            "scanned": total + len(batch),
+            "total": None,
+            "current_file": paths[-1],
+            "status": "running",
+        }
+        write_status(status_path, progress)
+        # Keeps the status file fresh, or /api/scan_progress would report the scan as gone
+        wait_while_paused(pause_path, lambda: write_status(status_path, {**progress, "status": "paused"}))
+        return len(batch)
+
+    with ThreadPoolExecutor(max_workers=threads or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        pending = []
+        for dirpath, _, filenames in os.walk(scan_path, onerror=walk_error):
+            for name in filenames:
+                pending.append(os.path.join(dirpath, name))
+                if len(pending) >= batch_size:
+                    total += store(pending)
+                    pending = []
+        if pending:
+            total += store(pending)
+    conn.close()
+
+    if unreadable_files or unreadable_trees:
+        db.keep_unreadable(unreadable_files, unreadable_trees, generation)
+    removed = db.finish_scan_run(generation, scan_path, total)
+    write_status(status_path, {
+        "scanned": total,
+        "total": total,
+        "current_file": "",
+        "status": "completed",
+        "removed_files": removed["files_removed"],
+        "removed_bytes": removed["bytes_removed"],
+    })
+    return {"scanned": total, **removed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan a directory into the catalog")
+    parser.add_argument("scan_path")
+    parser.add_argument("db_path")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--max-bytes-per-sec", type=int, default=0)
+    parser.add_argument("--pause-file", default=None, help="pause between batches while this file exists")
+    args = parser.parse_args()
+
+    start = time.time()
+    print(f"Starting scan of: {args.scan_path}")
+    result = scan(args.scan_path, args.db_path, args.threads, args.max_bytes_per_sec,
+                  pause_path=args.pause_file)
+    print(f"Scan complete in {time.time() - start:.2f}s")
+    print(f"Total file indexed: {result['scanned']}")
+    print(f"Removed {result['files_removed']} stale files ({result['bytes_removed']} bytes)")
@@ -25,6 +25,19 @@ def compute_sha256(file_path: str) -> str:
         raise Exception(f"Error hashing {file_path}: {e}")
 
 
+def compute_md5(file_path: str) -> str:
+    """Compute MD5 hash of a file (same digest the engine stores in md5_hash)."""
+    md5_hash = hashlib.md5()
+    
+    try:
+        with open(file_path, "rb") as f:
+            for byte_block in iter(lambda: f.read(1024 * 1024), b""):
+                md5_hash.update(byte_block)
+        return md5_hash.hexdigest()
+    except Exception as e:
+        raise Exception(f"Error hashing {file_path}: {e}")
+
+
 def compute_multiple(file_paths: List[str]) -> List[Dict[str, Any]]:
     """Compute SHA256 for multiple files."""
     results = []
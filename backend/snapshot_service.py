@@ -0,0 +1,366 @@
+"""
+Snapshot Service
+Keeps a compact, path-sorted record (path, size, mtime, content hash prefix)
+of the catalog after every completed scan, and diffs two of them - or one
+against the live catalog - with a streaming merge-join: O(n) time, memory
+bounded by one record per side plus the requested page and one counter per
+rolled-up directory.
+
+Snapshot file layout (gzip, level 1): a magic line, then one record per file
+in SQLite path order:
+    varint shared prefix length with the previous path (bytes)
+    varint suffix length, suffix bytes
+    varint size, zigzag varint mtime, 8 bytes of the MD5
+"""
+
+import os
+import gzip
+import heapq
+import time
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from database import Database
+
+MAGIC = b"CATSNAP1\n"
+HASH_BYTES = 8
+CURRENT = "current"
+
+CHANGE_TYPES = ("new", "deleted", "grown", "modified")
+
+Record = Tuple[bytes, int, int, bytes]  # path, size, mtime, hash prefix
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _hash_prefix(md5_hash: Optional[str]) -> bytes:
+    """Exactly HASH_BYTES of the hash; short hashes are zero-padded, invalid ones zeroed,
+    since records are fixed-width here."""
+    try:
+        return bytes.fromhex(md5_hash[:HASH_BYTES * 2]).ljust(HASH_BYTES, b"\0")
+    except (TypeError, ValueError):
+        return bytes(HASH_BYTES)
+
+
+class SnapshotWriter:
+    def __init__(self, path: str):
+        self._file = gzip.open(path, "wb", compresslevel=1)
+        self._file.write(MAGIC)
+        self._previous = b""
+        self._pending: List[bytes] = []
+
+    def write(self, path: bytes, size: int, mtime: int, hash_prefix: bytes) -> None:
+        previous = self._previous
+        shared = 0
+        limit = min(len(previous), len(path))
+        while shared < limit and previous[shared] == path[shared]:
+            shared += 1
+        suffix = path[shared:]
+        self._pending.append(b"".join((
+            _varint(shared), _varint(len(suffix)), suffix,
+            _varint(size), _varint(_zigzag(mtime)), hash_prefix,
+        )))
+        self._previous = path
+        if len(self._pending) >= 4096:
+            self._file.write(b"".join(self._pending))
+            self._pending = []
+
+    def close(self) -> None:
+        if self._pending:
+            self._file.write(b"".join(self._pending))
+        self._file.close()
+
+
+def read_snapshot(path: str, chunk_size: int = 1024 * 1024) -> Iterator[Record]:
+    """Stream the records of a snapshot file in path order."""
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+
+        buffer = b""
+        pos = 0
+        eof = False
+        previous = b""
+        while True:
+            # Keep at least one whole record (paths are far below 64 KB) in the buffer
+            if not eof and len(buffer) - pos < 64 * 1024:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+            if pos >= len(buffer):
+                return
+
+            values = []
+            for _ in range(2):
+                value = shift = 0
+                while True:
+                    byte = buffer[pos]
+                    pos += 1
+                    value |= (byte & 0x7F) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
+                values.append(value)
+            shared, length = values
+            path_bytes = previous[:shared] + buffer[pos:pos + length]
+            pos += length
+
+            values = []
+            for _ in range(2):
+                value = shift = 0
+                while True:
+                    byte = buffer[pos]
+                    pos += 1
+                    value |= (byte & 0x7F) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
+                values.append(value)
+            hash_prefix = buffer[pos:pos + HASH_BYTES]
+            pos += HASH_BYTES
+
+            previous = path_bytes
+            yield path_bytes, values[0], _unzigzag(values[1]), hash_prefix
+
+
+class SnapshotService:
+    def __init__(self, db_path: str, retention: int = 10):
+        self.db = Database(db_path)
+        self.retention = retention
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(db_path)), "snapshots")
+
+    def take(self, generation: Optional[int] = None) -> Dict[str, Any]:
+        """Write a snapshot of the whole catalog, tagged with the latest scan generation."""
+        if generation is None:
+            generation = self.db.get_latest_generation()
+        os.makedirs(self.directory, exist_ok=True)
+        file_path = os.path.join(self.directory, f"snapshot_{generation}.snap")
+        temp_path = file_path + ".tmp"
+
+        start = time.time()
+        count = total = 0
+        writer = SnapshotWriter(temp_path)
+        try:
+            for path, size, mtime, hash_prefix in self._iter_catalog():
+                writer.write(path, size, mtime, hash_prefix)
+                count += 1
+                total += size
+        finally:
+            writer.close()
+        os.replace(temp_path, file_path)
+
+        meta = {
+            "generation": generation,
+            "created_at": int(start),
+            "file_path": file_path,
+            "file_count": count,
+            "total_bytes": total,
+            "stored_bytes": os.path.getsize(file_path),
+        }
+        conn = self.db.get_write_connection()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO scan_snapshots
+                    (generation, created_at, file_path, file_count, total_bytes, stored_bytes)
+                VALUES (:generation, :created_at, :file_path, :file_count, :total_bytes, :stored_bytes)
+            """, meta)
+        conn.close()
+
+        self._prune()
+        meta["duration_seconds"] = round(time.time() - start, 3)
+        return meta
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        conn = self.db.get_connection()
+        rows = conn.execute("SELECT * FROM scan_snapshots ORDER BY generation DESC").fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def diff(self, base: Optional[str] = None, target: Optional[str] = None, path: Optional[str] = None,
+             change: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100,
+             depth: int = 1, rollup_limit: int = 50) -> Dict[str, Any]:
+        """Merge-join two snapshots (generation numbers or "current").
+
+        Defaults compare the latest snapshot with the one before it. One pass
+        produces the totals, the page of changes after cursor (in path order)
+        and the directories with the largest byte deltas at the given depth
+        below path.
+        """
+        if change and change not in CHANGE_TYPES:
+            raise ValueError(f"Unknown change type: {change}")
+        base, target = self._resolve(base, target)
+
+        low, high = Database.subtree_range(path) if path else (None, None)
+        low_bytes = low.encode("utf-8", "surrogatepass") if low else None
+        high_bytes = high.encode("utf-8", "surrogatepass") if high else None
+        after = cursor.encode("utf-8", "surrogatepass") if cursor else None
+        if path:
+            sep = "\\" if "\\" in path else "/"
+            prefix_parts = len(path.rstrip(sep).split(sep))
+        else:
+            prefix_parts = 1
+
+        totals = {c: {"count": 0, "bytes_delta": 0} for c in CHANGE_TYPES}
+        page: List[Dict[str, Any]] = []
+        more = False
+        # A directory's own files and its subdirectories interleave in path order
+        # ("/d/a.txt" < "/d/sub/x" < "/d/z.txt"), so rollups accumulate by key
+        rollups: Dict[bytes, list] = {}
+
+        for kind, old, new in self._merge(self._open(base, low_bytes, high_bytes),
+                                          self._open(target, low_bytes, high_bytes)):
+            path_bytes = (new or old)[0]
+            delta = (new[1] if new else 0) - (old[1] if old else 0)
+            totals[kind]["count"] += 1
+            totals[kind]["bytes_delta"] += delta
+
+            directory = self._rollup_key(path_bytes, prefix_parts, depth)
+            rollup = rollups.get(directory)
+            if rollup is None:
+                rollup = rollups[directory] = [0, {c: 0 for c in CHANGE_TYPES}]
+            rollup[0] += delta
+            rollup[1][kind] += 1
+
+            if (change and kind != change) or (after is not None and path_bytes <= after):
+                continue
+            if len(page) >= limit:
+                more = True
+                continue
+            page.append({
+                "path": path_bytes.decode("utf-8", "surrogatepass"),
+                "change": kind,
+                "old_size": old[1] if old else None,
+                "new_size": new[1] if new else None,
+                "size_delta": delta,
+                "old_modified": old[2] if old else None,
+                "new_modified": new[2] if new else None,
+            })
+        largest = heapq.nsmallest(rollup_limit, rollups.items(), key=lambda r: (-abs(r[1][0]), r[0]))
+
+        return {
+            "base": base,
+            "target": target,
+            "summary": totals,
+            "changes": page,
+            "next_cursor": page[-1]["path"] if more and page else None,
+            "directories": [
+                {"directory": d.decode("utf-8", "surrogatepass"), "bytes_delta": delta, **counts}
+                for d, (delta, counts) in largest
+            ],
+        }
+
+    def _merge(self, old_records: Iterator[Record], new_records: Iterator[Record]):
+        """Yield (change, old record, new record) for every path that differs."""
+        old = next(old_records, None)
+        new = next(new_records, None)
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                yield "deleted", old, None
+                old = next(old_records, None)
+            elif old is None or new[0] < old[0]:
+                yield "new", None, new
+                new = next(new_records, None)
+            else:
+                if new[1] > old[1]:
+                    yield "grown", old, new
+                elif new[1] != old[1] or new[2] != old[2] or new[3] != old[3]:
+                    yield "modified", old, new
+                old = next(old_records, None)
+                new = next(new_records, None)
+
+    def _open(self, name: str, low: Optional[bytes], high: Optional[bytes]) -> Iterator[Record]:
+        if name == CURRENT:
+            return self._iter_catalog(low, high)
+        records = read_snapshot(self._file_for(int(name)))
+        if low is None:
+            return records
+        return self._clip(records, low, high)
+
+    def _clip(self, records: Iterator[Record], low: bytes, high: bytes) -> Iterator[Record]:
+        for record in records:
+            if record[0] >= high:
+                return
+            if record[0] >= low:
+                yield record
+
+    def _iter_catalog(self, low: Optional[bytes] = None, high: Optional[bytes] = None) -> Iterator[Record]:
+        """Stream the live catalog in SQLite path order (the order snapshots are stored in)."""
+        sql = "SELECT path, size_bytes, modified_at, md5_hash FROM files"
+        params: List[Any] = []
+        if low is not None:
+            sql += " WHERE path >= ? AND path < ?"
+            params = [low.decode("utf-8", "surrogatepass"), high.decode("utf-8", "surrogatepass")]
+        sql += " ORDER BY path"
+
+        conn = self.db.get_connection()
+        conn.row_factory = None
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for path, size, mtime, md5_hash in rows:
+                    yield path.encode("utf-8", "surrogatepass"), size, mtime or 0, _hash_prefix(md5_hash)
+        finally:
+            conn.close()
+
+    def _rollup_key(self, path: bytes, prefix_parts: int, depth: int) -> bytes:
+        # Catalogs hold paths from either OS, so the separator is per path
+        sep = b"\\" if b"\\" in path else b"/"
+        parts = path.split(sep)[:-1]  # drop the filename
+        return sep.join(parts[:prefix_parts + depth]) or sep
+
+    def _resolve(self, base: Optional[str], target: Optional[str]) -> Tuple[str, str]:
+        generations = [str(s["generation"]) for s in self.list_snapshots()]
+        if target is None:
+            if not generations:
+                raise LookupError("No snapshots yet")
+            target = generations[0]
+        if base is None:
+            older = [g for g in generations if target == CURRENT or int(g) < int(target)]
+            if not older:
+                raise LookupError("No earlier snapshot to compare with")
+            base = older[0]
+        for name in (base, target):
+            if name != CURRENT and name not in generations:
+                raise LookupError(f"Snapshot {name} not found")
+        return base, target
+
+    def _file_for(self, generation: int) -> str:
+        conn = self.db.get_connection()
+        row = conn.execute("SELECT file_path FROM scan_snapshots WHERE generation = ?", (generation,)).fetchone()
+        conn.close()
+        if row is None:
+            raise LookupError(f"Snapshot {generation} not found")
+        return row[0]
+
+    def _prune(self) -> None:
+        """Keep only the newest snapshots, as set by retention."""
+        stale = self.list_snapshots()[self.retention:]
+        if not stale:
+            return
+        conn = self.db.get_write_connection()
+        with conn:
+            conn.executemany("DELETE FROM scan_snapshots WHERE generation = ?",
+                             [(s["generation"],) for s in stale])
+        conn.close()
+        for snapshot in stale:
+            try:
+                os.remove(snapshot["file_path"])
+            except FileNotFoundError:
+                pass
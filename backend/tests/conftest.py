@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# main reads its configuration at import; keep it away from the real catalog
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "catalog.db"))
+os.environ.setdefault("WARMUP", "0")
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """An empty catalog with the backend's schema."""
+    path = str(tmp_path / "catalog.db")
+    Database(path).ensure_schema()
+    return path
+
+
+def file_entry(path, size=100, md5=None, mtime=None):
+    """An engine FileEntry for path."""
+    sep = "\\" if "\\" in path else "/"
+    filename = path.rsplit(sep, 1)[-1]
+    return {
+        "path": path,
+        "filename": filename,
+        "extension": filename.rsplit(".", 1)[-1] if "." in filename else None,
+        "size_bytes": size,
+        "created_at": mtime or int(time.time()),
+        "modified_at": mtime or int(time.time()),
+        "md5_hash": md5 or hashlib.md5(path.encode("utf-8")).hexdigest(),
+    }
+
+
+def catalog_tree(tmp_path, add_files, names):
+    """Files named names (10 bytes each) under tmp_path/tree, cataloged as a full scan of it."""
+    root = tmp_path / "tree"
+    root.mkdir()
+    entries = []
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 10)
+        st = os.stat(path)
+        entries.append(file_entry(str(path), size=st.st_size, mtime=int(st.st_mtime)))
+    add_files(entries, root=str(root))
+    return root
+
+
+@pytest.fixture
+def add_files(db_path):
+    """Upsert entries into the catalog; with a root, as a full scan of it."""
+    def add(entries, root=None):
+        db = Database(db_path)
+        if root is None:
+            db.upsert_files(entries, db.get_latest_generation())
+            return
+        generation = db.begin_scan_run(root)
+        db.upsert_files(entries, generation)
+        db.finish_scan_run(generation, root, len(entries))
+    return add
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    """A TestClient for the app, serving db_path."""
+    from fastapi.testclient import TestClient
+    import main
+    from scan_manager import ScanManager
+    from result_cache import ResultCache
+
+    monkeypatch.setattr(main, "DB_PATH", db_path)
+    monkeypatch.setattr(main, "scan_manager", ScanManager(db_path, main.ENGINE_PATH))
+    monkeypatch.setattr(main, "result_cache", ResultCache(db_path))
+    with TestClient(main.app) as test_client:
+        yield test_client
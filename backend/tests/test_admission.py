@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+import main
+from admission import AdmissionRejected, RequestClass
+from conftest import file_entry
+
+
+def request_for(path):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_release_hands_the_slot_to_the_next_waiter():
+    async def run():
+        request_class = RequestClass("test", limit=1, queue_depth=1, timeout=5)
+        await request_class.acquire()
+        waiter = asyncio.ensure_future(request_class.acquire())
+        await asyncio.sleep(0)
+        assert request_class.status()["queued"] == 1
+
+        with pytest.raises(AdmissionRejected, match="queue depth"):
+            await request_class.acquire()
+
+        request_class.release(0.1)
+        await waiter
+        assert request_class.active == 1
+        assert request_class.status()["queued"] == 0
+        request_class.release(0.1)
+        assert request_class.active == 0
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_rejects_and_frees_its_place():
+    async def run():
+        request_class = RequestClass("test", limit=1, queue_depth=1, timeout=0.05)
+        await request_class.acquire()
+        with pytest.raises(AdmissionRejected, match="timeout"):
+            await request_class.acquire()
+        assert request_class.status()["queued"] == 0
+
+    asyncio.run(run())
+
+
+def test_buffered_response_releases_when_the_endpoint_returns():
+    async def call_next(request):
+        assert main.REQUEST_CLASSES["light"].active == 1
+        return JSONResponse({"ok": True})
+
+    asyncio.run(main.admission_control(request_for("/api/stats"), call_next))
+    assert main.REQUEST_CLASSES["light"].active == 0
+
+
+def test_endpoint_error_releases():
+    async def call_next(request):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.admission_control(request_for("/api/stats"), call_next))
+    assert main.REQUEST_CLASSES["light"].active == 0
+
+
+def test_stream_that_is_never_read_releases_once_sent():
+    async def call_next(request):
+        return StreamingResponse(iter([b"row\n"]))
+
+    async def run():
+        response = await main.admission_control(request_for("/api/export/csv"), call_next)
+        assert main.REQUEST_CLASSES["export"].active == 1
+        # The client went away before the body was iterated
+        await response.background()
+        assert main.REQUEST_CLASSES["export"].active == 0
+        # Reading it after all does not release a second time
+        assert [chunk async for chunk in response.body_iterator] == [b"row\n"]
+        assert main.REQUEST_CLASSES["export"].active == 0
+
+    asyncio.run(run())
+
+
+def test_slots_are_free_after_requests(client, add_files):
+    add_files([file_entry("/data/a.txt")])
+
+    assert client.get("/api/stats").status_code == 200
+    assert client.get("/api/export/csv").status_code == 200
+
+    assert all(c.active == 0 for c in main.REQUEST_CLASSES.values())
@@ -0,0 +1,36 @@
+import pytest
+
+from batch_service import BatchService
+from conftest import file_entry
+from database import Database
+
+QUERIES = [
+    {"name": "stats", "view": "stats", "params": {}},
+    {"name": "bad_field", "view": "largest", "params": {"fields": ["nope"]}},
+    {"name": "bad_param", "view": "tree", "params": {"colour": "red"}},
+    {"name": "largest", "view": "largest", "params": {"limit": 1}},
+]
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_failing_view_does_not_fail_the_batch(db_path, add_files, concurrent):
+    add_files([file_entry("/data/a.txt", size=10), file_entry("/data/b.txt", size=20)])
+
+    response = BatchService(db_path).run(QUERIES, concurrent=concurrent)
+
+    results = response["results"]
+    assert response["catalog_version"] == Database(db_path).get_catalog_version()
+    assert results["stats"]["result"]["total_files"] == 2
+    assert results["bad_field"]["error"].startswith("ValueError: Unknown field(s): nope")
+    assert results["bad_param"]["error"].startswith("TypeError")
+    assert [f["path"] for f in results["largest"]["result"]] == ["/data/b.txt"]
+
+
+def test_batch_request_errors_are_400(client):
+    unknown = client.post("/api/batch", json={"queries": [{"name": "a", "view": "nope"}]})
+    duplicate = client.post("/api/batch", json={"queries": [{"name": "a", "view": "stats"},
+                                                           {"name": "a", "view": "stats"}]})
+
+    assert unknown.status_code == 400
+    assert "nope" in unknown.json()["detail"]
+    assert duplicate.status_code == 400
@@ -0,0 +1,68 @@
+import sqlite3
+
+from conftest import file_entry
+from database import Database
+
+
+def test_version_ignores_checkpoints_and_closed_connections(db_path, add_files):
+    add_files([file_entry("/data/a.txt")])
+    db = Database(db_path)
+    version = db.get_catalog_version()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    assert db.get_catalog_version() == version
+
+
+def test_every_data_write_changes_the_version(db_path, add_files):
+    db = Database(db_path)
+    versions = [db.get_catalog_version()]
+
+    add_files([file_entry("/data/a.txt")])
+    versions.append(db.get_catalog_version())
+    db.update_sha256_hash(1, "0" * 64)
+    versions.append(db.get_catalog_version())
+    generation = db.begin_scan_run("/data")
+    versions.append(db.get_catalog_version())
+    db.finish_scan_run(generation, "/data", 0)
+    versions.append(db.get_catalog_version())
+
+    assert len(set(versions)) == len(versions)
+
+
+def test_bookkeeping_and_empty_writes_keep_the_version(db_path, add_files):
+    add_files([file_entry("/data/a.txt")])
+    db = Database(db_path)
+    version = db.get_catalog_version()
+
+    conn = db.get_write_connection(versioned=False)
+    with conn:
+        conn.execute("INSERT INTO refresh_runs (root, status, started_at) VALUES (NULL, 'running', 0)")
+    conn.close()
+    conn = db.get_write_connection()
+    with conn:
+        conn.execute("DELETE FROM files WHERE path = '/nowhere'")
+    conn.close()
+
+    assert db.get_catalog_version() == version
+
+
+def test_restart_keeps_the_version(db_path, add_files):
+    add_files([file_entry("/data/a.txt")])
+    db = Database(db_path)
+    version = db.get_catalog_version()
+
+    db.ensure_schema()
+    db.ensure_schema()
+
+    assert db.get_catalog_version() == version
+    assert db.get_stats()["total_files"] == 1
+
+
+def test_replaced_catalog_does_not_reuse_versions(tmp_path):
+    first, second = Database(str(tmp_path / "a.db")), Database(str(tmp_path / "b.db"))
+    first.ensure_schema()
+    second.ensure_schema()
+    assert first.get_catalog_version() != second.get_catalog_version()
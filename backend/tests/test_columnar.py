@@ -0,0 +1,45 @@
+import pytest
+
+import main
+import columnar_snapshot
+from conftest import file_entry
+
+pytestmark = pytest.mark.skipif(not columnar_snapshot.is_available(), reason="requires numpy")
+
+
+@pytest.fixture
+def columnar_client(client, add_files, monkeypatch):
+    monkeypatch.setattr(main, "COLUMNAR_SNAPSHOT", True)
+    add_files([file_entry("/data/small.txt", size=10, mtime=2000),
+               file_entry("/data/big.bin", size=1000, mtime=3000),
+               file_entry("/data/old.log", size=100, mtime=1000)])
+    return client
+
+
+@pytest.mark.parametrize("path", ["/api/largest", "/api/oldest"])
+def test_columnar_rows_match_sql(columnar_client, monkeypatch, path):
+    columnar = columnar_client.get(path).json()
+    monkeypatch.setattr(main, "COLUMNAR_SNAPSHOT", False)
+    assert columnar == columnar_client.get(path).json()
+
+
+def test_largest_falls_back_to_sql_for_fields_the_snapshot_rows_lack(columnar_client):
+    response = columnar_client.get("/api/largest", params={"fields": "filename,created_at"})
+
+    assert response.status_code == 200
+    assert response.json() == [{"filename": "big.bin", "created_at": 3000},
+                               {"filename": "old.log", "created_at": 1000},
+                               {"filename": "small.txt", "created_at": 2000}]
+
+
+def test_oldest_projection_from_the_snapshot(columnar_client):
+    response = columnar_client.get("/api/oldest", params={"fields": "filename,created_at", "format": "columnar"})
+
+    assert response.json() == {"columns": ["filename", "created_at"],
+                               "data": [["old.log", "small.txt", "big.bin"], [1000, 2000, 3000]]}
+
+
+def test_snapshot_reloads_after_a_catalog_write(columnar_client, add_files):
+    assert len(columnar_client.get("/api/largest").json()) == 3
+    add_files([file_entry("/data/new.txt", size=5)])
+    assert len(columnar_client.get("/api/largest").json()) == 4
@@ -0,0 +1,58 @@
+import gzip
+
+import pytest
+
+import main
+from compression import accepts_gzip, add_vary, gzip_chunks
+from conftest import file_entry
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("GZIP", True),
+    ("*", True),
+    ("", False),
+    ("br, deflate", False),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("*;q=0", False),
+    ("gzip;q=nonsense", False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+def test_gzip_chunks_is_one_stream():
+    chunks = ["text ", b"bytes ", "", "more"]
+    assert gzip.decompress(b"".join(gzip_chunks(chunks))) == b"text bytes more"
+
+
+def test_add_vary_keeps_existing_values():
+    headers = {"vary": "Origin"}
+    add_vary(headers, "Accept-Encoding")
+    add_vary(headers, "accept-encoding")
+    assert headers["vary"] == "Origin, Accept-Encoding"
+
+
+def test_large_json_is_gzipped_when_accepted(client, add_files):
+    add_files([file_entry(f"/data/{i:05}/file.txt") for i in range(2000)])
+
+    gzipped = client.get("/api/search", params={"query": "file"}, headers={"Accept-Encoding": "gzip"})
+    refused = client.get("/api/search", params={"query": "file"}, headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in refused.headers
+    assert gzipped.json() == refused.json()
+    assert "Accept-Encoding" in gzipped.headers["vary"]
+    assert "Accept-Encoding" in refused.headers["vary"]
+
+
+def test_small_json_still_varies(client, add_files, monkeypatch):
+    monkeypatch.setattr(main, "COMPRESS_MIN_BYTES", 1024 * 1024)
+    add_files([file_entry("/data/a.txt")])
+
+    response = client.get("/api/stats", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
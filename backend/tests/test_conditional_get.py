@@ -0,0 +1,65 @@
+import datetime
+
+import main
+from conftest import file_entry
+
+
+def test_unchanged_catalog_answers_304(client, add_files):
+    add_files([file_entry("/data/a.txt")])
+    first = client.get("/api/stats")
+    etag = first.headers["etag"]
+
+    second = client.get("/api/stats", headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+
+def test_weak_tag_of_gzipped_body_matches(client, add_files):
+    add_files([file_entry(f"/data/{i:05}/file.txt") for i in range(2000)])
+    first = client.get("/api/search", params={"query": "file"}, headers={"Accept-Encoding": "gzip"})
+    assert first.headers.get("content-encoding") == "gzip"
+    assert first.headers["etag"].startswith("W/")
+
+    second = client.get("/api/search", params={"query": "file"},
+                        headers={"If-None-Match": first.headers["etag"], "Accept-Encoding": "gzip"})
+    assert second.status_code == 304
+
+
+def test_catalog_write_changes_the_etag(client, add_files):
+    add_files([file_entry("/data/a.txt")])
+    etag = client.get("/api/stats").headers["etag"]
+
+    add_files([file_entry("/data/b.txt")])
+    response = client.get("/api/stats", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["total_files"] == 2
+    assert response.headers["etag"] != etag
+
+
+def test_parameters_are_part_of_the_etag(client, add_files):
+    add_files([file_entry("/data/a.txt")])
+    etag = client.get("/api/largest", params={"limit": 1}).headers["etag"]
+    assert client.get("/api/largest", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_clock_dependent_views_change_etag_with_the_date(client, add_files, monkeypatch):
+    add_files([file_entry("/data/a.txt")])
+    etag = client.get("/api/suggestions").headers["etag"]
+
+    class Tomorrow(datetime.date):
+        @classmethod
+        def today(cls):
+            return datetime.date.today() + datetime.timedelta(days=1)
+
+    monkeypatch.setattr(main, "date", Tomorrow)
+    response = client.get("/api/suggestions", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_unversioned_paths_have_no_etag(client):
+    assert "etag" not in client.get("/api/metrics").headers
@@ -0,0 +1,28 @@
+from conftest import file_entry
+from cube_service import CubeService
+
+
+def test_stale_cube_is_served_then_rebuilt_after_the_response(client, add_files, db_path):
+    add_files([file_entry("/data/a.mp4", size=10)], root="/data")
+    CubeService(db_path).rebuild()
+    add_files([file_entry("/data/a.mp4", size=10), file_entry("/data/b.mp4", size=20)], root="/data")
+
+    stale = client.get("/api/cube").json()
+    assert stale["stale"] is True
+    assert stale["total_files"] == 1
+
+    # The background rebuild has run by the time TestClient returns
+    fresh = client.get("/api/cube").json()
+    assert fresh["stale"] is False
+    assert fresh["total_files"] == 2
+
+
+def test_query_does_not_rebuild(add_files, db_path):
+    add_files([file_entry("/data/a.mp4")], root="/data")
+    cube = CubeService(db_path)
+
+    result = cube.query()
+
+    assert result["stale"] is True
+    assert result["cells"] == []
+    assert cube.is_stale()
@@ -0,0 +1,35 @@
+import os
+import time
+
+from conftest import file_entry
+from export_cache import ExportCache, STALE_TEMP_SECONDS
+
+
+def test_render_leaves_only_the_artifact(add_files, db_path):
+    add_files([file_entry("/data/a.txt")])
+    cache = ExportCache(db_path)
+
+    artifact = cache.get("csv")
+
+    assert sorted(os.listdir(cache.directory)) == sorted(
+        [".csv.lock", os.path.basename(artifact["path"]), os.path.basename(artifact["gz_path"])]
+    )
+
+
+def test_eviction_keeps_live_temp_files_of_other_workers(add_files, db_path):
+    add_files([file_entry("/data/a.txt")])
+    cache = ExportCache(db_path, budget_bytes=0)
+    cache.get("csv")
+    live = os.path.join(cache.directory, ".json-abc.json.x1.gz.tmp")
+    dead = os.path.join(cache.directory, ".json-abc.json.x2.tmp")
+    for p in (live, dead):
+        with open(p, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - STALE_TEMP_SECONDS - 60
+    os.utime(dead, (old, old))
+
+    cache.evict()
+
+    assert os.path.exists(live)
+    assert not os.path.exists(dead)
+    assert os.path.exists(os.path.join(cache.directory, ".csv.lock"))
@@ -0,0 +1,48 @@
+import datetime
+import time
+
+import pytest
+
+import histogram_service
+import main
+from conftest import file_entry
+from histogram_service import HistogramService, DAY
+
+pytestmark = pytest.mark.skipif(not histogram_service.is_available(), reason="requires numpy")
+
+
+def counts_by_label(result):
+    return {b["label"]: b["count"] for b in result["buckets"] if b["count"]}
+
+
+def test_age_histogram_moves_with_the_clock(db_path, add_files, monkeypatch):
+    now = int(time.time())
+    add_files([file_entry("/data/a.txt", mtime=now - 3 * DAY)])
+    service = HistogramService(db_path)
+    assert counts_by_label(service.age_histogram()) == {"1-7 dias": 1}
+
+    monkeypatch.setattr(histogram_service.time, "time", lambda: now + 400 * DAY)
+
+    assert counts_by_label(service.age_histogram()) == {"1-2 anos": 1}
+
+
+def test_size_histogram_buckets_by_power_of_two(db_path, add_files):
+    add_files([file_entry("/data/a", size=0), file_entry("/data/b", size=3), file_entry("/data/c", size=1000)])
+    result = HistogramService(db_path).size_histogram()
+    assert [(b["min_bytes"], b["count"]) for b in result["buckets"]] == [(0, 1), (2, 1), (512, 1)]
+
+
+def test_age_endpoint_recomputes_on_a_new_local_day(client, add_files, monkeypatch):
+    now = int(time.time())
+    add_files([file_entry("/data/a.txt", mtime=now - 3 * DAY)])
+    assert counts_by_label(client.get("/api/histograms/age").json()) == {"1-7 dias": 1}
+
+    class Later(datetime.date):
+        @classmethod
+        def today(cls):
+            return datetime.date.fromtimestamp(now + 400 * DAY)
+
+    # The cached histogram is keyed by main's local date, and recomputed when it changes
+    monkeypatch.setattr(histogram_service.time, "time", lambda: now + 400 * DAY)
+    monkeypatch.setattr(main, "date", Later)
+    assert counts_by_label(client.get("/api/histograms/age").json()) == {"1-2 anos": 1}
@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import file_entry
+from database import Database
+
+
+def query_plan(db_path, sql):
+    conn = Database(db_path).get_connection()
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    conn.close()
+    return " ".join(row[-1] for row in rows)
+
+
+def test_largest_files_read_only_the_covering_index(db_path):
+    plan = query_plan(db_path, """
+        SELECT path, filename, extension, size_bytes, modified_at
+        FROM files ORDER BY size_bytes DESC LIMIT 100
+    """)
+    assert "COVERING INDEX idx_size_cover" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_oldest_files_read_only_the_covering_index(db_path):
+    plan = query_plan(db_path, """
+        SELECT path, filename, extension, size_bytes, modified_at, created_at
+        FROM files ORDER BY modified_at ASC LIMIT 100
+    """)
+    assert "COVERING INDEX idx_modified_cover" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_hot_indexes_all_exist(db_path, add_files):
+    from main import HOT_INDEXES
+    add_files([file_entry("/data/a.txt"), file_entry("/data/b.txt")])
+
+    entries = Database(db_path).prewarm_indexes(HOT_INDEXES)
+
+    assert set(entries) == set(HOT_INDEXES)
+    assert all(count == 2 for count in entries.values())
+
+
+def test_prewarm_rejects_unknown_indexes(db_path):
+    with pytest.raises(ValueError, match="idx_gone"):
+        Database(db_path).prewarm_indexes(["idx_size", "idx_gone"])
+
+
+def test_path_has_no_redundant_index(db_path):
+    conn = Database(db_path).get_write_connection()
+    conn.execute("CREATE INDEX idx_path ON files(path)")
+    conn.close()
+
+    Database(db_path).ensure_schema()
+
+    conn = Database(db_path).get_connection()
+    leading_on_path = [
+        row[1] for row in conn.execute("PRAGMA index_list(files)")
+        if conn.execute(f"PRAGMA index_info({row[1]})").fetchone()[2] == "path"
+    ]
+    conn.close()
+    assert sorted(leading_on_path) == ["idx_path_generation", "sqlite_autoindex_files_1"]
@@ -0,0 +1,102 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from conftest import file_entry
+from database import Database
+from ingest_service import IngestService, IngestError
+
+
+def ndjson(entries):
+    return b"".join(json.dumps(e).encode("utf-8") + b"\n" for e in entries)
+
+
+def ingest(db_path, body, root=None, compressed=False, chunk_size=7):
+    service = IngestService(db_path, compressed=compressed)
+    service.begin(root)
+    try:
+        for i in range(0, len(body), chunk_size):
+            service.feed(body[i:i + chunk_size])
+        return service.finish()
+    except Exception:
+        service.abort()
+        raise
+
+
+def paths(db_path):
+    conn = Database(db_path).get_connection()
+    rows = sorted(r[0] for r in conn.execute("SELECT path FROM files"))
+    conn.close()
+    return rows
+
+
+def test_plain_ndjson(db_path):
+    entries = [file_entry(f"/data/f{i}.txt") for i in range(5)]
+    summary = ingest(db_path, ndjson(entries))
+    assert summary["rows"] == 5
+    assert paths(db_path) == sorted(e["path"] for e in entries)
+
+
+def test_every_gzip_member_is_read(db_path):
+    first = [file_entry(f"/data/a{i}.txt") for i in range(3)]
+    second = [file_entry(f"/data/b{i}.txt") for i in range(3)]
+    body = gzip.compress(ndjson(first)) + gzip.compress(ndjson(second))
+
+    summary = ingest(db_path, body, root="/data", compressed=True)
+
+    assert summary["rows"] == 6
+    assert summary["files_removed"] == 0
+    assert paths(db_path) == sorted(e["path"] for e in first + second)
+
+
+def test_trailing_garbage_after_gzip_is_rejected(db_path):
+    body = gzip.compress(ndjson([file_entry("/data/a.txt")])) + b"not gzip"
+    with pytest.raises(zlib.error):
+        ingest(db_path, body, compressed=True)
+
+
+def test_truncated_gzip_is_rejected(db_path):
+    body = gzip.compress(ndjson([file_entry(f"/data/f{i}.txt") for i in range(50)]))
+    with pytest.raises(zlib.error):
+        ingest(db_path, body[:-10], compressed=True)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("md5_hash", "aa"),
+    ("md5_hash", "A" * 32),
+    ("size_bytes", "12"),
+    ("size_bytes", True),
+    ("size_bytes", -1),
+    ("modified_at", 1.5),
+    ("path", 3),
+])
+def test_invalid_fields_name_the_line(db_path, field, value):
+    bad = dict(file_entry("/data/bad.txt"), **{field: value})
+    body = ndjson([file_entry("/data/ok.txt"), bad])
+    with pytest.raises(IngestError, match="line 2"):
+        ingest(db_path, body, root="/data")
+
+
+def test_invalid_line_does_not_purge(db_path, add_files):
+    add_files([file_entry("/data/keep.txt")], root="/data")
+    body = ndjson([file_entry("/data/new.txt"), {"path": "/data/keep.txt"}])
+    with pytest.raises(IngestError):
+        ingest(db_path, body, root="/data")
+    assert "/data/keep.txt" in paths(db_path)
+
+
+def test_failed_rooted_upload_is_not_the_latest_generation(db_path):
+    ingest(db_path, ndjson([file_entry("/data/a.txt")]), root="/data")
+    db = Database(db_path)
+    completed = db.get_latest_generation()
+
+    with pytest.raises(IngestError):
+        ingest(db_path, ndjson([file_entry("/data/b.txt")]) + b"{}\n", root="/data")
+
+    failed = db.get_scan_runs()[0]
+    assert failed["status"] == "failed"
+    assert failed["finished_at"] is not None
+    assert db.get_latest_generation() == completed
+    assert db.get_latest_generation(include_running=True) == completed
@@ -0,0 +1,56 @@
+import os
+import time
+
+from conftest import file_entry, catalog_tree
+from database import Database
+from refresh_service import RefreshService, start_refresh, get_refresh_status
+
+
+def test_refresh_removes_deleted_files_from_stats(db_path, tmp_path, add_files):
+    root = catalog_tree(tmp_path, add_files, ["a.txt", "b.txt", "sub/c.log"])
+    db = Database(db_path)
+    assert db.get_stats()["total_files"] == 3
+
+    os.remove(root / "b.txt")
+    summary = RefreshService(db_path).refresh()
+
+    assert summary["vanished"] == 1
+    stats = db.get_stats()
+    assert stats["total_files"] == 2
+    assert stats["total_size"] == 20
+    assert [f["path"] for f in db.search_files("b.txt")] == []
+
+
+def test_refresh_rehashes_changed_files(db_path, tmp_path, add_files):
+    root = catalog_tree(tmp_path, add_files, ["a.txt", "b.txt"])
+    (root / "a.txt").write_bytes(b"changed content")
+
+    summary = RefreshService(db_path).refresh()
+
+    assert summary["changed"] == 1
+    assert summary["unchanged"] == 1
+    row = Database(db_path).search_files("a.txt")[0]
+    assert row["size_bytes"] == len(b"changed content")
+
+
+def test_refresh_state_is_shared_through_the_catalog(db_path, tmp_path, add_files):
+    catalog_tree(tmp_path, add_files, ["a.txt"])
+    assert get_refresh_status(db_path)["status"] == "idle"
+
+    assert start_refresh(db_path)
+    deadline = time.time() + 10
+    while get_refresh_status(db_path)["status"] == "running" and time.time() < deadline:
+        time.sleep(0.05)
+
+    state = get_refresh_status(db_path)
+    assert state["status"] == "completed"
+    assert state["result"]["unchanged"] == 1
+
+
+def test_refresh_left_running_by_a_dead_worker_is_interrupted(db_path):
+    conn = Database(db_path).get_write_connection()
+    with conn:
+        conn.execute("INSERT INTO refresh_runs (root, status, started_at) VALUES (NULL, 'running', 0)")
+    conn.close()
+
+    assert get_refresh_status(db_path)["status"] == "interrupted"
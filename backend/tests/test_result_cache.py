@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+import file_lock
+import result_cache
+from conftest import file_entry
+from result_cache import ResultCache
+
+
+def test_concurrent_misses_compute_once(db_path):
+    cache = ResultCache(db_path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    bodies = []
+    threads = [threading.Thread(target=lambda: bodies.append(cache.get_or_compute("view", {}, compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert bodies == [b'{"answer":42}'] * 8
+    # The per-key lock goes away with its last user
+    assert result_cache._locks == {}
+
+
+def test_different_keys_do_not_wait_for_each_other(db_path):
+    cache = ResultCache(db_path)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=cache.get_or_compute, args=("slow", {}, slow))
+    thread.start()
+    started.wait(5)
+    try:
+        assert cache.get_or_compute("fast", {}, lambda: "fast") == b'"fast"'
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_failed_compute_frees_the_claim(db_path):
+    cache = ResultCache(db_path)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("view", {}, fail)
+    assert cache.get_or_compute("view", {}, lambda: [1]) == b"[1]"
+
+
+def test_stale_claim_of_a_dead_worker_is_taken_over(db_path):
+    cache = ResultCache(db_path)
+    cache.get_or_compute("other", {}, lambda: None)
+    conn = cache._connect()
+    with conn:
+        conn.execute("UPDATE results SET body = NULL, claimed_at = 0")
+    conn.close()
+
+    assert cache.get_or_compute("other", {}, lambda: "mine") == b'"mine"'
+
+
+def test_catalog_write_invalidates(db_path, add_files):
+    cache = ResultCache(db_path)
+    total_files = lambda: cache.db.get_stats()["total_files"]
+    add_files([file_entry("/data/a.txt")])
+    assert cache.get_or_compute("total", {}, total_files) == b"1"
+
+    add_files([file_entry("/data/b.txt")])
+
+    assert cache.get_or_compute("total", {}, total_files) == b"2"
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / ".lock")
+    held = file_lock.acquire(path)
+
+    assert file_lock.acquire(path, blocking=False) is None
+
+    file_lock.release(held)
+    again = file_lock.acquire(path, blocking=False)
+    assert again is not None
+    file_lock.release(again)
+
+
+def test_locked_waits_for_the_holder(tmp_path):
+    path = str(tmp_path / ".lock")
+    held = file_lock.acquire(path)
+    order = []
+
+    def waiter():
+        with file_lock.locked(path):
+            order.append("waiter")
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.2)
+    order.append("holder")
+    file_lock.release(held)
+    thread.join(5)
+
+    assert order == ["holder", "waiter"]
@@ -0,0 +1,83 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from database import Database
+from scan_manager import ScanManager
+
+
+def wait_for(condition, timeout=15):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def manager(db_path):
+    return ScanManager(db_path, "missing-engine")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for i in range(3):
+        (root / f"f{i}.txt").write_bytes(b"x" * 10)
+    return str(root)
+
+
+@pytest.mark.parametrize("options, message", [
+    ({"nice": 20}, "nice"),
+    ({"nice": -21}, "nice"),
+    ({"ionice_class": 4}, "ionice_class"),
+    ({"ionice_class": 2, "ionice_level": 8}, "ionice_level"),
+    ({"ionice_level": 3}, "ionice_class"),
+])
+def test_priority_options_are_validated(manager, tree, options, message):
+    with pytest.raises(ValueError, match=message):
+        manager.start(tree, scanner="python", **options)
+    assert manager.list_jobs() == []
+
+
+def test_missing_ionice_is_reported(manager, tree, monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda name: None if name == "ionice" else "/usr/bin/" + name)
+    with pytest.raises(ValueError, match="ionice is not available"):
+        manager.start(tree, scanner="python", ionice_class=3)
+
+
+@pytest.mark.skipif(shutil.which("nice") is None, reason="needs nice")
+def test_nice_prefixes_the_command(manager, tree):
+    options = {"nice": 10, "ionice_class": None, "ionice_level": None,
+               "max_bytes_per_sec": None, "max_concurrency": None}
+    cmd = manager._build_command(tree, "python", options, "pause")
+    assert cmd[1:3] == ["-n", "10"]
+    assert manager._priority_kwargs(10) == {}
+
+
+def test_failed_launch_fails_the_job(manager, tree, monkeypatch):
+    def popen(*args, **kwargs):
+        raise subprocess.SubprocessError("Exception occurred in preexec_fn.")
+    monkeypatch.setattr(subprocess, "Popen", popen)
+
+    with pytest.raises(ValueError, match="Could not start scanner"):
+        manager.start(tree, scanner="python")
+    assert manager.list_jobs()[0]["status"] == "failed"
+
+
+def test_cancel_closes_the_scan_run(manager, tree, db_path):
+    job = manager.start(tree, scanner="python")
+    manager.pause(job["id"])
+    db = Database(db_path)
+    # The scanner holds between batches while paused, with its run open
+    wait_for(lambda: any(run["status"] == "running" for run in db.get_scan_runs()))
+
+    manager.cancel(job["id"])
+    wait_for(lambda: manager.get_job(job["id"])["status"] == "cancelled")
+
+    run = db.get_scan_runs()[0]
+    assert run["status"] == "cancelled"
+    assert run["finished_at"] is not None
+    assert db.get_latest_generation() == 0
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import threading
+
+import scanner
+from database import Database
+
+
+def test_unreadable_files_survive_the_purge(db_path, tmp_path, monkeypatch):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for name in ("a.txt", "locked.txt", "gone.txt"):
+        (root / name).write_bytes(b"x" * 10)
+    scanner.scan(str(root), db_path)
+
+    (root / "gone.txt").unlink()
+    hash_file = scanner.compute_md5_throttled
+
+    def locked(path, throttle):
+        if path.endswith("locked.txt"):
+            raise PermissionError(13, "Permission denied", path)
+        return hash_file(path, throttle)
+
+    monkeypatch.setattr(scanner, "compute_md5_throttled", locked)
+    result = scanner.scan(str(root), db_path)
+
+    assert result["files_removed"] == 1
+    paths = {f["filename"] for f in Database(db_path).search_files("")}
+    assert paths == {"a.txt", "locked.txt"}
+
+
+def test_pause_file_holds_the_scan_between_batches(db_path, tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (root / name).write_bytes(b"x")
+    pause_path = tmp_path / "scan.pause"
+    pause_path.touch()
+    status_path = os.path.join(os.path.dirname(db_path), "scan_status.json")
+
+    worker = threading.Thread(target=scanner.scan, args=(str(root), db_path),
+                              kwargs={"batch_size": 1, "pause_path": str(pause_path)})
+    worker.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and not _status_is(status_path, "paused"):
+        time.sleep(0.05)
+
+    try:
+        assert _status_is(status_path, "paused")
+        # The first batch is committed, and the catalog is free for other writers
+        assert Database(db_path).get_stats()["total_files"] == 1
+        conn = Database(db_path).get_write_connection()
+        with conn:
+            conn.execute("INSERT INTO catalog_meta (key, value) VALUES ('probe', '1')")
+        conn.close()
+    finally:
+        pause_path.unlink()
+        worker.join(timeout=10)
+
+    assert Database(db_path).get_stats()["total_files"] == 3
+
+
+def _status_is(path, status):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["status"] == status
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,63 @@
+from conftest import file_entry
+from snapshot_service import SnapshotService, read_snapshot, _hash_prefix, HASH_BYTES
+
+
+def rollups(result):
+    return {d["directory"]: d for d in result["directories"]}
+
+
+def test_interleaved_directory_is_rolled_up_once(db_path, add_files):
+    service = SnapshotService(db_path)
+    service.take(0)
+    add_files([
+        file_entry("/data/a.txt", size=10),
+        file_entry("/data/d0/x", size=100),
+        file_entry("/data/z.txt", size=1000),
+    ])
+
+    result = service.diff(base="0", target="current", path="/data")
+
+    directories = [d["directory"] for d in result["directories"]]
+    assert sorted(directories) == ["/data", "/data/d0"]
+    assert rollups(result)["/data"]["new"] == 2
+    assert rollups(result)["/data"]["bytes_delta"] == 1010
+    assert result["summary"]["new"] == {"count": 3, "bytes_delta": 1110}
+
+
+def test_windows_paths_roll_up_by_backslash(db_path, add_files):
+    service = SnapshotService(db_path)
+    service.take(0)
+    add_files([
+        file_entry("C:\\Users\\a.txt", size=5),
+        file_entry("C:\\Data\\b.txt", size=7),
+    ])
+
+    result = service.diff(base="0", target="current")
+
+    assert sorted(rollups(result)) == ["C:\\Data", "C:\\Users"]
+
+
+def test_snapshot_round_trip_and_diff_between_generations(db_path, add_files):
+    service = SnapshotService(db_path)
+    # A fixed mtime: keep.txt must not look modified if the second write lands a second later
+    add_files([file_entry("/data/keep.txt", size=1, mtime=1000), file_entry("/data/grow.txt", size=1, mtime=1000),
+               file_entry("/data/gone.txt", size=1, mtime=1000)])
+    service.take(1)
+    add_files([file_entry("/data/keep.txt", size=1, mtime=1000), file_entry("/data/grow.txt", size=50, mtime=1000),
+               file_entry("/data/new.txt", size=3, mtime=1000)], root="/data")
+    service.take(2)
+
+    result = service.diff(base="1", target="2")
+
+    changes = {c["path"]: c["change"] for c in result["changes"]}
+    assert changes == {"/data/gone.txt": "deleted", "/data/grow.txt": "grown", "/data/new.txt": "new"}
+    records = list(read_snapshot(service._file_for(2)))
+    assert [r[0] for r in records] == sorted(r[0] for r in records)
+
+
+def test_short_hash_keeps_records_fixed_width(db_path, add_files):
+    assert len(_hash_prefix("aa")) == HASH_BYTES
+    service = SnapshotService(db_path)
+    add_files([file_entry("/data/a.txt", md5="aa"), file_entry("/data/b.txt")])
+    service.take(1)
+    assert [r[0] for r in read_snapshot(service._file_for(1))] == [b"/data/a.txt", b"/data/b.txt"]
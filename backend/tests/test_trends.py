@@ -0,0 +1,32 @@
+from conftest import file_entry
+from trend_service import TrendService
+
+
+def test_directories_group_by_each_paths_separator(db_path, add_files):
+    add_files([
+        file_entry("C:\\Users\\bob\\docs\\a.txt", size=10),
+        file_entry("C:\\Users\\bob\\b.txt", size=20),
+        file_entry("C:\\Data\\c.txt", size=40),
+        file_entry("/srv/www/site/index.html", size=80),
+    ])
+
+    state = TrendService(db_path, directory_depth=2)._aggregate()
+
+    assert state["directories"] == {
+        "C:\\Users": [2, 30],
+        "C:\\Data": [1, 40],
+        "/srv/www": [1, 80],
+    }
+
+
+def test_delta_snapshots_rebuild_each_generation(db_path, add_files):
+    service = TrendService(db_path, keyframe_interval=30)
+    add_files([file_entry("/data/a/x.txt", size=10)])
+    assert service.record(1)["keyframe"]
+    add_files([file_entry("/data/a/y.txt", size=5), file_entry("/data/b/z.log", size=7)])
+    assert not service.record(2)["keyframe"]
+
+    result = service.trends(directory="/data/a")
+
+    assert [p["total_bytes"] for p in result["series"]] == [10, 22]
+    assert [p["directory_bytes"] for p in result["series"]] == [10, 15]
@@ -0,0 +1,33 @@
+import os
+
+from refresh_service import RefreshService
+from watcher_service import WatcherService
+from database import Database
+from conftest import catalog_tree
+
+
+def test_discovering_refresh_catalogs_new_subdirectories(db_path, tmp_path, add_files):
+    root = catalog_tree(tmp_path, add_files, ["a.txt", "old/b.txt"])
+    (root / "new" / "deeper").mkdir(parents=True)
+    (root / "new" / "c.txt").write_bytes(b"c")
+    (root / "new" / "deeper" / "d.txt").write_bytes(b"d")
+    (root / "old" / "e.txt").write_bytes(b"e")
+    os.remove(root / "a.txt")
+
+    summary = RefreshService(db_path, discover=True).refresh(str(root))
+
+    assert summary["added"] == 3
+    assert summary["vanished"] == 1
+    names = {f["filename"] for f in Database(db_path).search_files("")}
+    assert names == {"b.txt", "c.txt", "d.txt", "e.txt"}
+
+
+def test_only_one_watcher_per_catalog(db_path, tmp_path):
+    first, second = WatcherService(db_path), WatcherService(db_path)
+    try:
+        assert first.start([str(tmp_path)])
+        assert not second.start([str(tmp_path)])
+    finally:
+        first.stop()
+    assert second.start([str(tmp_path)])
+    second.stop()
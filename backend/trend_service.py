@@ -0,0 +1,212 @@
+"""
+Trend Service
+Records catalog totals, per-extension and per-top-level-directory aggregates
+after every scan and serves them as growth series. Each snapshot stores only
+the entries that changed since the previous one (zlib-compressed JSON), with
+a full keyframe every few snapshots so a series never replays too far.
+"""
+
+import json
+import zlib
+import time
+from typing import List, Dict, Any, Optional
+from database import Database
+
+KEYFRAME_INTERVAL = 30
+DIRECTORY_DEPTH = 2  # "/home/alice", "C:\\Users"
+MAX_DIRECTORIES = 500  # the largest are tracked, the rest are summed under OTHER_DIRECTORIES
+
+NO_EXTENSION = ""  # JSON keys are strings; stands for a NULL extension
+OTHER_DIRECTORIES = "*"
+
+
+class TrendService:
+    def __init__(self, db_path: str, keyframe_interval: int = KEYFRAME_INTERVAL,
+                 directory_depth: int = DIRECTORY_DEPTH):
+        self.db = Database(db_path)
+        self.keyframe_interval = keyframe_interval
+        self.directory_depth = directory_depth
+
+    def record(self, generation: Optional[int] = None) -> Dict[str, Any]:
+        """Aggregate the catalog and store it as a delta against the last snapshot."""
+        if generation is None:
+            generation = self.db.get_latest_generation()
+        state = self._aggregate()
+
+        conn = self.db.get_connection()
+        rows = conn.execute("""
+            SELECT generation, is_keyframe, payload FROM stats_snapshots
+            WHERE generation >= COALESCE(
+                (SELECT MAX(generation) FROM stats_snapshots WHERE is_keyframe = 1 AND generation < ?), 0)
+              AND generation < ?
+            ORDER BY generation
+        """, (generation, generation)).fetchall()
+        conn.close()
+
+        previous = None
+        for row in rows:
+            previous = self._apply(previous, row["is_keyframe"], row["payload"])
+        is_keyframe = previous is None or len(rows) >= self.keyframe_interval
+
+        if is_keyframe:
+            payload = {"extensions": state["extensions"], "directories": state["directories"]}
+        else:
+            payload = {
+                "extensions": self._delta(previous["extensions"], state["extensions"]),
+                "directories": self._delta(previous["directories"], state["directories"]),
+            }
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+        conn = self.db.get_write_connection()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO stats_snapshots
+                    (generation, created_at, total_files, total_bytes, is_keyframe, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (generation, int(time.time()), state["total_files"], state["total_bytes"],
+                  int(is_keyframe), blob))
+        conn.close()
+
+        return {
+            "generation": generation,
+            "total_files": state["total_files"],
+            "total_bytes": state["total_bytes"],
+            "keyframe": is_keyframe,
+            "stored_bytes": len(blob),
+        }
+
+    def trends(self, extension: Optional[str] = None, directory: Optional[str] = None,
+               since: Optional[int] = None, top: int = 10) -> Dict[str, Any]:
+        """Growth series for the catalog, and for one extension or directory if given.
+
+        Also ranks the extensions and directories that grew the most between
+        the first and the last snapshot in the window.
+        """
+        conn = self.db.get_connection()
+        start = 0
+        if since is not None:
+            # Replay from the keyframe at or before the window
+            row = conn.execute("""
+                SELECT MAX(generation) FROM stats_snapshots WHERE is_keyframe = 1 AND created_at <= ?
+            """, (since,)).fetchone()
+            start = row[0] or 0
+        rows = conn.execute("""
+            SELECT generation, created_at, total_files, total_bytes, is_keyframe, payload
+            FROM stats_snapshots WHERE generation >= ? ORDER BY generation
+        """, (start,)).fetchall()
+        conn.close()
+
+        ext_key = NO_EXTENSION if extension is None else extension
+        series = []
+        state = first = None
+        for row in rows:
+            state = self._apply(state, row["is_keyframe"], row["payload"])
+            if since is not None and row["created_at"] < since:
+                continue
+            if first is None:
+                first = state
+            point = {
+                "generation": row["generation"],
+                "created_at": row["created_at"],
+                "total_files": row["total_files"],
+                "total_bytes": row["total_bytes"],
+            }
+            if extension is not None:
+                point["extension_files"], point["extension_bytes"] = state["extensions"].get(ext_key, (0, 0))
+            if directory is not None:
+                point["directory_files"], point["directory_bytes"] = state["directories"].get(directory, (0, 0))
+            series.append(point)
+
+        result: Dict[str, Any] = {"series": series, "top_extensions": [], "top_directories": []}
+        if first is not None:
+            result["top_extensions"] = [
+                {"extension": key or None, **growth}
+                for key, growth in self._growth(first["extensions"], state["extensions"], top)
+            ]
+            result["top_directories"] = [
+                {"directory": key, **growth}
+                for key, growth in self._growth(first["directories"], state["directories"], top)
+            ]
+        return result
+
+    def _aggregate(self) -> Dict[str, Any]:
+        conn = self.db.get_connection()
+        conn.row_factory = None
+        extensions = {
+            NO_EXTENSION if ext is None else ext: [count, total]
+            for ext, count, total in conn.execute(
+                "SELECT extension, COUNT(*), SUM(size_bytes) FROM files GROUP BY extension"
+            )
+        }
+
+        directories: Dict[str, List[int]] = {}
+        cursor = conn.execute("SELECT path, size_bytes FROM files")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for path, size in rows:
+                key = self._directory_of(path)
+                entry = directories.get(key)
+                if entry is None:
+                    directories[key] = [1, size]
+                else:
+                    entry[0] += 1
+                    entry[1] += size
+        conn.close()
+
+        if len(directories) > MAX_DIRECTORIES:
+            ranked = sorted(directories.items(), key=lambda d: d[1][1], reverse=True)
+            directories = dict(ranked[:MAX_DIRECTORIES])
+            directories[OTHER_DIRECTORIES] = [sum(v[0] for _, v in ranked[MAX_DIRECTORIES:]),
+                                              sum(v[1] for _, v in ranked[MAX_DIRECTORIES:])]
+
+        return {
+            "total_files": sum(v[0] for v in extensions.values()),
+            "total_bytes": sum(v[1] for v in extensions.values()),
+            "extensions": extensions,
+            "directories": directories,
+        }
+
+    def _directory_of(self, path: str) -> str:
+        # Catalogs hold paths from either OS, so the separator is per path
+        sep = "\\" if "\\" in path else "/"
+        parts = path.split(sep)
+        # Absolute POSIX paths start with an empty component for the leading "/"
+        depth = self.directory_depth + 1 if parts[0] == "" else self.directory_depth
+        return sep.join(parts[:min(depth, len(parts) - 1)]) or sep
+
+    def _delta(self, previous: Dict[str, list], current: Dict[str, list]) -> Dict[str, Optional[list]]:
+        """Changed and added entries; removed ones map to None."""
+        delta: Dict[str, Optional[list]] = {k: v for k, v in current.items() if previous.get(k) != v}
+        delta.update((k, None) for k in previous if k not in current)
+        return delta
+
+    def _apply(self, state: Optional[Dict[str, Any]], is_keyframe: int, blob: bytes) -> Dict[str, Any]:
+        payload = json.loads(zlib.decompress(blob))
+        if is_keyframe or state is None:
+            return payload
+
+        new_state = {}
+        for section in ("extensions", "directories"):
+            merged = dict(state[section])
+            for key, value in payload[section].items():
+                if value is None:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+            new_state[section] = merged
+        return new_state
+
+    def _growth(self, first: Dict[str, list], last: Dict[str, list], top: int) -> List[tuple]:
+        growth = []
+        for key in set(first) | set(last):
+            old_files, old_bytes = first.get(key, (0, 0))
+            new_files, new_bytes = last.get(key, (0, 0))
+            growth.append((key, {
+                "files_delta": new_files - old_files,
+                "bytes_delta": new_bytes - old_bytes,
+                "bytes": new_bytes,
+            }))
+        growth.sort(key=lambda g: g[1]["bytes_delta"], reverse=True)
+        return growth[:top]
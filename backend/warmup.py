@@ -0,0 +1,53 @@
+"""
+Warm-up
+Runs the startup steps that make the first requests fast (page-cache
+prewarming, precomputed aggregates) in a background thread, timing each
+one, and reports readiness once they are all done.
+"""
+
+import time
+import threading
+import traceback
+from typing import List, Tuple, Callable, Dict, Any, Optional
+import metrics
+
+
+class Warmup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {"status": "pending", "steps": {}, "seconds": None}
+        self._started: Optional[float] = None
+
+    def start(self, steps: List[Tuple[str, Callable[[], Any]]]) -> None:
+        """Run steps in order in a background thread. A failed step is recorded and skipped."""
+        self._started = time.perf_counter()
+        with self._lock:
+            self._state["status"] = "running"
+        threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self._state["status"] == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._state, "steps": dict(self._state["steps"])}
+
+    def _run(self, steps: List[Tuple[str, Callable[[], Any]]]) -> None:
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+                outcome = {"seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                traceback.print_exc()
+                outcome = {"seconds": round(time.perf_counter() - start, 3), "error": f"{type(e).__name__}: {e}"}
+            metrics.observe(f"warmup.{name}.seconds", outcome["seconds"])
+            with self._lock:
+                self._state["steps"][name] = outcome
+
+        seconds = time.perf_counter() - self._started
+        metrics.observe("warmup.seconds", seconds)
+        with self._lock:
+            self._state["status"] = "ready"
+            self._state["seconds"] = round(seconds, 3)
@@ -0,0 +1,364 @@
+"""
+Watcher Service
+Keeps the catalog current between scans. Follows the cataloged roots with
+Linux inotify (through ctypes), coalesces bursts of events and applies them
+as batched upserts and deletes. Subtrees that cannot be watched (no inotify,
+watch limit reached, queue overflow) fall back to periodic stat refresh,
+which removes vanished files and catalogs new ones the same way. One watcher
+runs per catalog, whichever worker process starts it.
+"""
+
+import os
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set
+from database import Database
+from refresh_service import RefreshService
+from scanner import build_file_entry
+from sha256_computer import compute_md5
+import file_lock
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Inotify:
+    """Minimal ctypes binding for inotify."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float) -> List[tuple]:
+        """Wait up to timeout seconds and return (wd, mask, name) tuples."""
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        if not poller.poll(timeout * 1000):
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WatcherService:
+    def __init__(self, db_path: str, debounce: float = 2.0, max_delay: float = 10.0,
+                 hash_workers: int = 4, poll_interval: float = 300.0):
+        self.db = Database(db_path)
+        self.db_path = db_path
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.hash_workers = hash_workers
+        self.poll_interval = poll_interval
+
+        self._thread: Optional[threading.Thread] = None
+        # Held while watching, so other worker processes do not watch the same catalog
+        self._lock_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), ".watcher.lock")
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._inotify: Optional[Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._watch_ids: Dict[str, int] = {}
+
+        self.roots: List[str] = []
+        self.degraded: Set[str] = set()
+        self.stats = {"events": 0, "flushes": 0, "upserted": 0, "deleted": 0, "polls": 0}
+        self.last_flush: Optional[float] = None
+        self.last_poll: Optional[float] = None
+
+        # Pending changes, coalesced until the burst settles
+        self._dirty_files: Set[str] = set()
+        self._new_dirs: Set[str] = set()
+        self._gone_dirs: Set[str] = set()
+
+    def start(self, roots: Optional[List[str]] = None) -> bool:
+        """Start watching roots (default: every root scanned so far). False if already
+        running, here or in another worker process."""
+        if self._thread and self._thread.is_alive():
+            return False
+        roots = roots or self._cataloged_roots()
+        self._lock_file = file_lock.acquire(self._lock_path, blocking=False)
+        if self._lock_file is None:
+            return False
+
+        self.roots = roots
+        self.degraded = set()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def status(self) -> Dict[str, Any]:
+        """State of this process's watcher. other_worker is set when another worker
+        process runs the catalog's watcher; its details are only known there."""
+        running = bool(self._thread and self._thread.is_alive())
+        other_worker = False
+        if not running:
+            lock_file = file_lock.acquire(self._lock_path, blocking=False)
+            other_worker = lock_file is None
+            if lock_file is not None:
+                file_lock.release(lock_file)
+        return {
+            "running": running,
+            "other_worker": other_worker,
+            "mode": ("inotify" if self._inotify else "polling") if running else None,
+            "roots": self.roots,
+            "watches": len(self._watches),
+            "degraded_subtrees": sorted(self.degraded),
+            "pending": len(self._dirty_files) + len(self._new_dirs) + len(self._gone_dirs),
+            "last_flush": self.last_flush,
+            "last_poll": self.last_poll,
+            **self.stats,
+        }
+
+    def _cataloged_roots(self) -> List[str]:
+        conn = self.db.get_connection()
+        rows = conn.execute("SELECT DISTINCT root FROM scan_runs WHERE status = 'completed'").fetchall()
+        conn.close()
+
+        # Nested roots are covered by their parents
+        roots = sorted(row[0] for row in rows if os.path.isdir(row[0]))
+        return [r for r in roots if not any(r != p and r.startswith(p.rstrip(os.sep) + os.sep) for p in roots)]
+
+    def _run(self) -> None:
+        try:
+            self._watch()
+        finally:
+            file_lock.release(self._lock_file)
+            self._lock_file = None
+
+    def _watch(self) -> None:
+        try:
+            self._inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            # Not Linux, or inotify disabled: poll every root
+            print(f"Watcher: inotify unavailable ({e}), using periodic refresh")
+            self._inotify = None
+            self.degraded.update(self.roots)
+
+        if self._inotify:
+            for root in self.roots:
+                self._watch_tree(root)
+
+        self.last_poll = time.time()
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+            first_event = last_event = None
+            while not self._stop.is_set():
+                if self._inotify:
+                    events = self._inotify.read_events(timeout=0.5)
+                else:
+                    events = []
+                    self._stop.wait(0.5)
+
+                if events:
+                    now = time.time()
+                    first_event = first_event or now
+                    last_event = now
+                    self._handle_events(events)
+
+                # Flush once the burst is quiet, or if it keeps going for too long
+                now = time.time()
+                if first_event and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                    self._flush(pool)
+                    first_event = last_event = None
+
+                if self.degraded and now - self.last_poll >= self.poll_interval:
+                    self._poll_degraded()
+
+            if first_event:
+                self._flush(pool)
+
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+        self._watch_ids.clear()
+
+    def _watch_tree(self, top: str) -> None:
+        """Add a watch to every directory under top; degrade what cannot be watched."""
+        for dirpath, dirnames, _ in os.walk(top):
+            try:
+                wd = self._inotify.add_watch(dirpath, WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # fs.inotify.max_user_watches exhausted: poll this subtree instead
+                    print(f"Watcher: watch limit reached at {dirpath}, polling that subtree")
+                    self.degraded.add(dirpath)
+                    dirnames.clear()
+                    continue
+                if e.errno in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    dirnames.clear()
+                    continue
+                raise
+            self._watches[wd] = dirpath
+            self._watch_ids[dirpath] = wd
+
+    def _unwatch_tree(self, top: str) -> None:
+        prefix = top.rstrip(os.sep) + os.sep
+        for path in [p for p in self._watch_ids if p == top or p.startswith(prefix)]:
+            wd = self._watch_ids.pop(path)
+            self._watches.pop(wd, None)
+            self._inotify.rm_watch(wd)
+
+    def _handle_events(self, events: List[tuple]) -> None:
+        for wd, mask, name in events:
+            self.stats["events"] += 1
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: we no longer know what changed anywhere
+                print("Watcher: event queue overflow, refreshing all roots")
+                self.degraded.update(self.roots)
+                self.last_poll = 0
+                continue
+
+            if mask & IN_IGNORED:
+                path = self._watches.pop(wd, None)
+                if path:
+                    self._watch_ids.pop(path, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._new_dirs.add(path)
+                    self._gone_dirs.discard(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._gone_dirs.add(path)
+                    self._new_dirs.discard(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_ATTRIB | IN_DELETE | IN_MOVED_FROM):
+                self._dirty_files.add(path)
+
+    def _flush(self, pool: ThreadPoolExecutor) -> None:
+        """Apply the coalesced changes: one delete/upsert batch per burst."""
+        gone_dirs, new_dirs, dirty = self._gone_dirs, self._new_dirs, self._dirty_files
+        self._gone_dirs, self._new_dirs, self._dirty_files = set(), set(), set()
+
+        for directory in gone_dirs:
+            self._unwatch_tree(directory)
+        for directory in new_dirs:
+            self._watch_tree(directory)
+            for dirpath, _, filenames in os.walk(directory):
+                dirty.update(os.path.join(dirpath, f) for f in filenames)
+
+        known = self._lookup(dirty)
+        deleted = [(path,) for path in dirty if not os.path.isfile(path) and path in known]
+        candidates = [path for path in dirty if os.path.isfile(path)]
+        # Events like IN_ATTRIB often leave size and mtime untouched: skip the hash
+        entries = [e for e in pool.map(lambda p: self._entry_if_changed(p, known.get(p)), candidates) if e]
+
+        conn = self.db.get_write_connection()
+        with conn:
+            for directory in gone_dirs:
+                conn.execute("DELETE FROM files WHERE path >= ? AND path < ?", Database.subtree_range(directory))
+            conn.executemany("DELETE FROM files WHERE path = ?", deleted)
+            if entries:
+                self.db.upsert_files(entries, self.db.get_latest_generation(include_running=True), conn)
+        conn.close()
+
+        self.stats["flushes"] += 1
+        self.stats["upserted"] += len(entries)
+        self.stats["deleted"] += len(deleted)
+        self.last_flush = time.time()
+
+    def _lookup(self, paths: Set[str]) -> Dict[str, tuple]:
+        """Cataloged (size, mtime) for the given paths."""
+        conn = self.db.get_connection()
+        known = {}
+        batch = list(paths)
+        for i in range(0, len(batch), 500):
+            chunk = batch[i:i + 500]
+            rows = conn.execute(
+                f"SELECT path, size_bytes, modified_at FROM files WHERE path IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            known.update((row[0], (row[1], row[2])) for row in rows)
+        conn.close()
+        return known
+
+    def _entry_if_changed(self, path: str, known: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        try:
+            st = os.stat(path)
+            if known and known == (st.st_size, int(st.st_mtime)):
+                return None
+            return build_file_entry(path, st, compute_md5(path))
+        except Exception:
+            return None
+
+    def _poll_degraded(self) -> None:
+        """Stat-refresh every subtree that inotify is not covering."""
+        refresher = RefreshService(self.db_path, discover=True)
+        for subtree in sorted(self.degraded):
+            try:
+                refresher.refresh(subtree)
+            except Exception as e:
+                print(f"Watcher: refresh of {subtree} failed: {e}")
+        self.stats["polls"] += 1
+        self.last_poll = time.time()
+
+        # After an overflow the watches are still in place; only real gaps stay degraded
+        if self._inotify:
+            self.degraded = {d for d in self.degraded if d not in self._watch_ids}
@@ -1,5 +1,6 @@
 use crate::models::FileEntry;
-use rusqlite::{params, Connection, Result};
+use rusqlite::{params, Connection, Result, Transaction};
+use std::time::{SystemTime, UNIX_EPOCH};
 
 pub struct Database {
     conn: Connection,
@@ -32,11 +33,31 @@ impl Database {
                 modified_at INTEGER,
                 md5_hash TEXT NOT NULL,
                 sha256_hash TEXT,
-                sha256_verified INTEGER DEFAULT 0
+                sha256_verified INTEGER DEFAULT 0,
+                scan_generation INTEGER DEFAULT 0
             );
 
-            -- Indexes for Search Performance
-            CREATE INDEX IF NOT EXISTS idx_path ON files(path);
+            -- One row per scan; its id is the generation stamped on every file it sees
+            CREATE TABLE IF NOT EXISTS scan_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                root TEXT NOT NULL,
+                started_at INTEGER NOT NULL,
+                finished_at INTEGER,
+                status TEXT NOT NULL,
+                files_seen INTEGER DEFAULT 0,
+                files_removed INTEGER DEFAULT 0,
+                bytes_removed INTEGER DEFAULT 0
+            );
+
+            -- The catalog version the backend keys its caches on; every write bumps it
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            INSERT OR IGNORE INTO catalog_meta (key, value)
+            VALUES ('catalog_id', lower(hex(randomblob(16)))), ('write_counter', 0);
+
+            -- Indexes for Search Performance (path lookups use the UNIQUE constraint's index)
             CREATE INDEX IF NOT EXISTS idx_filename ON files(filename);
             CREATE INDEX IF NOT EXISTS idx_extension ON files(extension);
             CREATE INDEX IF NOT EXISTS idx_size ON files(size_bytes);
@@ -46,17 +67,129 @@ impl Database {
             CREATE INDEX IF NOT EXISTS idx_dupe_check ON files(size_bytes, md5_hash);
             ",
         )?;
+
+        // Catalogs created by older engine versions
+        self.ensure_column("sha256_verified", "INTEGER DEFAULT 0")?;
+        self.ensure_column("scan_generation", "INTEGER DEFAULT 0")?;
+
+        // Covers the stale-row range delete after each scan. idx_path duplicated
+        // the UNIQUE constraint's index, so it only added write cost.
+        self.conn.execute_batch(
+            "CREATE INDEX IF NOT EXISTS idx_path_generation ON files(path, scan_generation);
+            DROP INDEX IF EXISTS idx_path;",
+        )?;
+        Ok(())
+    }
+
+    fn ensure_column(&self, name: &str, definition: &str) -> Result<()> {
+        let mut stmt = self.conn.prepare("PRAGMA table_info(files)")?;
+        let exists = stmt
+            .query_map([], |row| row.get::<_, String>(1))?
+            .filter_map(|c| c.ok())
+            .any(|c| c == name);
+
+        if !exists {
+            self.conn.execute_batch(&format!(
+                "ALTER TABLE files ADD COLUMN {} {};",
+                name, definition
+            ))?;
+        }
         Ok(())
     }
 
-    pub fn insert_files(&mut self, files: &[FileEntry]) -> Result<()> {
+    /// Registers a new scan of `root` and returns its generation number.
+    pub fn begin_scan_run(&mut self, root: &str) -> Result<i64> {
+        let tx = self.conn.transaction()?;
+        tx.execute(
+            "INSERT INTO scan_runs (root, started_at, status) VALUES (?1, ?2, 'running')",
+            params![root, unix_now()],
+        )?;
+        let generation = tx.last_insert_rowid();
+        bump_version(&tx)?;
+        tx.commit()?;
+        Ok(generation)
+    }
+
+    /// Stamps the existing rows of paths the scan found but could not read with
+    /// `generation`, so finish_scan_run keeps them: unreadable `files` themselves,
+    /// and everything below the unreadable `trees`. Returns the rows kept.
+    pub fn keep_unreadable(
+        &mut self,
+        files: &[String],
+        trees: &[String],
+        generation: i64,
+    ) -> Result<usize> {
+        let tx = self.conn.transaction()?;
+        let mut kept = 0;
+        {
+            let mut by_path =
+                tx.prepare("UPDATE files SET scan_generation = ?1 WHERE path = ?2")?;
+            let mut by_tree = tx.prepare(
+                "UPDATE files SET scan_generation = ?1
+                 WHERE path >= ?2 AND path < ?3 AND scan_generation < ?1",
+            )?;
+            for path in files.iter().chain(trees) {
+                kept += by_path.execute(params![generation, path])?;
+            }
+            for tree in trees {
+                let (lower, upper) = subtree_range(tree);
+                kept += by_tree.execute(params![generation, lower, upper])?;
+            }
+        }
+        bump_version(&tx)?;
+        tx.commit()?;
+        Ok(kept)
+    }
+
+    /// Removes every file under `root` that the scan `generation` did not see
+    /// (deleted from disk since an earlier scan). Returns (files, bytes) removed.
+    pub fn finish_scan_run(
+        &mut self,
+        generation: i64,
+        root: &str,
+        files_seen: usize,
+    ) -> Result<(i64, i64)> {
+        let (lower, upper) = subtree_range(root);
+        let tx = self.conn.transaction()?;
+
+        // Both statements are a range scan on idx_path_generation
+        let (removed_files, removed_bytes): (i64, i64) = tx.query_row(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM files
+             WHERE path >= ?1 AND path < ?2 AND scan_generation < ?3",
+            params![lower, upper, generation],
+            |row| Ok((row.get(0)?, row.get(1)?)),
+        )?;
+        tx.execute(
+            "DELETE FROM files WHERE path >= ?1 AND path < ?2 AND scan_generation < ?3",
+            params![lower, upper, generation],
+        )?;
+        tx.execute(
+            "UPDATE scan_runs
+             SET finished_at = ?1, status = 'completed', files_seen = ?2,
+                 files_removed = ?3, bytes_removed = ?4
+             WHERE id = ?5",
+            params![
+                unix_now(),
+                files_seen as i64,
+                removed_files,
+                removed_bytes,
+                generation
+            ],
+        )?;
+
+        bump_version(&tx)?;
+        tx.commit()?;
+        Ok((removed_files, removed_bytes))
+    }
+
+    pub fn insert_files(&mut self, files: &[FileEntry], generation: i64) -> Result<()> {
         let tx = self.conn.transaction()?;
 
         {
             let mut stmt = tx.prepare(
                 "INSERT OR REPLACE INTO files 
-                (path, filename, extension, size_bytes, created_at, modified_at, md5_hash, sha256_hash, sha256_verified)
-                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, 0)"
+                (path, filename, extension, size_bytes, created_at, modified_at, md5_hash, sha256_hash, sha256_verified, scan_generation)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, 0, ?9)"
             )?;
 
             for file in files {
@@ -68,12 +201,38 @@ impl Database {
                     file.created_at,
                     file.modified_at,
                     file.md5_hash,
-                    file.sha256_hash
+                    file.sha256_hash,
+                    generation
                 ])?;
             }
         }
 
+        bump_version(&tx)?;
         tx.commit()?;
         Ok(())
     }
 }
+
+/// Half-open [lower, upper) string range matching every path below `root`.
+fn subtree_range(root: &str) -> (String, String) {
+    let sep = if root.contains('\\') { '\\' } else { '/' };
+    let base = root.trim_end_matches(sep);
+    let next = char::from_u32(sep as u32 + 1).unwrap();
+    (format!("{}{}", base, sep), format!("{}{}", base, next))
+}
+
+/// Counts a write in the catalog version, inside the writing transaction.
+fn bump_version(tx: &Transaction) -> Result<()> {
+    tx.execute(
+        "UPDATE catalog_meta SET value = value + 1 WHERE key = 'write_counter'",
+        [],
+    )?;
+    Ok(())
+}
+
+fn unix_now() -> i64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .unwrap_or_default()
+        .as_secs() as i64
+}
@@ -4,12 +4,14 @@ mod scanner;
 
 use anyhow::Result;
 use db::Database;
-use scanner::Scanner;
+use models::ScanItem;
+use scanner::{Pause, Scanner, Throttle};
 use serde::Serialize;
 use std::env;
 use std::fs::File;
-use std::path::Path;
+use std::path::{Path, PathBuf};
 use std::sync::mpsc;
+use std::sync::Arc;
 use std::thread;
 use std::time::Instant;
 
@@ -19,6 +21,10 @@ struct ScanProgress {
     total: Option<usize>, // Estimate, optional
     current_file: String,
     status: String, // "running", "completed"
+    #[serde(skip_serializing_if = "Option::is_none")]
+    removed_files: Option<i64>, // Stale rows purged after the scan
+    #[serde(skip_serializing_if = "Option::is_none")]
+    removed_bytes: Option<i64>,
 }
 
 fn write_status(path: &Path, progress: &ScanProgress) {
@@ -30,12 +36,40 @@ fn write_status(path: &Path, progress: &ScanProgress) {
 fn main() -> Result<()> {
     let args: Vec<String> = env::args().collect();
     if args.len() < 3 {
-        eprintln!("Usage: {} <scan_path> <db_path>", args[0]);
+        eprintln!(
+            "Usage: {} <scan_path> <db_path> [--threads N] [--max-bytes-per-sec N] [--pause-file PATH]",
+            args[0]
+        );
         std::process::exit(1);
     }
 
     let scan_path = args[1].clone();
     let db_path = args[2].clone();
+
+    // Optional I/O limits (0 = unlimited / rayon default)
+    let mut threads: usize = 0;
+    let mut max_bytes_per_sec: u64 = 0;
+    let mut pause_file: Option<PathBuf> = None;
+    let mut i = 3;
+    while i < args.len() {
+        let value = match args.get(i + 1) {
+            Some(value) => value,
+            None => {
+                eprintln!("Missing value for option: {}", args[i]);
+                std::process::exit(1);
+            }
+        };
+        match args[i].as_str() {
+            "--threads" => threads = value.parse()?,
+            "--max-bytes-per-sec" => max_bytes_per_sec = value.parse()?,
+            "--pause-file" => pause_file = Some(PathBuf::from(value)),
+            other => {
+                eprintln!("Unknown option: {}", other);
+                std::process::exit(1);
+            }
+        }
+        i += 2;
+    }
     let status_path = Path::new(&db_path)
         .parent()
         .unwrap()
@@ -50,21 +84,36 @@ fn main() -> Result<()> {
     // Initialize DB
     let mut db = Database::new(&db_path)?;
     db.init()?;
+    let generation = db.begin_scan_run(&scan_path)?;
+    println!("Scan generation: {}", generation);
 
     // Create Channel
-    let (tx, rx): (
-        mpsc::Sender<crate::models::FileEntry>,
-        mpsc::Receiver<crate::models::FileEntry>,
-    ) = mpsc::channel();
+    let (tx, rx): (mpsc::Sender<ScanItem>, mpsc::Receiver<ScanItem>) = mpsc::channel();
+
+    let pause = Arc::new(Pause::new(pause_file));
 
     // Spawn DB Writer Thread
     let status_path_clone = status_path.clone();
-    let db_handle = thread::spawn(move || -> Result<usize> {
+    let writer_pause = pause.clone();
+    let db_handle = thread::spawn(move || -> Result<(usize, Database)> {
         let mut batch = Vec::with_capacity(1000);
         let mut total_inserted = 0;
         let mut last_file = String::new();
-
-        for entry in rx {
+        let mut unreadable_files = Vec::new();
+        let mut unreadable_trees = Vec::new();
+
+        for item in rx {
+            let entry = match item {
+                ScanItem::File(entry) => entry,
+                ScanItem::Unreadable(path) => {
+                    unreadable_files.push(path);
+                    continue;
+                }
+                ScanItem::UnreadableTree(path) => {
+                    unreadable_trees.push(path);
+                    continue;
+                }
+            };
             last_file = entry.path.clone();
             batch.push(entry);
 
@@ -79,12 +128,28 @@ fn main() -> Result<()> {
                     total: None,
                     current_file: last_file.clone(),
                     status: "running".to_string(),
+                    removed_files: None,
+                    removed_bytes: None,
                 };
                 write_status(&status_path_clone, &progress);
+
+                // Outside insert_files, so never inside a transaction. Rewriting the
+                // status keeps it fresh, or /api/scan_progress would report the scan as gone.
+                writer_pause.hold_while_requested(|| {
+                    let paused = ScanProgress {
+                        scanned: progress.scanned,
+                        total: None,
+                        current_file: progress.current_file.clone(),
+                        status: "paused".to_string(),
+                        removed_files: None,
+                        removed_bytes: None,
+                    };
+                    write_status(&status_path_clone, &paused);
+                });
             }
 
             if batch.len() >= 1000 {
-                db.insert_files(&batch)?;
+                db.insert_files(&batch, generation)?;
                 total_inserted += batch.len();
                 batch.clear();
                 println!("Indexed: {} files", total_inserted);
@@ -93,17 +158,35 @@ fn main() -> Result<()> {
 
         // Insert remaining
         if !batch.is_empty() {
-            db.insert_files(&batch)?;
+            db.insert_files(&batch, generation)?;
             total_inserted += batch.len();
         }
 
-        Ok(total_inserted)
+        // Files that exist but could not be read are not deleted: keep their rows
+        if !unreadable_files.is_empty() || !unreadable_trees.is_empty() {
+            let kept = db.keep_unreadable(&unreadable_files, &unreadable_trees, generation)?;
+            println!(
+                "Unreadable: {} files, {} directories ({} catalog rows kept)",
+                unreadable_files.len(),
+                unreadable_trees.len(),
+                kept
+            );
+        }
+
+        Ok((total_inserted, db))
     });
 
-    let scanner = Scanner::new(&scan_path);
-    scanner.scan(tx);
+    let throttle = Arc::new(Throttle::new(max_bytes_per_sec));
+    let scanner = Scanner::new(&scan_path, throttle, pause);
+    let pool = rayon::ThreadPoolBuilder::new()
+        .num_threads(threads)
+        .build()?;
+    pool.install(|| scanner.scan(tx));
+
+    let (total, mut db) = db_handle.join().unwrap()?;
 
-    let total = db_handle.join().unwrap()?;
+    // Everything under the root that this generation did not touch is gone from disk
+    let (removed_files, removed_bytes) = db.finish_scan_run(generation, &scan_path, total)?;
 
     // Write final status
     let final_progress = ScanProgress {
@@ -111,12 +194,18 @@ fn main() -> Result<()> {
         total: Some(total),
         current_file: String::new(),
         status: "completed".to_string(),
+        removed_files: Some(removed_files),
+        removed_bytes: Some(removed_bytes),
     };
     write_status(&status_path, &final_progress);
 
     let duration = start_time.elapsed();
     println!("Scan complete in {:.2?}", duration);
     println!("Total file indexed: {}", total);
+    println!(
+        "Removed {} stale files ({} bytes)",
+        removed_files, removed_bytes
+    );
 
     Ok(())
 }
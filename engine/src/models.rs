@@ -34,3 +34,16 @@ impl FileEntry {
         }
     }
 }
+
+/// What the scanner reports for each path under the root.
+#[derive(Debug)]
+pub enum ScanItem {
+    /// A file read and hashed.
+    File(FileEntry),
+    /// A file that exists but could not be read or hashed (locked, no permission):
+    /// its catalog row, if any, is kept as it is.
+    Unreadable(String),
+    /// An entry the walk could not read (usually a directory): its catalog rows,
+    /// and those of everything below it, are kept as they are.
+    UnreadableTree(String),
+}
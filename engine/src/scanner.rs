@@ -1,38 +1,149 @@
-use crate::models::FileEntry;
+use crate::models::{FileEntry, ScanItem};
 use anyhow::Result;
 use md5::{Digest, Md5};
 use rayon::prelude::*;
 use sha2::Sha256;
 use std::fs::File;
-use std::io::{BufReader, Read};
-use std::path::Path;
+use std::io::{BufReader, ErrorKind, Read};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicBool, Ordering};
 use std::sync::mpsc::Sender;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
 use walkdir::WalkDir;
 
+/// Shared read-rate limiter for all hashing threads.
+pub struct Throttle {
+    bytes_per_sec: u64,
+    state: Mutex<(Instant, u64)>, // window start, bytes read since then
+}
+
+impl Throttle {
+    pub fn new(bytes_per_sec: u64) -> Self {
+        Self {
+            bytes_per_sec,
+            state: Mutex::new((Instant::now(), 0)),
+        }
+    }
+
+    /// Accounts for `bytes` just read and sleeps until the average rate is back under the limit.
+    pub fn consume(&self, bytes: u64) {
+        if self.bytes_per_sec == 0 {
+            return;
+        }
+
+        let wait = {
+            let mut state = self.state.lock().unwrap();
+            let elapsed = state.0.elapsed();
+            let expected = Duration::from_secs_f64(state.1 as f64 / self.bytes_per_sec as f64);
+
+            // Idle for a while (or paused): start a new window instead of bursting
+            if elapsed > expected + Duration::from_secs(1) {
+                *state = (Instant::now(), 0);
+            }
+            state.1 += bytes;
+
+            let expected = Duration::from_secs_f64(state.1 as f64 / self.bytes_per_sec as f64);
+            expected.saturating_sub(state.0.elapsed())
+        };
+
+        if !wait.is_zero() {
+            thread::sleep(wait);
+        }
+    }
+}
+
+/// Cooperative pause, requested by the backend through a flag file. The DB
+/// writer checks it between transactions and holds the hashing threads while
+/// the file exists, so a paused scan holds no lock on the catalog.
+pub struct Pause {
+    flag_path: Option<PathBuf>,
+    paused: AtomicBool,
+}
+
+impl Pause {
+    pub fn new(flag_path: Option<PathBuf>) -> Self {
+        Self {
+            flag_path,
+            paused: AtomicBool::new(false),
+        }
+    }
+
+    /// Called by the writer outside a transaction: blocks while a pause is
+    /// requested, calling `on_wait` about twice a second.
+    pub fn hold_while_requested(&self, mut on_wait: impl FnMut()) {
+        let flag_path = match &self.flag_path {
+            Some(p) => p,
+            None => return,
+        };
+        if !flag_path.exists() {
+            return;
+        }
+        self.paused.store(true, Ordering::SeqCst);
+        while flag_path.exists() {
+            on_wait();
+            thread::sleep(Duration::from_millis(500));
+        }
+        self.paused.store(false, Ordering::SeqCst);
+    }
+
+    /// Called by the hashing threads before reading a file.
+    pub fn wait(&self) {
+        while self.paused.load(Ordering::SeqCst) {
+            thread::sleep(Duration::from_millis(200));
+        }
+    }
+}
+
 pub struct Scanner {
     root: String,
+    throttle: Arc<Throttle>,
+    pause: Arc<Pause>,
 }
 
 impl Scanner {
-    pub fn new(root: &str) -> Self {
+    pub fn new(root: &str, throttle: Arc<Throttle>, pause: Arc<Pause>) -> Self {
         Self {
             root: root.to_string(),
+            throttle,
+            pause,
         }
     }
 
-    pub fn scan(&self, tx: Sender<FileEntry>) {
+    /// Walks the root, sending every file. Paths that exist but cannot be read
+    /// are sent as unreadable so the purge after the scan does not take them for
+    /// deleted files.
+    pub fn scan(&self, tx: Sender<ScanItem>) {
+        let errors = tx.clone();
         WalkDir::new(&self.root)
             .into_iter()
+            // Walk errors are taken before fanning out, on the walking thread
+            .filter_map(move |e| match e {
+                Ok(entry) => Some(entry),
+                Err(err) => {
+                    if let Some(path) = err.path() {
+                        let _ = errors
+                            .send(ScanItem::UnreadableTree(path.to_string_lossy().to_string()));
+                    }
+                    None
+                }
+            })
             .par_bridge() // Parallelize the iterator
-            .filter_map(|e| e.ok())
             .filter(|e| e.file_type().is_file())
             .for_each_with(tx, |tx, entry| {
+                self.pause.wait();
                 let path = entry.path();
+                let unreadable = || ScanItem::Unreadable(path.to_string_lossy().to_string());
 
-                // Skip if we can't read metadata
+                // A file deleted since the walk listed it is simply gone
                 let metadata = match path.metadata() {
                     Ok(m) => m,
-                    Err(_) => return,
+                    Err(e) if e.kind() == ErrorKind::NotFound => return,
+                    Err(_) => {
+                        let _ = tx.send(unreadable());
+                        return;
+                    }
                 };
 
                 let size = metadata.len();
@@ -51,18 +162,34 @@ impl Scanner {
                     .unwrap_or_default()
                     .as_secs() as i64;
 
-                // Calculate MD5
-                if let Ok(hash) = compute_md5(path) {
-                    let entry = FileEntry::new(path.to_path_buf(), size, created, modified, hash);
-
-                    // Send to DB thread (ignore errors if receiver dropped)
-                    let _ = tx.send(entry);
-                }
+                // Send to DB thread (ignore errors if receiver dropped)
+                let item = match compute_md5_throttled(path, &self.throttle) {
+                    Ok(hash) => ScanItem::File(FileEntry::new(
+                        path.to_path_buf(),
+                        size,
+                        created,
+                        modified,
+                        hash,
+                    )),
+                    Err(e) if is_not_found(&e) => return,
+                    Err(_) => unreadable(),
+                };
+                let _ = tx.send(item);
             });
     }
 }
 
+fn is_not_found(error: &anyhow::Error) -> bool {
+    error
+        .downcast_ref::<std::io::Error>()
+        .map_or(false, |e| e.kind() == ErrorKind::NotFound)
+}
+
 pub fn compute_md5(path: &Path) -> Result<String> {
+    compute_md5_throttled(path, &Throttle::new(0))
+}
+
+pub fn compute_md5_throttled(path: &Path, throttle: &Throttle) -> Result<String> {
     let file = File::open(path)?;
     let mut reader = BufReader::new(file);
     let mut hasher = Md5::new();
@@ -74,6 +201,7 @@ pub fn compute_md5(path: &Path) -> Result<String> {
         if count == 0 {
             break;
         }
+        throttle.consume(count as u64);
         hasher.update(&buffer[..count]);
     }
 